@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import uuid
+from typing import Dict, Optional
+
+import orjson
+from loguru import logger
+
+from bisheng_unstructured.api.types import UnstructuredInput, UnstructuredOutput
+
+# bump it when the parse result of the same input changes
+CACHE_VERSION = "1"
+
+# parameters which do not change the result
+IGNORED_PARAMETERS = {"headers", "ssl_verify", "no_cache", "window_size", "return_pdf"}
+
+
+def file_sha256(file_path: str, chunk_size: int = 1 << 20) -> str:
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as fin:
+        for chunk in iter(lambda: fin.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class DiskCacheBackend(object):
+    """Save the values as files under root, shared by all workers on the same directory.
+
+    The file mtime is the last used time, once the total size is over
+    `max_size_mb` the least recently used files are removed, a zero
+    `max_size_mb` disables the eviction for the directory cleaned outside.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_size_mb: int = 1024):
+        if not root:
+            root = os.path.join(tempfile.gettempdir(), "bisheng_uns_cache")
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.max_size = max_size_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._size = sum(os.path.getsize(p) for p in self._files())
+
+    def _files(self):
+        for sub_dir in os.scandir(self.root):
+            if not sub_dir.is_dir():
+                continue
+            for entry in os.scandir(sub_dir.path):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    yield entry.path
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fin:
+                data = fin.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def set(self, key: str, value: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as fout:
+            fout.write(value)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size += len(value)
+            if self.max_size and self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        # other workers write into the same directory, recount from the files
+        files = []
+        for path in self._files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        files.sort()
+        size = sum(f[1] for f in files)
+        target = self.max_size * 0.9
+        for _, file_size, path in files:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+                size -= file_size
+            except OSError:
+                continue
+        self._size = size
+
+
+CACHE_BACKENDS = {
+    "disk": DiskCacheBackend,
+}
+
+
+class ResultCache(object):
+    """Cache the outputs of the pipeline by the content of the input.
+
+    The key is built from the sha256 of the file, the file type, mode, the
+    parameters changing the result and the versions of the models, so the
+    same upload with the same settings is answered without parsing again.
+    """
+
+    def __init__(self, backend, versions: Dict):
+        self.backend = backend
+        self.versions = versions
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_conf(cls, cache_conf: Dict, versions: Dict) -> Optional["ResultCache"]:
+        if not cache_conf or not cache_conf.get("enable"):
+            return None
+        backend_type = cache_conf.get("backend", "disk")
+        if backend_type not in CACHE_BACKENDS:
+            raise ValueError(f"cache backend [{backend_type}] not supported")
+        backend = CACHE_BACKENDS[backend_type](
+            root=cache_conf.get("root"), max_size_mb=cache_conf.get("max_size_mb", 1024)
+        )
+        return cls(backend, versions)
+
+    def make_key(self, inp: UnstructuredInput) -> str:
+        parameters = {
+            k: v for k, v in (inp.parameters or {}).items() if k not in IGNORED_PARAMETERS
+        }
+        key_data = {
+            "cache_version": CACHE_VERSION,
+            "sha256": file_sha256(inp.file_path),
+            "file_type": inp.file_type,
+            "mode": inp.mode,
+            "scale": inp.scale,
+            "is_scan": inp.is_scan,
+            "parameters": parameters,
+            "versions": self.versions,
+        }
+        key_str = json.dumps(key_data, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(key_str.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[UnstructuredOutput]:
+        outp = None
+        try:
+            data = self.backend.get(key)
+            if data is not None:
+                outp = UnstructuredOutput(**orjson.loads(data))
+        except Exception:
+            logger.exception(f"failed to read cache key=[{key}]")
+
+        with self._lock:
+            if outp is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return outp
+
+    def set(self, key: str, outp: UnstructuredOutput):
+        try:
+            self.backend.set(key, orjson.dumps(outp.dict()))
+        except Exception:
+            logger.exception(f"failed to write cache key=[{key}]")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,162 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from loguru import logger
+
+
+class ExecutorFullError(Exception):
+    """Raised when the executor has no free slot for a new job."""
+
+
+class _SlotStream(object):
+    """The async iterator of `BoundedExecutor.stream`.
+
+    The job of a started stream frees the slot, a stream closed or dropped before
+    its first item, e.g. the client is gone before the response starts, frees it here.
+    """
+
+    def __init__(self, agen, release):
+        self._agen = agen
+        self._release = release
+        self._started = False
+
+    def _release_unstarted(self):
+        if not self._started:
+            self._started = True
+            self._release()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        self._started = True
+        return await self._agen.__anext__()
+
+    async def aclose(self):
+        self._release_unstarted()
+        await self._agen.aclose()
+
+    def __del__(self):
+        self._release_unstarted()
+
+
+class BoundedExecutor(object):
+    """Run blocking jobs off the event loop with admission control.
+
+    At most `max_workers` jobs run concurrently and at most `max_queue_size`
+    more wait for a free worker, further submissions are rejected with
+    `ExecutorFullError` instead of piling up in the event loop. A slot is
+    freed when the job finishes, not when its caller stops waiting.
+
+    Only the thread executor is supported: the metrics, the cache counters,
+    the trace_id and the streaming outputs are kept in the api process.
+    """
+
+    def __init__(
+        self, executor_type: str = "thread", max_workers: int = 4, max_queue_size: int = 16
+    ):
+        if executor_type != "thread":
+            raise ValueError(f"executor type[{executor_type}] not supported, only thread")
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="bisheng_uns"
+        )
+        self.max_workers = max_workers
+        self.capacity = max_workers + max_queue_size
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            if self._inflight >= self.capacity:
+                return False
+            self._inflight += 1
+            return True
+
+    def _release(self, *args):
+        with self._lock:
+            self._inflight -= 1
+
+    async def run(self, func, *args, **kwargs):
+        if not self._acquire():
+            logger.warning(f"executor is full inflight=[{self._inflight}]")
+            raise ExecutorFullError(f"too many requests, inflight=[{self._inflight}]")
+
+        # keep the contextual vars, e.g. the logger trace_id, in worker threads
+        ctx = contextvars.copy_context()
+        try:
+            job = self.executor.submit(ctx.run, func, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+        # the job keeps running if the caller is cancelled, so it keeps the slot
+        job.add_done_callback(self._release)
+        return await asyncio.wrap_future(job)
+
+    def stream(self, gen_func, *args, max_buffer: int = 64, **kwargs):
+        """Run the generator `gen_func` in a worker thread and iterate its items asynchronously.
+
+        The slot is taken right away, so `ExecutorFullError` is raised before any
+        item is produced. At most `max_buffer` items wait for the consumer, the
+        generator is paused beyond that and stopped once the consumer is closed.
+        """
+        if not self._acquire():
+            logger.warning(f"executor is full inflight=[{self._inflight}]")
+            raise ExecutorFullError(f"too many requests, inflight=[{self._inflight}]")
+
+        return _SlotStream(self._stream(gen_func, args, kwargs, max_buffer), self._release)
+
+    async def _stream(self, gen_func, args, kwargs, max_buffer):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=max_buffer)
+        stopped = threading.Event()
+
+        def _put(item) -> bool:
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while not stopped.is_set():
+                try:
+                    future.result(timeout=0.5)
+                    return True
+                except FutureTimeoutError:
+                    continue
+            future.cancel()
+            return False
+
+        def _produce():
+            try:
+                for item in gen_func(*args, **kwargs):
+                    if not _put((False, item)):
+                        return
+                _put((True, None))
+            except Exception as e:
+                _put((True, e))
+
+        ctx = contextvars.copy_context()
+        try:
+            job = self.executor.submit(ctx.run, _produce)
+        except Exception:
+            self._release()
+            raise
+        job.add_done_callback(self._release)
+        try:
+            while True:
+                is_end, item = await queue.get()
+                if is_end:
+                    if item is not None:
+                        raise item
+                    break
+                yield item
+            await asyncio.wrap_future(job)
+        finally:
+            # the generator stops at its next item, its slot is freed then
+            stopped.set()
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
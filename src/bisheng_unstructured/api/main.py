@@ -1,17 +1,23 @@
 import base64
 import os
 import tempfile
+from contextlib import nullcontext
 
+import orjson
 import requests
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import ORJSONResponse
+from fastapi.responses import FileResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from loguru import logger
 
+from bisheng_unstructured.api.executor import BoundedExecutor, ExecutorFullError
+from bisheng_unstructured.api.native import is_native_partition
+from bisheng_unstructured.api.pdf_store import PdfStore
 from bisheng_unstructured.api.pipeline import Pipeline
 from bisheng_unstructured.api.types import ConfigInput, UnstructuredInput, UnstructuredOutput
 from bisheng_unstructured.common import Timer
 from bisheng_unstructured.common.logger import configure
+from bisheng_unstructured.common.metrics import CONTENT_TYPE, REGISTRY, collect_timings
 from bisheng_unstructured.config.settings import settings
 from bisheng_unstructured.middlewares.http_middleware import CustomMiddleware
 
@@ -58,6 +64,28 @@ configure(settings.logger_conf)
 app = create_app()
 
 pipeline = Pipeline(settings.dict())
+executor = BoundedExecutor(
+    executor_type=settings.executor_conf.type,
+    max_workers=settings.executor_conf.max_workers,
+    max_queue_size=settings.executor_conf.max_queue_size,
+)
+pdf_store = PdfStore(root=settings.pdf_store_conf.root, ttl=settings.pdf_store_conf.ttl)
+
+REGISTRY.gauge(
+    "bisheng_uns_executor_inflight", "Parse requests running or queued in the executor"
+).set_function(lambda: {(): executor.inflight})
+REGISTRY.counter(
+    "bisheng_uns_cache_lookups", "Lookups of the result cache", ["result"]
+).set_function(
+    lambda: {}
+    if pipeline.cache is None
+    else {("hit",): pipeline.cache.hits, ("miss",): pipeline.cache.misses}
+)
+
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    executor.shutdown(wait=False)
 
 
 @app.get("/v1/config")
@@ -65,8 +93,55 @@ async def config():
     return {"status": "OK", "config": pipeline.config}
 
 
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(REGISTRY.expose(), media_type=CONTENT_TYPE)
+
+
+@app.get("/v1/cache/stats")
+async def cache_stats():
+    if pipeline.cache is None:
+        return {"status": "OK", "enable": False}
+    return {"status": "OK", "enable": True, **pipeline.cache.stats()}
+
+
 @app.post("/v1/etl4llm/predict", response_model=UnstructuredOutput)
 async def etl4_llm(inp: UnstructuredInput):
+    # the parse work is blocking, run it in the executor to keep the event loop responsive
+    try:
+        return await executor.run(_etl4llm, inp)
+    except ExecutorFullError as e:
+        logger.warning(f"reject etl4llm filename=[{inp.filename}] err=[{e}]")
+        outp = UnstructuredOutput(status_code=429, status_message=str(e))
+        return ORJSONResponse(status_code=429, content=outp.dict())
+
+
+@app.post("/v1/etl4llm/predict_stream")
+async def etl4_llm_stream(inp: UnstructuredInput):
+    """Stream the result as ndjson, one ISD element per line as the pages are done.
+
+    The last line is the output without partitions, its `pdf_id` is used to
+    fetch the pdf with `/v1/etl4llm/pdf/{pdf_id}` in partition mode.
+    """
+    try:
+        lines = executor.stream(_etl4llm_stream, inp)
+    except ExecutorFullError as e:
+        logger.warning(f"reject etl4llm_stream filename=[{inp.filename}] err=[{e}]")
+        outp = UnstructuredOutput(status_code=429, status_message=str(e))
+        return ORJSONResponse(status_code=429, content=outp.dict())
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+@app.get("/v1/etl4llm/pdf/{pdf_id}")
+async def etl4_llm_pdf(pdf_id: str):
+    file_path = pdf_store.get(pdf_id)
+    if file_path is None:
+        raise HTTPException(status_code=404, detail=f"pdf [{pdf_id}] not found")
+    return FileResponse(file_path, media_type="application/pdf")
+
+
+def _prepare_input(inp: UnstructuredInput, tmpdir: str):
+    """Save the input file into tmpdir, the non-pdf file is converted in partition mode"""
     filename = inp.filename
     b64_data = inp.b64_data
     file_type = filename.rsplit(".", 1)[1].lower()
@@ -75,53 +150,137 @@ async def etl4_llm(inp: UnstructuredInput):
         logger.error(f"url or b64_data at least one must be given filename=[{inp.filename}]")
         raise Exception("url or b64_data at least one must be given")
 
+    file_path = os.path.join(tmpdir, filename)
+    if b64_data:
+        try:
+            with open(file_path, "wb") as fout:
+                fout.write(base64.b64decode(b64_data[0]))
+        except Exception:
+            logger.error(f"b64_data is damaged filename=[{inp.filename}]", exc_info=True)
+            raise Exception(f"b64_data is damaged")
+    else:
+        headers = inp.parameters.get("headers", {})
+        ssl_verify = inp.parameters.get("ssl_verify", True)
+        response = requests.get(inp.url, headers=headers, verify=ssl_verify)
+        if not response.ok:
+            raise Exception(f"url data is damaged: {response.status_code}")
+
+        with open(file_path, "wb") as fout:
+            fout.write(response.content)
+
+    inp.file_path = file_path
+    inp.file_type = file_type
+    if pipeline.mode == "local" and inp.mode == "partition":
+        # 本地模式只支持text 有限格式
+        logger.info(f"local_pipeline mode=[{inp.mode}] filename=[{inp.filename}]")
+        inp.mode = "text"
+
+    if inp.mode == "partition" and is_native_partition(inp.file_type, inp.parameters):
+        # office文档原生解析, 不转pdf也不走版面分析等模型, 需要pdf时在解析后再转换
+        return
+
+    if inp.file_type != "pdf" and inp.mode == "partition":
+        # partition 模式，转pdf 后处理
+        inp.mode = "topdf"
+        pdf_ret = pipeline.predict(inp)
+        if pdf_ret and pdf_ret.status_code != 200:
+            logger.error(f"topdf failed filename=[{inp.filename}]")
+            raise ValueError(f"topdf failed")
+        with open(file_path, "wb") as fout:
+            fout.write(base64.b64decode(pdf_ret.b64_pdf))
+        inp.file_type = "pdf"
+        inp.mode = "partition"
+
+
+def _deferred_pdf(inp: UnstructuredInput):
+    """The b64 pdf of the natively partitioned file, only converted if parameters.return_pdf"""
+    if not inp.parameters.get("return_pdf"):
+        return None
+
+    pdf_ret = pipeline.to_pdf(inp)
+    if pdf_ret.status_code != 200:
+        logger.warning(f"topdf failed filename=[{inp.filename}] err=[{pdf_ret.status_message}]")
+        return None
+    return pdf_ret.b64_pdf
+
+
+def _etl4llm(inp: UnstructuredInput) -> UnstructuredOutput:
+    if inp.parameters.get("debug_timings"):
+        # the timings of the pdf conversion are included
+        with collect_timings() as timings:
+            outp = _etl4llm_run(inp)
+        outp.timings = timings
+        return outp
+    return _etl4llm_run(inp)
+
+
+def _etl4llm_run(inp: UnstructuredInput) -> UnstructuredOutput:
     logger.info(f"start etl4llm with mode=[{inp.mode}] filename=[{inp.filename}]")
     timer = Timer()
 
     with tempfile.TemporaryDirectory() as tmpdir:
-        file_path = os.path.join(tmpdir, filename)
-        if b64_data:
-            try:
-                with open(file_path, "wb") as fout:
-                    fout.write(base64.b64decode(b64_data[0]))
-            except Exception:
-                logger.error(f"b64_data is damaged filename=[{inp.filename}]", exc_info=True)
-                raise Exception(f"b64_data is damaged")
-        else:
-            headers = inp.parameters.get("headers", {})
-            ssl_verify = inp.parameters.get("ssl_verify", True)
-            response = requests.get(inp.url, headers=headers, verify=ssl_verify)
-            if not response.ok:
-                raise Exception(f"url data is damaged: {response.status_code}")
-
-            with open(file_path, "wb") as fout:
-                fout.write(response.content)
-
-        inp.file_path = file_path
-        inp.file_type = file_type
-        if pipeline.mode == "local" and inp.mode == "partition":
-            # 本地模式只支持text 有限格式
-            logger.info(f"local_pipeline mode=[{inp.mode}] filename=[{inp.filename}]")
-            inp.mode = "text"
-
-        if inp.file_type != "pdf" and inp.mode == "partition":
-            # partition 模式，转pdf 后处理
-            inp.mode = "topdf"
-            pdf_ret = pipeline.predict(inp)
-            if pdf_ret and pdf_ret.status_code != 200:
-                logger.error(f"topdf failed filename=[{inp.filename}]")
-                raise ValueError(f"topdf failed")
-            with open(file_path, "wb") as fout:
-                fout.write(base64.b64decode(pdf_ret.b64_pdf))
-            inp.file_type = "pdf"
-            inp.mode = "partition"
+        _prepare_input(inp, tmpdir)
 
         timer.toc()
         outp = pipeline.predict(inp)
         if inp.mode == "partition" and outp.status_code == 200:
-            with open(file_path, "rb") as fin:
-                outp.b64_pdf = base64.b64encode(fin.read()).decode("utf-8")
+            if inp.file_type != "pdf":
+                outp.b64_pdf = _deferred_pdf(inp)
+            else:
+                with open(inp.file_path, "rb") as fin:
+                    outp.b64_pdf = base64.b64encode(fin.read()).decode("utf-8")
 
         timer.toc()
         logger.info(f"succ etl4llm with filename=[{inp.filename}] elapses=[{timer.get()}]]")
         return outp
+
+
+def _store_pdf(inp: UnstructuredInput, tmpdir: str):
+    if inp.file_type == "pdf":
+        return pdf_store.put(inp.file_path)
+
+    b64_pdf = _deferred_pdf(inp)
+    if b64_pdf is None:
+        return None
+    pdf_path = os.path.join(tmpdir, "deferred.pdf")
+    with open(pdf_path, "wb") as fout:
+        fout.write(base64.b64decode(b64_pdf))
+    return pdf_store.put(pdf_path)
+
+
+def _etl4llm_stream(inp: UnstructuredInput):
+    logger.info(f"start etl4llm_stream with mode=[{inp.mode}] filename=[{inp.filename}]")
+    timer = Timer()
+    debug_timings = inp.parameters.get("debug_timings")
+    timings_ctx = collect_timings() if debug_timings else nullcontext()
+
+    with tempfile.TemporaryDirectory() as tmpdir, timings_ctx as timings:
+        outp = UnstructuredOutput()
+        try:
+            _prepare_input(inp, tmpdir)
+            timer.toc()
+            for outp_part in pipeline.predict_iter(inp):
+                for element in outp_part.partitions:
+                    yield orjson.dumps(element) + b"\n"
+                outp.status_code = outp_part.status_code
+                outp.status_message = outp_part.status_message
+                outp.text = outp_part.text
+                outp.html_text = outp_part.html_text
+                if outp_part.status_code == 200:
+                    # the page to resume from if a later window fails, None when finished
+                    outp.next_start = outp_part.next_start
+            if inp.mode == "partition" and outp.status_code == 200:
+                outp.pdf_id = _store_pdf(inp, tmpdir)
+        except Exception as e:
+            logger.exception(f"error in etl4llm_stream filename=[{inp.filename}] err=")
+            outp = UnstructuredOutput(
+                status_code=400, status_message=str(e), next_start=outp.next_start
+            )
+
+        if debug_timings:
+            # the timings of the whole stream are sent in the last line
+            outp.timings = timings
+        yield orjson.dumps(outp.dict(exclude={"partitions"})) + b"\n"
+
+        timer.toc()
+        logger.info(f"succ etl4llm_stream with filename=[{inp.filename}] elapses=[{timer.get()}]]")
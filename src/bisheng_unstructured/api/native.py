@@ -0,0 +1,43 @@
+from typing import List
+
+from bisheng_unstructured.documents.elements import Element, PageBreak, Table, Title
+
+# the office files partitioned by their own parsers in native partition mode
+NATIVE_PARTITION_TYPES = {"doc", "docx", "ppt", "pptx", "xls", "xlsx"}
+
+
+def is_native_partition(file_type: str, parameters: dict) -> bool:
+    return bool(parameters.get("native")) and file_type in NATIVE_PARTITION_TYPES
+
+
+def native_elements(elements: List[Element]) -> List[Element]:
+    """Fill the `extra_data` of the pdf partitions into the elements of the office parsers.
+
+    Each element is a single line, the lists of `extra_data` have one item each:
+
+    - indexes: `[[0, len(text) - 1]]`, the span of the line in the text
+    - types: the type of the line, `title`, `table` or `paragraph`
+    - pages: the page number, only when the parser knows it
+    - bboxes: the bbox of the line, only when the parser gives one, e.g. the
+      shape geometry of the pptx in points
+    """
+    outputs = []
+    for element in elements:
+        if isinstance(element, PageBreak) or not element.text:
+            continue
+
+        if isinstance(element, Table):
+            elem_type = "table"
+        elif isinstance(element, Title):
+            elem_type = "title"
+        else:
+            elem_type = "paragraph"
+
+        extra_data = {"indexes": [[0, len(element.text) - 1]], "types": [elem_type]}
+        page_number = element.metadata.page_number
+        if page_number is not None:
+            extra_data["pages"] = [page_number]
+        extra_data.update(element.metadata.extra_data or {})
+        element.metadata.extra_data = extra_data
+        outputs.append(element)
+    return outputs
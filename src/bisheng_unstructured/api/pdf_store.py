@@ -0,0 +1,65 @@
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from typing import Optional
+
+from loguru import logger
+
+PDF_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class PdfStore(object):
+    """Keep the pdf files of the streamed results for a separate fetch.
+
+    The files are saved as `{root}/{pdf_id}.pdf` and removed `ttl` seconds
+    after they are saved.
+    """
+
+    def __init__(self, root: Optional[str] = None, ttl: int = 3600):
+        if not root:
+            root = os.path.join(tempfile.gettempdir(), "bisheng_uns_pdf")
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def _path(self, pdf_id: str) -> str:
+        return os.path.join(self.root, f"{pdf_id}.pdf")
+
+    def put(self, file_path: str) -> str:
+        self.purge()
+        pdf_id = uuid.uuid4().hex
+        tmp_path = self._path(pdf_id) + ".tmp"
+        shutil.copyfile(file_path, tmp_path)
+        os.replace(tmp_path, self._path(pdf_id))
+        return pdf_id
+
+    def get(self, pdf_id: str) -> Optional[str]:
+        if not PDF_ID_PATTERN.match(pdf_id):
+            return None
+        path = self._path(pdf_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+        except OSError:
+            return None
+        return path
+
+    def purge(self):
+        """Remove the expired files"""
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            now = time.time()
+            for entry in os.scandir(self.root):
+                try:
+                    if now - entry.stat().st_mtime > self.ttl:
+                        os.remove(entry.path)
+                except OSError:
+                    logger.warning(f"failed to remove expired pdf path=[{entry.path}]")
+        finally:
+            self._lock.release()
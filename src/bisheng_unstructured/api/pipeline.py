@@ -1,15 +1,22 @@
 import os
 from typing import Dict
+from uuid import uuid4
 
 from loguru import logger
 
 from bisheng_unstructured.api.any2pdf import Any2PdfCreator
+from bisheng_unstructured.api.cache import ResultCache
+from bisheng_unstructured.api.native import is_native_partition, native_elements
 from bisheng_unstructured.api.types import UnstructuredInput, UnstructuredOutput
+from bisheng_unstructured.common.logger import get_trace_id
+from bisheng_unstructured.common.metrics import collect_timings, metric_labels, stage_timer
+from bisheng_unstructured.common.profiler import profile_call, profile_enabled
 from bisheng_unstructured.documents.elements import ElementMetadata, NarrativeText
 from bisheng_unstructured.documents.html_utils import save_to_txt, visualize_html
 from bisheng_unstructured.documents.pdf_parser.blob import Blob
 from bisheng_unstructured.documents.pdf_parser.image import ImageDocument
 from bisheng_unstructured.documents.pdf_parser.pdf import PDFDocument
+from bisheng_unstructured.models import AgentRegistry
 from bisheng_unstructured.partition.csv import partition_csv
 from bisheng_unstructured.partition.doc import partition_doc
 from bisheng_unstructured.partition.docx import partition_docx
@@ -49,6 +56,13 @@ def partition_pdf(filename, model_params,scale, **kwargs):
         return doc.elements
 
 
+def iter_partition_pdf(filename, model_params, scale, window_size=None, **kwargs):
+    """Partition the pdf window by window, yield `(elements, next_start)`"""
+    doc = PDFDocument(file=filename, model_params=model_params, scale=scale, **kwargs)
+    for pages, next_start in doc.iter_pages(window_size):
+        yield [el for page in pages for el in page.elements], next_start
+
+
 def partition_image(filename, model_params, **kwargs):
     rt_type = kwargs.get("rt_type", "sdk")
     # if rt_type in {"ocr_sdk", "idp", "sdk"}:
@@ -108,15 +122,35 @@ class Pipeline(object):
                     "ocr_model_ep": f"http://{rt_ep}/v2.1/models/elem_ocr_collection_v3/infer",
                 }
             self.mode = "sdk"
-            self.config = {"pdf_model_params": pdf_model_params_temp}
+            # the endpoints come from the env, the other params, e.g. the timeout and the
+            # batching, and the other configs come from the settings
+            pdf_model_params = {**(tmp_dict.get("pdf_model_params") or {}), **pdf_model_params_temp}
+            self.config = {**tmp_dict, "pdf_model_params": pdf_model_params}
         else:
             self.mode = "local"
             self.config = tmp_dict
 
         self.pdf_model_params = self.config.get("pdf_model_params")
+        # model agents are built once and shared by all requests
+        self.agents = None
+        if self.mode == "sdk":
+            self.agents = AgentRegistry(self.pdf_model_params, rt_type=self.rt_type)
+
         topdf_model_params = self.config.get("topdf_model_params", {})
         self.pdf_creator = Any2PdfCreator(topdf_model_params)
 
+        # the model endpoints and the settings changing the result are part of the cache key,
+        # a new model version or ocr setting gets a new key
+        cache_versions = {
+            "mode": self.mode,
+            "rt_type": self.rt_type,
+            "pdf_model_params": self.pdf_model_params,
+            "topdf_model_params": topdf_model_params,
+            "ocr_conf": tmp_dict.get("ocr_conf"),
+            "is_all_ocr": tmp_dict.get("is_all_ocr"),
+        }
+        self.cache = ResultCache.from_conf(tmp_dict.get("cache_conf"), cache_versions)
+
     # def update_config(self, config_dict):
     #     self.config = config_dict
     #     self.pdf_model_params = self.config.get("pdf_model_params")
@@ -138,6 +172,45 @@ class Pipeline(object):
         if inp.file_type not in PARTITION_MAP:
             raise Exception(f"file type[{inp.file_type}] not supported")
 
+        with metric_labels(file_type=inp.file_type, mode=inp.mode):
+            profile = profile_enabled(inp.parameters)
+            if inp.parameters.get("debug_timings") or profile:
+                return self._debug_predict(inp, profile)
+            with stage_timer("total"):
+                return self._cached_predict(inp)
+
+    def _debug_predict(self, inp: UnstructuredInput, profile: bool) -> UnstructuredOutput:
+        """Predict without the cache, with the timings and the profile if asked"""
+        with collect_timings() as timings:
+            with stage_timer("total"):
+                if profile:
+                    name = f"{get_trace_id() or uuid4().hex}-{inp.mode}"
+                    outp = profile_call(name, self._predict, inp)
+                else:
+                    outp = self._predict(inp)
+
+        if inp.parameters.get("debug_timings"):
+            outp.timings = timings
+        return outp
+
+    def _cached_predict(self, inp: UnstructuredInput) -> UnstructuredOutput:
+        if self.cache is None:
+            return self._predict(inp)
+
+        key = self.cache.make_key(inp)
+        # parameters.no_cache 跳过缓存读取, 结果仍会写入缓存
+        if not inp.parameters.get("no_cache"):
+            outp = self.cache.get(key)
+            if outp is not None:
+                logger.info(f"cache hit filename=[{inp.filename}] key=[{key}]")
+                return outp
+
+        outp = self._predict(inp)
+        if outp.status_code == 200:
+            self.cache.set(key, outp)
+        return outp
+
+    def _predict(self, inp: UnstructuredInput) -> UnstructuredOutput:
         filename = inp.file_path
         file_type = inp.file_type
 
@@ -156,21 +229,59 @@ class Pipeline(object):
             return UnstructuredOutput(status_code=400, status_message="本地模型不支持图片")
 
         if part_func == partition_pdf or part_func == partition_image:
-            part_inp.update({"model_params": self.pdf_model_params,"scale":inp.scale})
+            part_inp.update(
+                {"model_params": self.pdf_model_params, "scale": inp.scale, "agents": self.agents}
+            )
         try:
             elements = part_func(**part_inp)
             mode = inp.mode
-            if mode == "partition":
-                isd = convert_to_isd(elements)
-                result = UnstructuredOutput(partitions=isd)
-            elif mode == "text":
-                text = save_to_txt(elements)
-                result = UnstructuredOutput(text=text)
-            elif mode == "vis":
-                html_text = visualize_html(elements)
-                result = UnstructuredOutput(html_text=html_text)
+            if mode == "partition" and is_native_partition(file_type, inp.parameters):
+                elements = native_elements(elements)
+            with stage_timer("serialize"):
+                if mode == "partition":
+                    isd = convert_to_isd(elements)
+                    result = UnstructuredOutput(partitions=isd)
+                elif mode == "text":
+                    text = save_to_txt(elements)
+                    result = UnstructuredOutput(text=text)
+                elif mode == "vis":
+                    html_text = visualize_html(elements)
+                    result = UnstructuredOutput(html_text=html_text)
 
             return result
         except Exception as e:
             logger.exception(f"error in partition filename=[{inp.filename}] err=")
             return UnstructuredOutput(status_code=400, status_message=str(e))
+
+    def predict_iter(self, inp: UnstructuredInput, window_size: int = 10):
+        """Partition the pdf in windows of `window_size` pages, yield one output per window.
+
+        Each output has the partitions of the finished pages and `next_start`,
+        the page offset to send as `parameters.start` to resume the document.
+        Other inputs are predicted at once and yield a single output.
+        """
+        window_size = inp.parameters.get("window_size", window_size)
+        if inp.file_type != "pdf" or inp.mode != "partition" or self.mode == "local":
+            yield self.predict(inp)
+            return
+
+        part_inp = {
+            "filename": inp.file_path,
+            "mode": self.mode,
+            "rt_type": self.rt_type,
+            "is_scan": inp.is_scan,
+            **inp.parameters,
+            "model_params": self.pdf_model_params,
+            "scale": inp.scale,
+            "agents": self.agents,
+            "window_size": window_size,
+        }
+        try:
+            with metric_labels(file_type=inp.file_type, mode=inp.mode):
+                for elements, next_start in iter_partition_pdf(**part_inp):
+                    with stage_timer("serialize"):
+                        partitions = convert_to_isd(elements)
+                    yield UnstructuredOutput(partitions=partitions, next_start=next_start)
+        except Exception as e:
+            logger.exception(f"error in partition filename=[{inp.filename}] err=")
+            yield UnstructuredOutput(status_code=400, status_message=str(e))
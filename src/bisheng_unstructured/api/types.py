@@ -22,6 +22,12 @@ class UnstructuredOutput(BaseModel):
     html_text: Optional[str] = None
     partitions: List[Dict[str, Any]] = []
     b64_pdf: Optional[str] = None
+    # 分页解析时, 下一次请求的起始页
+    next_start: Optional[int] = None
+    # 流式解析时, 用于单独获取pdf文件
+    pdf_id: Optional[str] = None
+    # parameters.debug_timings 时各阶段和模型调用的耗时
+    timings: Optional[List[Dict[str, Any]]] = None
 
 
 class ConfigInput(BaseModel):
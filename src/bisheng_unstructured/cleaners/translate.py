@@ -1,12 +1,23 @@
+import threading
 import warnings
-from typing import List, Optional
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
 
 import langdetect
+import torch
+from langdetect.lang_detect_exception import LangDetectException
 from transformers import MarianMTModel, MarianTokenizer
 
+from bisheng_unstructured.documents.elements import Element, Text
 from bisheng_unstructured.nlp.tokenize import sent_tokenize
 from bisheng_unstructured.staging.huggingface import chunk_by_attention_window
 
+# NOTE - The opus-mt models are around 300MB each, a few language pairs fit in memory
+DEFAULT_MAX_MODELS = 4
+DEFAULT_MAX_MEMORY_MB = 2048
+DEFAULT_BATCH_SIZE = 8
+
 
 def _get_opus_mt_model_name(source_lang: str, target_lang: str):
     """Constructs the name of the MarianMT machine translation model based on the
@@ -21,6 +32,115 @@ def _validate_language_code(language_code: str):
         )
 
 
+def _model_size(model) -> int:
+    return sum(p.numel() * p.element_size() for p in model.parameters())
+
+
+class MarianModelCache:
+    """LRU cache of the loaded MarianMT models and tokenizers, keyed by the model name.
+
+    The least recently used models are evicted when there are more than `max_models`
+    models or their parameters take more than `max_memory_mb`. The model in use is
+    always kept, even if it alone is over the memory limit. A model is loaded once
+    outside the lock, the other callers of the same model wait for it.
+    """
+
+    def __init__(
+        self,
+        max_models: int = DEFAULT_MAX_MODELS,
+        max_memory_mb: int = DEFAULT_MAX_MEMORY_MB,
+        model_cls=MarianMTModel,
+        tokenizer_cls=MarianTokenizer,
+    ):
+        self.max_models = max_models
+        self.max_memory = max_memory_mb * 1024 * 1024
+        self.model_cls = model_cls
+        self.tokenizer_cls = tokenizer_cls
+        self._models: Dict[str, Tuple] = OrderedDict()
+        self._memory = 0
+        self._loading: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, model_name: str):
+        try:
+            tokenizer = self.tokenizer_cls.from_pretrained(model_name)
+            model = self.model_cls.from_pretrained(model_name)
+        except OSError:
+            raise ValueError(
+                f"Transformers could not find the translation model {model_name}. "
+                "The requested source/target language combo is not supported.",
+            )
+        model.eval()
+        return tokenizer, model
+
+    def get(self, model_name: str):
+        """Returns the `(tokenizer, model)` of the model name, loads it on a miss."""
+        with self._lock:
+            if model_name in self._models:
+                self._models.move_to_end(model_name)
+                tokenizer, model, _ = self._models[model_name]
+                return tokenizer, model
+
+            loading = self._loading.get(model_name)
+            if loading is not None:
+                owner = False
+            else:
+                owner = True
+                loading = self._loading[model_name] = Future()
+
+        if not owner:
+            return loading.result()
+
+        try:
+            tokenizer, model = self._load(model_name)
+        except Exception as e:
+            with self._lock:
+                del self._loading[model_name]
+            loading.set_exception(e)
+            raise
+
+        size = _model_size(model)
+        with self._lock:
+            while self._models and (
+                len(self._models) >= self.max_models or self._memory + size > self.max_memory
+            ):
+                _, (_, _, evicted_size) = self._models.popitem(last=False)
+                self._memory -= evicted_size
+
+            self._models[model_name] = (tokenizer, model, size)
+            self._memory += size
+            del self._loading[model_name]
+        loading.set_result((tokenizer, model))
+        return tokenizer, model
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._memory = 0
+
+
+_model_cache = MarianModelCache()
+
+
+def _detect_source_lang(text: str, source_lang: Optional[str]) -> Optional[str]:
+    """Returns the source language, None if it's not given and can't be detected."""
+    if source_lang is not None:
+        _source_lang = source_lang
+    else:
+        try:
+            _source_lang = langdetect.detect(text)
+        except LangDetectException:
+            # e.g. the numbers and the symbols have no language
+            return None
+    # NOTE(robinson) - Chinese gets detected with codes zh-cn, zh-tw, zh-hk for various
+    # Chinese variants. We normalizes these because there is a single model for Chinese
+    # machine translation
+    if _source_lang.startswith("zh"):
+        _source_lang = "zh"
+    _validate_language_code(_source_lang)
+    return _source_lang
+
+
 def translate_text(text, source_lang: Optional[str] = None, target_lang: str = "en") -> str:
     """Translates the foreign language text. If the source language is not specified, the
     function will attempt to detect it using langdetect.
@@ -35,52 +155,102 @@ def translate_text(text, source_lang: Optional[str] = None, target_lang: str = "
         The two letter language code for the language of the input text. If source_lang is
         not provided, the function will try to detect it.
     """
-    if text.strip() == "":
-        return text
+    return translate_texts([text], source_lang=source_lang, target_lang=target_lang)[0]
 
-    _source_lang: str = source_lang if source_lang is not None else langdetect.detect(text)
-    # NOTE(robinson) - Chinese gets detected with codes zh-cn, zh-tw, zh-hk for various
-    # Chinese variants. We normalizes these because there is a single model for Chinese
-    # machine translation
-    if _source_lang.startswith("zh"):
-        _source_lang = "zh"
 
+def translate_texts(
+    texts: List[str],
+    source_lang: Optional[str] = None,
+    target_lang: str = "en",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> List[str]:
+    """Translates a list of texts. The texts are split into chunks that fit into the
+    attention window and the chunks of all texts with the same source language are
+    translated together in padded batches.
+
+    Parameters
+    ----------
+    texts: List[str]
+        The texts to translate
+    source_lang: Optional[str]
+        The two letter language code of the texts. If source_lang is not provided, the
+        language of each text is detected, the texts without a detectable language, e.g.
+        numbers, are kept as they are.
+    target_lang: str
+        The two letter language code for the target langague. Defaults to "en".
+    batch_size: int
+        The number of chunks generated at once.
+    """
     _validate_language_code(target_lang)
-    _validate_language_code(_source_lang)
 
-    if target_lang == _source_lang:
-        return text
+    results = list(texts)
+    texts_by_lang: Dict[str, List[int]] = {}
+    for i, text in enumerate(texts):
+        if text.strip() == "":
+            continue
+        _source_lang = _detect_source_lang(text, source_lang)
+        if _source_lang is not None and _source_lang != target_lang:
+            texts_by_lang.setdefault(_source_lang, []).append(i)
 
-    model_name = _get_opus_mt_model_name(_source_lang, target_lang)
+    for _source_lang, indexes in texts_by_lang.items():
+        model_name = _get_opus_mt_model_name(_source_lang, target_lang)
+        tokenizer, model = _model_cache.get(model_name)
 
-    try:
-        tokenizer = MarianTokenizer.from_pretrained(model_name)
-        model = MarianMTModel.from_pretrained(model_name)
-    except OSError:
-        raise ValueError(
-            f"Transformers could not find the translation model {model_name}. "
-            "The requested source/target language combo is not supported.",
-        )
+        chunks: List[str] = []
+        spans: List[Tuple[int, int]] = []
+        for i in indexes:
+            text_chunks = chunk_by_attention_window(
+                texts[i], tokenizer, split_function=sent_tokenize
+            )
+            spans.append((len(chunks), len(chunks) + len(text_chunks)))
+            chunks.extend(text_chunks)
+
+        translated_chunks = _translate_chunks(chunks, model, tokenizer, batch_size)
+        for i, (start, end) in zip(indexes, spans):
+            results[i] = " ".join(translated_chunks[start:end])
+
+    return results
 
-    chunks: List[str] = chunk_by_attention_window(text, tokenizer, split_function=sent_tokenize)
 
-    translated_chunks: List[str] = []
-    for chunk in chunks:
-        translated_chunks.append(_translate_text(text, model, tokenizer))
+def translate_elements(
+    elements: List[Element],
+    source_lang: Optional[str] = None,
+    target_lang: str = "en",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> List[Element]:
+    """Translates the text of the text elements in place with `translate_texts`."""
+    text_elements = [el for el in elements if isinstance(el, Text)]
+    translated = translate_texts(
+        [el.text for el in text_elements],
+        source_lang=source_lang,
+        target_lang=target_lang,
+        batch_size=batch_size,
+    )
+    for element, text in zip(text_elements, translated):
+        element.text = text
+    return elements
 
-    return " ".join(translated_chunks)
 
+def _translate_chunks(chunks: List[str], model, tokenizer, batch_size: int) -> List[str]:
+    """Translates the chunks in batches. The chunks are sorted by length so each batch
+    is padded to similar lengths."""
+    order = sorted(range(len(chunks)), key=lambda i: len(chunks[i]))
+    translated: List[Optional[str]] = [None] * len(chunks)
+    for start in range(0, len(order), batch_size):
+        batch_ids = order[start : start + batch_size]
+        outputs = _translate_text([chunks[i] for i in batch_ids], model, tokenizer)
+        for i, output in zip(batch_ids, outputs):
+            translated[i] = output
+    return translated
 
-def _translate_text(text, model, tokenizer):
-    """Translates text using the specified model and tokenizer."""
+
+def _translate_text(texts: List[str], model, tokenizer) -> List[str]:
+    """Translates a batch of texts using the specified model and tokenizer."""
+    inputs = tokenizer(texts, return_tensors="pt", padding=True, truncation=True, max_length=512)
     # NOTE(robinson) - Suppresses the HuggingFace UserWarning resulting from the "max_length"
     # key in the MarianMT config. The warning states that "max_length" will be deprecated
     # in transformers v5
-    with warnings.catch_warnings():
+    with warnings.catch_warnings(), torch.no_grad():
         warnings.simplefilter("ignore")
-        translated = model.generate(
-            **tokenizer([text], return_tensors="pt", padding="max_length", max_length=512),
-        )
-    return [tokenizer.decode(t, max_new_tokens=512, skip_special_tokens=True) for t in translated][
-        0
-    ]
+        translated = model.generate(**inputs, max_new_tokens=512)
+    return tokenizer.batch_decode(translated, skip_special_tokens=True)
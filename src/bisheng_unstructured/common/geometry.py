@@ -0,0 +1,109 @@
+"""Pairwise box geometry with numpy broadcasting.
+
+Boxes are given either as rects `[x0, y0, x1, y1]` or as quads
+`[x0, y0, x1, y1, x2, y2, x3, y3]`. Axis aligned boxes are computed in a
+vectorized way, shapely is only used for the pairs with a rotated quad.
+"""
+import numpy as np
+from shapely import Polygon
+
+
+def to_quads(boxes) -> np.ndarray:
+    """Convert rects or quads into the quads array with shape (n, 8)"""
+    arr = np.asarray(boxes, dtype=np.float64)
+    if arr.size == 0:
+        return np.zeros((0, 8))
+    arr = arr.reshape((len(arr), -1))
+    if arr.shape[1] == 4:
+        x0, y0, x1, y1 = arr[:, 0], arr[:, 1], arr[:, 2], arr[:, 3]
+        arr = np.stack([x0, y0, x1, y0, x1, y1, x0, y1], axis=1)
+    return arr
+
+
+def is_axis_aligned(quads, tol=1e-6) -> np.ndarray:
+    """Whether each quad is an axis aligned rectangle"""
+    xs, ys = quads[:, 0::2], quads[:, 1::2]
+    # tl-tr and bl-br share y, tl-bl and tr-br share x, or the rotated order
+    c0 = (np.abs(ys[:, 0] - ys[:, 1]) <= tol) & (np.abs(ys[:, 2] - ys[:, 3]) <= tol)
+    c0 &= (np.abs(xs[:, 0] - xs[:, 3]) <= tol) & (np.abs(xs[:, 1] - xs[:, 2]) <= tol)
+    c1 = (np.abs(xs[:, 0] - xs[:, 1]) <= tol) & (np.abs(xs[:, 2] - xs[:, 3]) <= tol)
+    c1 &= (np.abs(ys[:, 0] - ys[:, 3]) <= tol) & (np.abs(ys[:, 1] - ys[:, 2]) <= tol)
+    return c0 | c1
+
+
+def _hori_rects(quads) -> np.ndarray:
+    xs, ys = quads[:, 0::2], quads[:, 1::2]
+    return np.stack([xs.min(1), ys.min(1), xs.max(1), ys.max(1)], axis=1)
+
+
+def _polygons(quads, inds):
+    polys = {}
+    for i in inds:
+        polys[i] = Polygon(quads[i].reshape((4, 2)))
+    return polys
+
+
+def _areas(quads, rects, aligned) -> np.ndarray:
+    areas = (rects[:, 2] - rects[:, 0]) * (rects[:, 3] - rects[:, 1])
+    for i, poly in _polygons(quads, np.flatnonzero(~aligned)).items():
+        areas[i] = poly.area
+    return areas
+
+
+def _inter_union(boxes0, boxes1, with_union=False):
+    quads0, quads1 = to_quads(boxes0), to_quads(boxes1)
+    rects0, rects1 = _hori_rects(quads0), _hori_rects(quads1)
+    aligned0, aligned1 = is_axis_aligned(quads0), is_axis_aligned(quads1)
+    areas0 = _areas(quads0, rects0, aligned0)
+    areas1 = _areas(quads1, rects1, aligned1)
+
+    w = np.minimum(rects0[:, None, 2], rects1[None, :, 2])
+    w -= np.maximum(rects0[:, None, 0], rects1[None, :, 0])
+    h = np.minimum(rects0[:, None, 3], rects1[None, :, 3])
+    h -= np.maximum(rects0[:, None, 1], rects1[None, :, 1])
+    inter = np.clip(w, 0, None) * np.clip(h, 0, None)
+
+    union = None
+    if with_union:
+        union = areas0[:, None] + areas1[None, :] - inter
+
+    # fallback to shapely for the pairs with rotated quad which really overlap
+    rot0, rot1 = np.flatnonzero(~aligned0), np.flatnonzero(~aligned1)
+    if len(rot0) or len(rot1):
+        pairs = set()
+        for i in rot0:
+            pairs.update((i, j) for j in np.flatnonzero(inter[i] > 0))
+        for j in rot1:
+            pairs.update((i, j) for i in np.flatnonzero(inter[:, j] > 0))
+        polys0 = _polygons(quads0, set(i for i, _ in pairs))
+        polys1 = _polygons(quads1, set(j for _, j in pairs))
+        for i, j in pairs:
+            inter[i, j] = polys0[i].intersection(polys1[j]).area
+            if with_union:
+                union[i, j] = polys0[i].union(polys1[j]).area
+
+    return inter, union, areas0, areas1
+
+
+def _safe_divide(a, b) -> np.ndarray:
+    out = np.zeros_like(a)
+    np.divide(a, b, out=out, where=b > 0)
+    return out
+
+
+def intersection_matrix(boxes0, boxes1) -> np.ndarray:
+    """Intersection area of each pair, shape (n0, n1)"""
+    inter, _, _, _ = _inter_union(boxes0, boxes1)
+    return inter
+
+
+def contain_matrix(boxes0, boxes1) -> np.ndarray:
+    """Ratio of each box in boxes1 covered by each box in boxes0, shape (n0, n1)"""
+    inter, _, _, areas1 = _inter_union(boxes0, boxes1)
+    return _safe_divide(inter, np.broadcast_to(areas1[None, :], inter.shape))
+
+
+def iou_matrix(boxes0, boxes1) -> np.ndarray:
+    """Intersection over union of each pair, shape (n0, n1)"""
+    inter, union, _, _ = _inter_union(boxes0, boxes1, with_union=True)
+    return _safe_divide(inter, union)
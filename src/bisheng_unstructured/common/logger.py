@@ -1,5 +1,7 @@
+import contextvars
 import logging
 import sys
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Optional
 
@@ -10,6 +12,8 @@ from rich.logging import RichHandler
 
 VALID_LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL", "EXCEPTION"]
 
+_trace_id_var = contextvars.ContextVar("trace_id", default=None)
+
 
 def serialize(record):
     subset = {
@@ -54,6 +58,21 @@ def configure(logger_conf: "LoggerConf"):
     logger.debug(f"Logger set up with log level: {log_level}")
 
 
+@contextmanager
+def trace_context(trace_id: str):
+    """Set the trace_id of the logs in the block, read it back with `get_trace_id`"""
+    token = _trace_id_var.set(trace_id)
+    try:
+        with logger.contextualize(trace_id=trace_id):
+            yield
+    finally:
+        _trace_id_var.reset(token)
+
+
+def get_trace_id() -> Optional[str]:
+    return _trace_id_var.get()
+
+
 class InterceptHandler(logging.Handler):
     def emit(self, record):
         # 获取对应的 Loguru 级别
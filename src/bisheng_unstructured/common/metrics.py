@@ -0,0 +1,322 @@
+"""Process metrics in the prometheus text exposition format.
+
+A small registry of counters, gauges and histograms, exported by the
+`/metrics` endpoint of the api without any external service. The labels
+of the document being parsed, e.g. the file type and mode, are kept in a
+context var, so the stage timings deep in the parsers are labelled without
+passing them around. The same timings are also collected per request with
+`collect_timings` for the debug output.
+"""
+import contextvars
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+_labels_var = contextvars.ContextVar("metric_labels", default={})
+_timings_var = contextvars.ContextVar("metric_timings", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric(object):
+    type_name = ""
+    # the value exported by a metric without labels before any update
+    initial_value = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        self._function = None
+        if not self.labelnames and self.initial_value is not None:
+            self._values[()] = self.initial_value
+
+    def set_function(self, func: Callable[[], Dict[Tuple, float]]):
+        """Read the values at export, `func` returns the values keyed by the label values"""
+        self._function = func
+
+    def _snapshot(self) -> List[Tuple[Tuple, float]]:
+        if self._function is not None:
+            return sorted(self._function().items())
+        with self._lock:
+            return sorted(self._values.items())
+
+    def _key(self, labels: Dict) -> Tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"metric [{self.name}] expects labels {self.labelnames}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _samples(self) -> List[Tuple[str, Tuple, Tuple, float]]:
+        raise NotImplementedError
+
+    def expose(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, names, values, value in self._samples():
+            labels = _format_labels(names, values)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+    initial_value = 0.0
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self):
+        return [("_total", self.labelnames, key, value) for key, value in self._snapshot()]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+    initial_value = 0.0
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self):
+        return [("", self.labelnames, key, value) for key, value in self._snapshot()]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(time.time() - start, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self._values.items())
+
+        samples = []
+        bucket_names = self.labelnames + ("le",)
+        for key, (counts, total) in items:
+            acc = 0
+            for bound, count in zip(self.buckets, counts):
+                acc += count
+                samples.append(("_bucket", bucket_names, key + (_format_value(bound),), acc))
+            samples.append(("_count", self.labelnames, key, acc))
+            samples.append(("_sum", self.labelnames, key, total))
+        return samples
+
+
+class Registry(object):
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric [{metric.name}] already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def expose(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.expose() for m in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "bisheng_uns_stage_seconds",
+    "Time spent in each stage of the parsing",
+    ["stage", "file_type", "mode"],
+)
+MODEL_SECONDS = REGISTRY.histogram(
+    "bisheng_uns_model_seconds",
+    "Time of the model endpoint calls",
+    ["endpoint", "status", "file_type", "mode"],
+)
+MODEL_INFLIGHT = REGISTRY.gauge(
+    "bisheng_uns_model_inflight", "Running calls of the model endpoints", ["endpoint"]
+)
+
+
+@contextmanager
+def metric_labels(**labels):
+    """Label the stage timings of the code in the block, e.g. file_type and mode"""
+    token = _labels_var.set({**_labels_var.get(), **labels})
+    try:
+        yield
+    finally:
+        _labels_var.reset(token)
+
+
+def _context_labels() -> Dict:
+    labels = _labels_var.get()
+    return {"file_type": labels.get("file_type", ""), "mode": labels.get("mode", "")}
+
+
+@contextmanager
+def collect_timings():
+    """Record the stage and model timings of the block in a list.
+
+    Each record has the stage, the page if the `page` label is set and the
+    seconds. A nested block shares the list of the outer one.
+    """
+    timings = _timings_var.get()
+    if timings is not None:
+        yield timings
+        return
+
+    timings = []
+    token = _timings_var.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings_var.reset(token)
+
+
+def _record(stage: str, seconds: float, **extra):
+    timings = _timings_var.get()
+    if timings is not None:
+        page = _labels_var.get().get("page")
+        timings.append({"stage": stage, "page": page, "seconds": round(seconds, 6), **extra})
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Observe the time of the block as `stage` of the current document"""
+    start = time.time()
+    try:
+        yield
+    finally:
+        elapse = time.time() - start
+        STAGE_SECONDS.observe(elapse, stage=stage, **_context_labels())
+        _record(stage, elapse)
+
+
+@contextmanager
+def model_timer(endpoint: str):
+    """Observe the time and the in-flight count of a model call"""
+    status = "ok"
+    start = time.time()
+    MODEL_INFLIGHT.inc(endpoint=endpoint)
+    try:
+        yield
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        elapse = time.time() - start
+        MODEL_INFLIGHT.dec(endpoint=endpoint)
+        MODEL_SECONDS.observe(elapse, endpoint=endpoint, status=status, **_context_labels())
+        _record("model", elapse, endpoint=endpoint, status=status)
+
+
+def timed(stage: str):
+    """Decorator of `stage_timer`"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,341 @@
+"""Convert the office documents with long-lived LibreOffice processes.
+
+Starting `soffice` for every file costs seconds, most of it spent before the
+document is even loaded. The pool keeps a few headless instances running,
+each with its own profile, and sends the conversions to them over a local
+pipe with the UNO bridge. A worker is checked before every job, restarted
+after `max_jobs` conversions and killed when a job runs over the timeout.
+
+Without the `uno` module or with the pool disabled, every conversion runs
+the `soffice --convert-to` command line as before.
+"""
+import atexit
+import os
+import queue
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Optional, Tuple
+
+from loguru import logger
+
+from bisheng_unstructured.common.metrics import stage_timer
+from bisheng_unstructured.config.settings import settings
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    from com.sun.star.connection import NoConnectException
+except ImportError:
+    uno = None
+
+SOFFICE_CMD = "soffice"
+
+SOFFICE_NOT_FOUND = """soffice command was not found. Please install libreoffice
+on your system and try again.
+
+- Install instructions: https://www.libreoffice.org/get-help/install-howto/
+- Mac: https://formulae.brew.sh/cask/libreoffice
+- Debian: https://wiki.debian.org/LibreOffice"""
+
+TEXT_DOC = "com.sun.star.text.GenericTextDocument"
+SHEET_DOC = "com.sun.star.sheet.SpreadsheetDocument"
+PRESENTATION_DOC = "com.sun.star.presentation.PresentationDocument"
+DRAWING_DOC = "com.sun.star.drawing.DrawingDocument"
+
+# the export filter picked by `--convert-to {ext}` for each type of document,
+# the presentations are drawings too, so they come first
+EXPORT_FILTERS = {
+    "pdf": [
+        (PRESENTATION_DOC, "impress_pdf_Export"),
+        (TEXT_DOC, "writer_pdf_Export"),
+        (SHEET_DOC, "calc_pdf_Export"),
+        (DRAWING_DOC, "draw_pdf_Export"),
+    ],
+    "docx": [(TEXT_DOC, "MS Word 2007 XML")],
+    "xlsx": [(SHEET_DOC, "Calc MS Excel 2007 XML")],
+    "pptx": [(PRESENTATION_DOC, "Impress MS PowerPoint 2007 XML")],
+    "html": [
+        (PRESENTATION_DOC, "impress_html_Export"),
+        (TEXT_DOC, "HTML (StarWriter)"),
+        (SHEET_DOC, "HTML (StarCalc)"),
+    ],
+}
+
+
+class OfficeStartError(Exception):
+    pass
+
+
+def parse_target_format(target_format: str) -> Tuple[str, Optional[str]]:
+    """Split `ext[:filter]` of `--convert-to`"""
+    ext, _, filter_name = target_format.partition(":")
+    return ext, filter_name or None
+
+
+def output_path(input_file: str, output_dir: str, target_format: str) -> str:
+    ext, _ = parse_target_format(target_format)
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(output_dir, f"{base_name}.{ext}")
+
+
+def _kill(proc: subprocess.Popen):
+    try:
+        os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+    proc.wait()
+
+
+def convert_with_cli(
+    input_file: str, output_dir: str, target_format: str = "pdf", timeout: int = 30
+) -> str:
+    """Convert with a new soffice process and a throwaway profile"""
+    with tempfile.TemporaryDirectory() as profile_dir:
+        cmd = [
+            SOFFICE_CMD,
+            "--headless",
+            "--invisible",
+            "--norestore",
+            "-env:SingleAppInstance=false",
+            f"-env:UserInstallation=file://{profile_dir}",
+            "--convert-to",
+            target_format,
+            "--outdir",
+            output_dir,
+            input_file,
+        ]
+        try:
+            p = subprocess.Popen(
+                cmd, preexec_fn=os.setsid, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+        except FileNotFoundError:
+            raise FileNotFoundError(SOFFICE_NOT_FOUND)
+
+        try:
+            stdout, stderr = p.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _kill(p)
+            raise Exception(f"timeout in converting [{input_file}] to {target_format}")
+
+    out_file = output_path(input_file, output_dir, target_format)
+    if p.returncode != 0 or not os.path.exists(out_file):
+        raise Exception(
+            f"err in converting [{input_file}] to {target_format}: return code is "
+            f"{p.returncode}, stderr: {stderr}, stdout: {stdout}"
+        )
+    return out_file
+
+
+def _props(**kwargs):
+    props = []
+    for name, value in kwargs.items():
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        props.append(prop)
+    return tuple(props)
+
+
+class OfficeWorker(object):
+    """A headless soffice process listening on a named pipe"""
+
+    def __init__(self, index: int, profile_root: str, start_timeout: float = 30):
+        self.pipe_name = f"bisheng_uns_office_{os.getpid()}_{index}"
+        self.profile_dir = os.path.join(profile_root, f"profile_{index}")
+        self.start_timeout = start_timeout
+        self.proc = None
+        self.desktop = None
+        self.jobs = 0
+
+    def start(self):
+        cmd = [
+            SOFFICE_CMD,
+            "--headless",
+            "--invisible",
+            "--norestore",
+            "--nologo",
+            "--nodefault",
+            "--nolockcheck",
+            f"-env:UserInstallation={uno.systemPathToFileUrl(self.profile_dir)}",
+            f"--accept=pipe,name={self.pipe_name};urp;StarOffice.ComponentContext",
+        ]
+        try:
+            self.proc = subprocess.Popen(
+                cmd, preexec_fn=os.setsid, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+        except FileNotFoundError:
+            raise OfficeStartError(SOFFICE_NOT_FOUND)
+
+        local_ctx = uno.getComponentContext()
+        resolver = local_ctx.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_ctx
+        )
+        url = f"uno:pipe,name={self.pipe_name};urp;StarOffice.ComponentContext"
+        deadline = time.time() + self.start_timeout
+        while True:
+            if self.proc.poll() is not None:
+                raise OfficeStartError(f"soffice exited with code {self.proc.returncode}")
+            try:
+                ctx = resolver.resolve(url)
+                break
+            except NoConnectException:
+                if time.time() > deadline:
+                    self.stop()
+                    raise OfficeStartError(f"soffice not ready in {self.start_timeout}s")
+                time.sleep(0.1)
+
+        self.desktop = ctx.ServiceManager.createInstanceWithContext(
+            "com.sun.star.frame.Desktop", ctx
+        )
+        self.jobs = 0
+        logger.info(f"office worker started pipe=[{self.pipe_name}] pid=[{self.proc.pid}]")
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None and self.desktop is not None
+
+    def stop(self):
+        if self.proc is not None:
+            _kill(self.proc)
+        self.proc = None
+        self.desktop = None
+
+    def convert(self, input_file: str, output_dir: str, target_format: str = "pdf") -> str:
+        ext, filter_name = parse_target_format(target_format)
+        out_file = output_path(os.path.abspath(input_file), os.path.abspath(output_dir), ext)
+        in_url = uno.systemPathToFileUrl(os.path.abspath(input_file))
+        doc = self.desktop.loadComponentFromURL(in_url, "_blank", 0, _props(Hidden=True))
+        if doc is None:
+            raise Exception(f"failed to load [{input_file}]")
+
+        try:
+            if filter_name is None:
+                for service, name in EXPORT_FILTERS.get(ext, []):
+                    if doc.supportsService(service):
+                        filter_name = name
+                        break
+                else:
+                    raise Exception(f"no filter to convert [{input_file}] to {ext}")
+            out_url = uno.systemPathToFileUrl(out_file)
+            doc.storeToURL(out_url, _props(FilterName=filter_name, Overwrite=True))
+        finally:
+            doc.close(True)
+        return out_file
+
+
+class OfficePool(object):
+    """Run the conversions on `size` long-lived soffice workers"""
+
+    def __init__(
+        self,
+        size: int = 2,
+        max_jobs: int = 200,
+        timeout: float = 30,
+        start_timeout: float = 30,
+        profile_root: Optional[str] = None,
+        worker_cls=OfficeWorker,
+    ):
+        if not profile_root:
+            profile_root = os.path.join(tempfile.gettempdir(), "bisheng_uns_office")
+        profile_root = os.path.join(profile_root, str(os.getpid()))
+        os.makedirs(profile_root, exist_ok=True)
+
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.workers = [worker_cls(i, profile_root, start_timeout) for i in range(size)]
+        self._idle = queue.Queue()
+        for worker in self.workers:
+            self._idle.put(worker)
+
+    def convert(
+        self,
+        input_file: str,
+        output_dir: str,
+        target_format: str = "pdf",
+        timeout: Optional[float] = None,
+    ) -> str:
+        timeout = timeout or self.timeout
+        worker = self._idle.get()
+        try:
+            if not worker.alive():
+                worker.stop()
+                worker.start()
+
+            # the calls into soffice block, run them aside to keep the timeout, a thread
+            # per job as the thread of a killed worker may take a while to return
+            future = Future()
+            threading.Thread(
+                target=self._run,
+                args=(future, worker, input_file, output_dir, target_format),
+                daemon=True,
+            ).start()
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
+                logger.warning(f"office worker hung on [{input_file}], restart it")
+                worker.stop()
+                raise Exception(f"timeout in converting [{input_file}] to {target_format}")
+            except Exception:
+                # the failed document may leave the worker in a bad state
+                worker.stop()
+                raise
+        finally:
+            worker.jobs += 1
+            if worker.jobs >= self.max_jobs:
+                worker.stop()
+            self._idle.put(worker)
+
+    @staticmethod
+    def _run(future: Future, worker, input_file: str, output_dir: str, target_format: str):
+        try:
+            future.set_result(worker.convert(input_file, output_dir, target_format))
+        except Exception as e:
+            future.set_exception(e)
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_office_pool() -> Optional[OfficePool]:
+    """The pool of the process, None if disabled or the uno module is missing"""
+    global _pool
+    conf = settings.office_pool_conf
+    if not conf.enable or uno is None:
+        return None
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = OfficePool(
+                size=conf.size,
+                max_jobs=conf.max_jobs,
+                timeout=conf.timeout,
+                start_timeout=conf.start_timeout,
+                profile_root=conf.profile_root,
+            )
+            atexit.register(_pool.close)
+        return _pool
+
+
+def office_convert(input_file: str, output_dir: str, target_format: str = "pdf") -> str:
+    """Same as `soffice --convert-to {target_format} --outdir {output_dir} {input_file}`.
+
+    Return the path of the converted file.
+    """
+    timeout = settings.office_pool_conf.timeout
+    pool = get_office_pool()
+    with stage_timer("soffice"):
+        if pool is not None:
+            try:
+                return pool.convert(input_file, output_dir, target_format, timeout=timeout)
+            except OfficeStartError as e:
+                logger.warning(f"office pool not available, convert with soffice command: {e}")
+        return convert_with_cli(input_file, output_dir, target_format, timeout=timeout)
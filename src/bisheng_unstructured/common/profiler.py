@@ -0,0 +1,96 @@
+"""Profile a single call, to find out why a document is slow.
+
+`cProfile` only follows the calling thread, while the pages of a pdf are
+parsed in the worker threads. So a sampler thread also takes the stacks of
+all threads every `interval` seconds, the samples are written in the folded
+format of the flame graph tools. The samples cover every thread of the
+process, including the other requests running at the same time.
+"""
+import cProfile
+import os
+import sys
+import tempfile
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+from loguru import logger
+
+from bisheng_unstructured.config.settings import settings
+
+
+class StackSampler(object):
+    """Count the stacks of all threads every `interval` seconds"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.counts = Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="stack_sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    filename = os.path.basename(code.co_filename)
+                    stack.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def dump(self, file_path: str):
+        with open(file_path, "w", encoding="utf-8") as fout:
+            for stack, count in self.counts.most_common():
+                fout.write(f"{stack} {count}\n")
+
+
+def profile_enabled(parameters: Dict) -> bool:
+    """Whether to profile the request, only with the profile_conf enabled and the right token"""
+    conf = settings.profile_conf
+    if not conf.enable or not parameters.get("profile"):
+        return False
+    if conf.token and parameters.get("profile_token") != conf.token:
+        logger.warning("profile is rejected, the profile_token is wrong")
+        return False
+    return True
+
+
+def profile_call(name: str, func, *args, root: Optional[str] = None, **kwargs):
+    """Run `func` under the profilers, save `{root}/{name}.prof` and `{root}/{name}.folded`.
+
+    The `.prof` file is read by `pstats`, the `.folded` file by the flame graph tools.
+    """
+    conf = settings.profile_conf
+    root = root or conf.root or os.path.join(tempfile.gettempdir(), "bisheng_uns_profiles")
+    os.makedirs(root, exist_ok=True)
+
+    prof = cProfile.Profile()
+    sampler = StackSampler(conf.interval_ms / 1000)
+    sampler.start()
+    prof.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        prof.disable()
+        sampler.stop()
+        base = os.path.join(root, name)
+        prof.dump_stats(f"{base}.prof")
+        sampler.dump(f"{base}.folded")
+        logger.info(f"profile saved to [{base}.prof] and [{base}.folded]")
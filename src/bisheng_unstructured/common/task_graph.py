@@ -0,0 +1,90 @@
+"""A small dependency graph of blocking calls.
+
+The model calls of a page are independent or depend on a few others, each
+call is started in a shared thread pool as soon as its dependencies are done.
+"""
+import contextvars
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Optional
+
+_executors = {}
+_executor_lock = threading.Lock()
+# the pool of the task running in the thread
+_local = threading.local()
+
+
+def get_graph_executor(name: str = "page", max_workers: int = 32) -> ThreadPoolExecutor:
+    """The thread pool shared by the graphs of the process with the same name.
+
+    The tasks of a graph run by a task of another graph, e.g. the tables of a
+    page, take another pool, the threads of a busy pool never wait on it.
+    """
+    with _executor_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix=f"task_graph_{name}"
+            )
+        return _executors[name]
+
+
+def _run_in_pool(executor: ThreadPoolExecutor, func: Callable, *args):
+    _local.executor = executor
+    return func(*args)
+
+
+class TaskGraph(object):
+    """Run the tasks as soon as their dependencies are done.
+
+    A task gets the results of its dependencies as positional args in the order
+    of `deps`, the dependencies must be added before the task. The first error
+    of a task is raised by `run`. A graph run by a task of the same pool runs
+    its tasks one by one in the calling thread instead of waiting on the pool.
+    """
+
+    def __init__(self, executor: Optional[ThreadPoolExecutor] = None):
+        self.executor = executor or get_graph_executor()
+        self._tasks = {}
+
+    def add(self, name: str, func: Callable, deps: Iterable[str] = ()) -> "TaskGraph":
+        deps = tuple(deps)
+        for dep in deps:
+            if dep not in self._tasks:
+                raise ValueError(f"unknown dependency [{dep}] of task [{name}]")
+        self._tasks[name] = (func, deps)
+        return self
+
+    def _run_inline(self) -> Dict[str, Any]:
+        results = {}
+        for name, (func, deps) in self._tasks.items():
+            results[name] = func(*[results[d] for d in deps])
+        return results
+
+    def run(self) -> Dict[str, Any]:
+        if getattr(_local, "executor", None) is self.executor:
+            return self._run_inline()
+
+        results = {}
+        waiting = dict(self._tasks)
+        running = {}
+        while waiting or running:
+            ready = [n for n, (_, deps) in waiting.items() if all(d in results for d in deps)]
+            for name in ready:
+                func, deps = waiting.pop(name)
+                args = [results[d] for d in deps]
+                # keep the contextual vars, e.g. the logger trace_id, in the pool
+                ctx = contextvars.copy_context()
+                future = self.executor.submit(ctx.run, _run_in_pool, self.executor, func, *args)
+                running[future] = name
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception:
+                    for other in running:
+                        other.cancel()
+                    raise
+
+        return results
@@ -40,6 +40,24 @@ class PdfModelParams(BaseModel):
     rowcol_model_ep: Optional[str]
     table_model_ep: Optional[str]
     ocr_model_ep: Optional[str]
+    # 模型请求的超时时间, 单位秒
+    timeout: int = 60
+    # 版面分析和表格检测把并发的页面合并为一次请求的最大页数, 1表示不合并, 需要模型支持batch
+    max_batch_size: int = 1
+    # 合并请求时等待其他页面的最长时间, 单位毫秒
+    batch_wait_ms: float = 5
+    # 公式识别把一页的公式合并为一次请求的最大个数, 1表示不合并, 需要模型支持batch
+    formula_batch_size: int = 1
+    # 公式识别不合并时同时发送的最大请求数
+    formula_concurrency: int = 8
+
+
+class TopdfModelParams(BaseModel):
+    # txt/md/html 转 pdf 的方式, mupdf: 进程内用 pymupdf 排版, pandoc: pandoc/soffice/wkhtmltopdf
+    text_engine: str = "mupdf"
+    # mupdf 排版使用的字体文件, 为空时使用 mupdf 内置字体, 中文等缺失的字符使用内置的回退字体
+    font_file: Optional[str] = None
+    page_size: str = "a4"
 
 
 class OcrConf(BaseModel):
@@ -47,11 +65,71 @@ class OcrConf(BaseModel):
     scene_mapping: Optional[Dict]
 
 
+class ExecutorConf(BaseModel):
+    # only thread, the metrics, cache counters, trace_id and streams live in the api process
+    type: str = "thread"
+    max_workers: int = 4
+    max_queue_size: int = 16
+
+
+class PdfStoreConf(BaseModel):
+    root: Optional[str] = None
+    ttl: int = 3600
+
+
+class CacheConf(BaseModel):
+    enable: bool = False
+    # disk
+    backend: str = "disk"
+    root: Optional[str] = None
+    # 0 means no size limit
+    max_size_mb: int = 1024
+
+
+class LimiterConf(BaseModel):
+    enable: bool = False
+    initial_limit: int = 8
+    min_limit: int = 1
+    max_limit: int = 32
+    # recent latency over latency_ratio * long-term latency is taken as overloaded
+    latency_ratio: float = 2.0
+    # the lock files shared by the workers of the host, empty to disable
+    shared_dir: Optional[str] = None
+    shared_limit: int = 0
+
+
+class OfficePoolConf(BaseModel):
+    enable: bool = False
+    # the number of soffice processes
+    size: int = 2
+    # restart a process after max_jobs conversions
+    max_jobs: int = 200
+    timeout: int = 30
+    start_timeout: int = 30
+    # the profiles of the processes, empty to use the temp dir
+    profile_root: Optional[str] = None
+
+
+class ProfileConf(BaseModel):
+    enable: bool = False
+    # the profile_token of the request must match if set
+    token: Optional[str] = None
+    root: Optional[str] = None
+    interval_ms: float = 5
+
+
 class Settings(BaseSettings):
     logger_conf: LoggerConf = LoggerConf()
     pdf_model_params: PdfModelParams = PdfModelParams()
+    topdf_model_params: TopdfModelParams = TopdfModelParams()
     ocr_conf: OcrConf = OcrConf()
     is_all_ocr: bool = Field(default=False)
+    executor_conf: ExecutorConf = ExecutorConf()
+    pdf_store_conf: PdfStoreConf = PdfStoreConf()
+    cache_conf: CacheConf = CacheConf()
+    limiter_conf: LimiterConf = LimiterConf()
+    office_pool_conf: OfficePoolConf = OfficePoolConf()
+    profile_conf: ProfileConf = ProfileConf()
 
 
 def load_settings_from_yaml(file_path: str) -> Settings:
@@ -1,15 +1,13 @@
 from __future__ import annotations
 
 import sys
-from typing import List, Optional, Sequence, Tuple
+from typing import List, Optional, Sequence, Set, Tuple
 
 if sys.version_info < (3, 8):
     from typing_extensions import Final
 else:
     from typing import Final
 
-import numpy as np
-
 from bisheng_unstructured.cleaners.core import clean_bullets, replace_unicode_quotes
 from bisheng_unstructured.documents.base import Page
 from bisheng_unstructured.documents.elements import (
@@ -24,6 +22,7 @@ from bisheng_unstructured.documents.elements import (
     Text,
     Title,
 )
+from bisheng_unstructured.documents.markdown import find_outermost_tables
 from bisheng_unstructured.documents.xml import VALID_PARSERS, XMLDocument
 from bisheng_unstructured.partition.text_type import (
     is_bulleted_text,
@@ -241,7 +240,8 @@ class HTMLDocument(XMLDocument):
         page_number = 0
         page = Page(number=page_number)
         for article in articles:
-            descendanttag_elems: Tuple[etree.Element, ...] = ()
+            # the descendants of the last consumed element, a set for O(1) lookups
+            descendanttag_elems: Set[etree.Element] = set()
             for tag_elem in article.iter():
                 if tag_elem in descendanttag_elems:
                     # Prevent repeating something that's been flagged as text as we chase it
@@ -249,41 +249,19 @@ class HTMLDocument(XMLDocument):
                     continue
 
                 if tag_elem.tag == "table":
-                    tables = []
-                    emb_table = tag_elem.xpath(".//table")
-
-                    filtered_table = []
-                    groups = [tuple(e.iterdescendants()) for e in emb_table]
-                    n = len(groups)
-                    inds = list(range(n))
-                    inds = sorted(inds, key=lambda i: len(groups[i]))
-                    overlap = np.zeros((n, n))
-                    for i in range(n):
-                        for j in range(i + 1, n):
-                            ind_j, ind_i = inds[j], inds[i]
-                            g_j, g_i = groups[ind_j], groups[ind_i]
-                            b = np.all([n in g_j for n in g_i])
-                            if b:
-                                overlap[i, j] = b
-                                break
-
-                    for i in range(n):
-                        if np.sum(overlap[i, :]) == 0:
-                            filtered_table.append(emb_table[inds[i]])
-
-                    emb_table = filtered_table if filtered_table else [tag_elem]
+                    emb_table = find_outermost_tables(tag_elem) or [tag_elem]
                     for node in emb_table:
                         element = parse_table_element(node)
                         page.elements.append(element)
 
-                    descendanttag_elems = tuple(tag_elem.iterdescendants())
+                    descendanttag_elems = set(tag_elem.iterdescendants())
 
                 elif _is_text_tag(tag_elem):
                     element = _parse_tag(tag_elem, language)
                     if element is not None:
                         element.text = norm_text(element.text)
                         page.elements.append(element)
-                        descendanttag_elems = tuple(tag_elem.iterdescendants())
+                        descendanttag_elems = set(tag_elem.iterdescendants())
 
                         # print('text tag', element.tag, str(element), element.to_dict())
 
@@ -302,7 +280,7 @@ class HTMLDocument(XMLDocument):
                 elif _is_bulleted_table(tag_elem):
                     bulleted_text = _bulleted_text_from_table(tag_elem)
                     page.elements.extend(bulleted_text)
-                    descendanttag_elems = tuple(tag_elem.iterdescendants())
+                    descendanttag_elems = set(tag_elem.iterdescendants())
 
                 elif is_list_item_tag(tag_elem):
                     element, next_element = _process_list_item(tag_elem)
@@ -339,7 +317,8 @@ class HTMLDocument(XMLDocument):
         page = Page(number=page_number)
 
         for article in articles:
-            descendanttag_elems: Tuple[etree.Element, ...] = ()
+            # the descendants of the last consumed element, a set for O(1) lookups
+            descendanttag_elems: Set[etree.Element] = set()
             for tag_elem in article.iter():
                 if tag_elem in descendanttag_elems:
                     # Prevent repeating something that's been flagged as text as we chase it
@@ -350,7 +329,7 @@ class HTMLDocument(XMLDocument):
                     element = _parse_tag(tag_elem)
                     if element is not None:
                         page.elements.append(element)
-                        descendanttag_elems = tuple(tag_elem.iterdescendants())
+                        descendanttag_elems = set(tag_elem.iterdescendants())
 
                 elif _is_container_with_text(tag_elem):
                     links = _get_links_from_tag(tag_elem)
@@ -362,7 +341,7 @@ class HTMLDocument(XMLDocument):
                 elif _is_bulleted_table(tag_elem):
                     bulleted_text = _bulleted_text_from_table(tag_elem)
                     page.elements.extend(bulleted_text)
-                    descendanttag_elems = tuple(tag_elem.iterdescendants())
+                    descendanttag_elems = set(tag_elem.iterdescendants())
 
                 elif is_list_item_tag(tag_elem):
                     element, next_element = _process_list_item(tag_elem)
@@ -661,12 +640,10 @@ def _process_list_item(
     return None, None
 
 
-def _get_bullet_descendants(element, next_element) -> Tuple[etree.Element, ...]:
-    descendants = []
+def _get_bullet_descendants(element, next_element) -> Set[etree.Element]:
     if element is not None and next_element is not None:
-        descendants += list(next_element.iterdescendants())
-    descendanttag_elems = tuple(descendants)
-    return descendanttag_elems
+        return set(next_element.iterdescendants())
+    return set()
 
 
 def is_list_item_tag(tag_elem: etree.Element) -> bool:
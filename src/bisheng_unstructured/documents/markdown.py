@@ -1,3 +1,4 @@
+import html
 import re
 
 import lxml
@@ -41,6 +42,15 @@ def markdown_table(rows):
     return "\n".join(content)
 
 
+def markdown_row(cells) -> str:
+    return "| " + " | ".join(norm_text(c) for c in cells) + " |"
+
+
+def html_row(cells, tag="td") -> str:
+    tds = "".join(f"<{tag}>{html.escape(c, quote=False)}</{tag}>" for c in cells)
+    return f"<tr>{tds}</tr>"
+
+
 def transform_html_table_to_md(html_table_str, field_sep=" "):
     table_node = lxml.html.fromstring(html_table_str)
     rows = []
@@ -173,3 +183,25 @@ def clean_html_table(table_html):
         page_structure=False,
     )
     return cleaner.clean_html(table_html)
+
+
+def find_outermost_tables(table_elem):
+    """Find the tables inside `table_elem` that are not nested in another inner table.
+
+    The nesting is found by looking up the nearest table ancestor of each table, so
+    pages with many nested tables are handled in linear time. The tables are returned
+    with the smaller ones first. Empty tables are dropped unless all of them are empty.
+    """
+    tables = table_elem.xpath(".//table")
+    outermost = []
+    for index, table in enumerate(tables):
+        if len(table) == 0:
+            continue
+        parent_table = next(table.iterancestors("table"), None)
+        if parent_table is table_elem:
+            size = sum(1 for _ in table.iterdescendants())
+            outermost.append((size, index, table))
+
+    if not outermost:
+        return tables[-1:]
+    return [table for _, _, table in sorted(outermost, key=lambda t: t[:2])]
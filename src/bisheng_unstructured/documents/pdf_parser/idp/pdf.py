@@ -4,7 +4,6 @@ import base64
 import io
 import re
 from concurrent.futures import ThreadPoolExecutor
-from copy import deepcopy
 from dataclasses import dataclass
 from typing import Any, List, Optional, Union
 
@@ -25,6 +24,7 @@ from bisheng_unstructured.documents.elements import (
 from bisheng_unstructured.models.idp.ocr_agent import OCRAgent
 
 from bisheng_unstructured.documents.pdf_parser.blob import Blob
+from bisheng_unstructured.documents.pdf_parser.reading_order import order_by_tbyx
 
 ZH_CHAR = re.compile("[\u4e00-\u9fa5]")
 ENG_WORD = re.compile(pattern=r"^[a-zA-Z0-9?><;,{}[\]\-_+=!@#$%\^&*|']*$", flags=re.DOTALL)
@@ -80,27 +80,6 @@ def find_max_continuous_seq(arr):
     return max_info
 
 
-def order_by_tbyx(block_info, th=10):
-    """
-    block_info: [(b0, b1, b2, b3, text, x, y)+]
-    th: threshold of the position threshold
-    """
-    # sort using y1 first and then x1
-    res = sorted(block_info, key=lambda b: (b.bbox[1], b.bbox[0]))
-    for i in range(len(res) - 1):
-        for j in range(i, 0, -1):
-            # restore the order using the
-            bbox_jplus1 = res[j + 1].bbox
-            bbox_j = res[j].bbox
-            if abs(bbox_jplus1[1] - bbox_j[1]) < th and (bbox_jplus1[0] < bbox_j[0]):
-                tmp = deepcopy(res[j])
-                res[j] = deepcopy(res[j + 1])
-                res[j + 1] = deepcopy(tmp)
-            else:
-                break
-    return res
-
-
 def is_eng_word(word):
     return bool(ENG_WORD.search(word))
 
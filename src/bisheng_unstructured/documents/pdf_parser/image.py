@@ -4,16 +4,6 @@ from typing import List
 from bisheng_unstructured.documents.base import Page
 from bisheng_unstructured.documents.pdf_parser.blob import Blob
 from bisheng_unstructured.documents.pdf_parser.pdf import PDFDocument
-from bisheng_unstructured.models import (
-    LayoutAgent,
-    OCRAgent,
-    RTLayoutAgent,
-    RTOCRAgent,
-    RTTableAgent,
-    RTTableDetAgent,
-    TableAgent,
-    TableDetAgent,
-)
 
 # from bisheng_unstructured.common import Timer
 
@@ -32,18 +22,14 @@ class ImageDocument(PDFDocument):
         n_parallel: int = 10,
         **kwargs
     ) -> None:
-        super(ImageDocument, self).__init__(file=file, model_params=model_params)
-        rt_type = kwargs.get("rt_type", "sdk")
-        if rt_type in {"ocr_sdk", "idp", "sdk"}:
-            self.layout_agent = LayoutAgent(**model_params)
-            self.table_agent = TableAgent(**model_params)
-            self.ocr_agent = OCRAgent(**model_params)
-            self.table_det_agent = TableDetAgent(**model_params)
-        else:
-            self.layout_agent = RTLayoutAgent(**model_params)
-            self.table_agent = RTTableAgent(**model_params)
-            self.ocr_agent = RTOCRAgent(**model_params)
-            self.table_det_agent = RTTableDetAgent(**model_params)
+        super(ImageDocument, self).__init__(
+            file=file,
+            model_params=model_params,
+            with_columns=with_columns,
+            n_parallel=n_parallel,
+            agents=kwargs.get("agents"),
+            rt_type=kwargs.get("rt_type", "sdk"),
+        )
 
         self.with_columns = with_columns
         self.verbose = verbose
@@ -1,11 +1,13 @@
 """Loads PDF with semantic partition."""
 import base64
+import contextvars
+import functools
 import io
 import json
 import re
+import threading
 from collections import Counter
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from copy import deepcopy
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass
 from typing import Any, List, Optional, Union
 
@@ -14,10 +16,11 @@ import numpy as np
 import pypdfium2
 from loguru import logger
 from PIL import Image, ImageOps
-from shapely import Polygon
-from shapely import box as Rect
 
 from bisheng_unstructured.common import Timer
+from bisheng_unstructured.common.geometry import contain_matrix, iou_matrix
+from bisheng_unstructured.common.metrics import metric_labels, stage_timer, timed
+from bisheng_unstructured.common.task_graph import TaskGraph, get_graph_executor
 from bisheng_unstructured.config.settings import settings
 from bisheng_unstructured.documents.base import Document, Page
 from bisheng_unstructured.documents.elements import (
@@ -35,17 +38,9 @@ from bisheng_unstructured.documents.markdown import (
     transform_list_to_table,
 )
 from bisheng_unstructured.documents.pdf_parser.blob import Blob
-from bisheng_unstructured.models import (
-    FormulaAgent,
-    LayoutAgent,
-    OCRAgent,
-    RTLayoutAgent,
-    RTOCRAgent,
-    RTTableAgent,
-    RTTableDetAgent,
-    TableAgent,
-    TableDetAgent,
-)
+from bisheng_unstructured.documents.pdf_parser.reading_order import get_reading_order
+from bisheng_unstructured.models import AgentRegistry
+from bisheng_unstructured.models.common import save_pillow_to_bytes
 
 ZH_CHAR = re.compile("[\u4e00-\u9fa5]")
 ENG_WORD = re.compile(pattern=r"^[a-zA-Z0-9?><;,{}[\]\-_+=!@#$%\^&*|']*$", flags=re.DOTALL)
@@ -101,27 +96,6 @@ def find_max_continuous_seq(arr):
     return max_info
 
 
-def order_by_tbyx(block_info, th=10):
-    """
-    block_info: [(b0, b1, b2, b3, text, x, y)+]
-    th: threshold of the position threshold
-    """
-    # sort using y1 first and then x1
-    res = sorted(block_info, key=lambda b: (b.bbox[1], b.bbox[0]))
-    for i in range(len(res) - 1):
-        for j in range(i, 0, -1):
-            # restore the order using the
-            bbox_jplus1 = res[j + 1].bbox
-            bbox_j = res[j].bbox
-            if abs(bbox_jplus1[1] - bbox_j[1]) < th and (bbox_jplus1[0] < bbox_j[0]):
-                tmp = deepcopy(res[j])
-                res[j] = deepcopy(res[j + 1])
-                res[j + 1] = deepcopy(tmp)
-            else:
-                break
-    return res
-
-
 def is_eng_word(word):
     return bool(ENG_WORD.search(word))
 
@@ -168,6 +142,28 @@ class BlockInfo:
     html_text: str = None
 
 
+class PageImage(object):
+    """Rendered page image, encoded once and shared by all model calls of the page."""
+
+    def __init__(self, image, image_format="png", image_quality=95):
+        self.image = image
+        self.image_format = image_format
+        self.image_quality = image_quality
+        self._b64 = None
+        self._lock = threading.Lock()
+
+    @property
+    def b64(self) -> str:
+        with self._lock:
+            if self._b64 is None:
+                with stage_timer("png_encode"):
+                    bytes_img = save_pillow_to_bytes(
+                        self.image, self.image_format, self.image_quality
+                    )
+                    self._b64 = base64.b64encode(bytes_img).decode()
+            return self._b64
+
+
 class Segment:
     def __init__(self, seg):
         self.whole = seg
@@ -272,24 +268,28 @@ class PDFDocument(Document):
         enable_isolated_formula: bool = False,
         n_parallel: int = 10,
         scale: float = 1,
+        image_format: str = "png",
+        image_quality: int = 95,
+        reading_order: Optional[str] = None,
+        agents: Optional[AgentRegistry] = None,
         **kwargs,
     ) -> None:
         """Initialize with a file path."""
-        rt_type = kwargs.get("rt_type", "sdk")
-        if rt_type in {"sdk", "idp", "ocr_sdk"}:
-            self.layout_agent = LayoutAgent(**model_params)
-            self.table_agent = TableAgent(**model_params)
-            self.ocr_agent = OCRAgent(**model_params)
-            self.table_det_agent = TableDetAgent(**model_params)
-        else:
-            self.layout_agent = RTLayoutAgent(**model_params)
-            self.table_agent = RTTableAgent(**model_params)
-            self.ocr_agent = RTOCRAgent(**model_params)
-            self.table_det_agent = RTTableDetAgent(**model_params)
+        if agents is None:
+            rt_type = kwargs.get("rt_type", "sdk")
+            agents = AgentRegistry(model_params, rt_type=rt_type, concurrency=n_parallel)
 
-        self.formula_agent = FormulaAgent(**model_params)
+        self.agents = agents
+        self.layout_agent = agents.layout_agent
+        self.table_agent = agents.table_agent
+        self.ocr_agent = agents.ocr_agent
+        self.table_det_agent = agents.table_det_agent
+        self.formula_agent = agents.formula_agent
 
         self.with_columns = with_columns
+        if reading_order is None:
+            reading_order = "block_no" if with_columns else "tbyx"
+        self.order_blocks = get_reading_order(reading_order)
         self.is_join_table = is_join_table
         self.support_rotate = support_rotate
         self.start = start
@@ -303,6 +303,7 @@ class PDFDocument(Document):
         self.enable_isolated_formula = enable_isolated_formula
         self.n_parallel = n_parallel
         self.scale = scale
+        self.image_params = {"image_format": image_format, "image_quality": image_quality}
         self.is_scan = is_scan
         self.mode = kwargs.get("mode", "local")
         super().__init__()
@@ -331,6 +332,14 @@ class PDFDocument(Document):
             blobs.append(Blob(data=bytes_img))
         return blobs, pages
 
+    @timed("render")
+    def _render_page(self, pdf_doc, idx):
+        page = pdf_doc.get_page(idx)
+        pil_image = page.render(scale=self.scale).to_pil()
+        page.close()
+        # the encoding is deferred to the worker threads
+        return PageImage(pil_image, **self.image_params)
+
     def _extract_lines_v2(self, textpage):
         line_blocks = []
         line_words_info = []
@@ -474,9 +483,11 @@ class PDFDocument(Document):
             # step 6. merge the segmented line patches and sort by tlbr
             inp = {"b64_image": b64_image}
             mf_outs = self.formula_agent.predict(
-                inp, img, enable_isolated_formula=self.enable_isolated_formula
+                inp, img, enable_isolated_formula=self.enable_isolated_formula, **self.image_params
+            )
+            texts, bboxes, words_info = self.ocr_agent.predict_with_mask(
+                img, mf_outs, **self.image_params
             )
-            texts, bboxes, words_info = self.ocr_agent.predict_with_mask(img, mf_outs)
         else:
             # get general ocr result
             ocr_result = self.ocr_agent.predict(inp)
@@ -506,18 +517,18 @@ class PDFDocument(Document):
 
         return blocks, blocks_words_info
 
-    def _enhance_table_layout(self, b64_image, layout_blocks):
+    def _enhance_table_layout(self, b64_image, layout_blocks, table_det_result=None):
         TABLE_ID = 5
-        inp = {"b64_image": b64_image}
-        result = self.table_det_agent.predict(inp)
+        result = table_det_result
+        if result is None:
+            inp = {"b64_image": b64_image}
+            result = self.table_det_agent.predict(inp)
         # 1: cell 2: rowcol
         DEFAULT_TABLE_CATE = 2
         table_layout_cats = []
         table_layout = []
         for i, bb in enumerate(result["bboxes"]):
-            coords = ((bb[0], bb[1]), (bb[2], bb[3]), (bb[4], bb[5]), (bb[6], bb[7]))
-            poly = Polygon(coords)
-            table_layout.append((poly, TABLE_ID))
+            table_layout.append((bb[:8], TABLE_ID))
             if "labels" in result:
                 table_layout_cats.append(result["labels"][i])
             else:
@@ -527,23 +538,11 @@ class PDFDocument(Document):
         result_layout = []
         for e in layout_blocks["result"]:
             bb = e["bbox"]
-            coords = ((bb[0], bb[1]), (bb[2], bb[3]), (bb[4], bb[5]), (bb[6], bb[7]))
-            poly = Polygon(coords)
             label = e["category_id"]
             if label == TABLE_ID:
-                general_table_layout.append((poly, label))
+                general_table_layout.append((bb[:8], label))
             else:
-                result_layout.append((poly, label))
-
-        # merge general table layout with specific table layout
-        OVERLAP_THRESHOLD = 0.7
-        mask = np.zeros(len(general_table_layout))
-        for i, (poly0, cate0) in enumerate(general_table_layout):
-            for poly1, _ in table_layout:
-                biou = poly0.intersection(poly1).area * 1.0 / poly1.area
-                if biou >= OVERLAP_THRESHOLD:
-                    mask[i] = 1
-                    break
+                result_layout.append((bb[:8], label))
 
         semantic_table_cate = [
             None,
@@ -551,11 +550,8 @@ class PDFDocument(Document):
         for e in table_layout:
             result_layout.append(e)
 
-        # disable the table info in layout
-        # for i, e in enumerate(general_table_layout):
-        #     if mask[i] == 0:
-        #         result_layout.append(e)
-        #         semantic_table_cate.append(DEFAULT_TABLE_CATE)
+        # the table info in layout is disabled, the general table layout is not
+        # merged and the tables only come from the specific table layout
 
         semantic_polys = [e[0] for e in result_layout]
         semantic_labels = [e[1] for e in result_layout]
@@ -570,13 +566,30 @@ class PDFDocument(Document):
                 textpage_info,
                 enable_isolated_formula=self.enable_isolated_formula,
                 ocr_agent=self.ocr_agent,
+                **self.image_params,
             )
             return blocks, words
         else:
             return textpage_info
 
+    def _extract_texts(self, textpage_info, b64_image, img, is_scan=True):
+        if not is_scan:
+            return self._enhance_texts_info_with_formula(b64_image, img, textpage_info)
+        else:
+            return self._extract_blocks_from_image(b64_image, img)
+
+    @timed("geometry")
     def _allocate_semantic(
-        self, textpage_info, layout, b64_image, img, is_scan=True, lang="zh", rot_matrix=None
+        self,
+        textpage_info,
+        layout,
+        b64_image,
+        img,
+        is_scan=True,
+        lang="zh",
+        rot_matrix=None,
+        texts_info=None,
+        table_det_result=None,
     ):
         class_name = ["印章", "图片", "标题", "段落", "表格", "页眉", "页码", "页脚"]
         effective_class_inds = [3, 4, 5, 999, 1000]
@@ -587,16 +600,9 @@ class PDFDocument(Document):
         FORMULA_ID = 1000
 
         timer = Timer()
-        if not is_scan:
-            # textpage = page.get_textpage()
-            # blocks = textpage.extractBLOCKS()
-            # blocks, words = self._extract_blocks(textpage)
-            # blocks, words = self._extract_lines(textpage)
-            # blocks, words = self._extract_lines_v2(textpage)
-            # blocks, words = textpage_info
-            blocks, words = self._enhance_texts_info_with_formula(b64_image, img, textpage_info)
-        else:
-            blocks, words = self._extract_blocks_from_image(b64_image, img)
+        if texts_info is None:
+            texts_info = self._extract_texts(textpage_info, b64_image, img, is_scan)
+        blocks, words = texts_info
 
         timer.toc()
         # print('---line blocks---')
@@ -653,12 +659,10 @@ class PDFDocument(Document):
         #     print(b)
 
         IMG_BLOCK_TYPE = 1
-        text_ploys = []
         text_rects = []
         texts = []
         for b in blocks:
             texts.append(b.block_text)
-            text_ploys.append(Rect(*b.bbox))
             text_rects.append(b.bbox)
 
         text_rects = np.asarray(text_rects)
@@ -673,13 +677,11 @@ class PDFDocument(Document):
         # print('layout_info', layout_info)
         if self.enhance_table:
             semantic_polys, semantic_labels, semantic_table_cate = self._enhance_table_layout(
-                b64_image, layout
+                b64_image, layout, table_det_result
             )
         else:
             for info in layout_info["result"]:
-                bbs = info["bbox"]
-                coords = ((bbs[0], bbs[1]), (bbs[2], bbs[3]), (bbs[4], bbs[5]), (bbs[6], bbs[7]))
-                semantic_polys.append(Polygon(coords))
+                semantic_polys.append(info["bbox"][:8])
                 semantic_labels.append(info["category_id"])
 
             semantic_table_cate = [
@@ -694,19 +696,12 @@ class PDFDocument(Document):
         # 2) find max continuous text blocks with threshold keep.
         # 3) merge the continuous text blocks
         # 4) get the new blocks
-        semantic_bboxes = []
-        for poly in semantic_polys:
-            x, y = poly.exterior.coords.xy
-            semantic_bboxes.append([x[0], y[0], x[1], y[1], x[2], y[2], x[3], y[3]])
+        semantic_bboxes = [[float(v) for v in poly] for poly in semantic_polys]
 
         # calculate containing overlap
         sem_cnt = len(semantic_polys)
-        texts_cnt = len(text_ploys)
-        contain_matrix = np.zeros((sem_cnt, texts_cnt))
-        for i in range(sem_cnt):
-            for j in range(texts_cnt):
-                inter = semantic_polys[i].intersection(text_ploys[j]).area
-                contain_matrix[i, j] = inter * 1.0 / text_ploys[j].area
+        texts_cnt = len(text_rects)
+        text_contain_matrix = contain_matrix(semantic_bboxes, text_rects)
 
         # print('----------------containing matrix--------')
         # for r in contain_matrix.tolist():
@@ -719,7 +714,7 @@ class PDFDocument(Document):
         CONTRAIN_THRESHOLD = 0.70
         contain_info = []
         for i in range(sem_cnt):
-            ind = np.argwhere(contain_matrix[i, :] > CONTRAIN_THRESHOLD)[:, 0]
+            ind = np.argwhere(text_contain_matrix[i, :] > CONTRAIN_THRESHOLD)[:, 0]
             if len(ind) == 0:
                 continue
             label = semantic_labels[i]
@@ -790,30 +785,16 @@ class PDFDocument(Document):
 
         timer.toc()
 
-        if self.with_columns:
-            new_blocks = sorted(new_block_info, key=lambda x: x.ord_ind)
-        else:
-            new_blocks = order_by_tbyx(new_block_info)
+        new_blocks = self.order_blocks(new_block_info)
 
         # print('\n\n---new blocks---')
         # for idx, b in enumerate(new_blocks):
         #     print(idx, b)
 
-        text_ploys = []
-        # texts = []
-        for b in new_blocks:
-            # texts.append(b.ts)
-            text_ploys.append(Rect(*b.bbox))
-
         # calculate overlap
         sem_cnt = len(semantic_polys)
-        texts_cnt = len(text_ploys)
-        overlap_matrix = np.zeros((sem_cnt, texts_cnt))
-        for i in range(sem_cnt):
-            for j in range(texts_cnt):
-                inter = semantic_polys[i].intersection(text_ploys[j]).area
-                union = semantic_polys[i].union(text_ploys[j]).area
-                overlap_matrix[i, j] = (inter * 1.0) / union
+        texts_cnt = len(new_blocks)
+        overlap_matrix = iou_matrix(semantic_bboxes, [b.bbox for b in new_blocks])
 
         # print('---overlap_matrix---')
         # for r in overlap_matrix:
@@ -868,8 +849,9 @@ class PDFDocument(Document):
 
         timer.toc()
 
-        # Parse the table layout
-        table_layout = []
+        # Parse the table layout, the tables of the page are parsed at the same time,
+        # it runs in a task of the page graph and takes another pool
+        table_graph = TaskGraph(get_graph_executor("table"))
         for table_info in table_infos:
             block_ind, texts, bboxes, table_bbox, table_cate = table_info
             if not texts:
@@ -883,7 +865,15 @@ class PDFDocument(Document):
                 "table_bboxes": [table_bbox],
                 "scene": scene,
             }
-            table_result = self.table_agent.predict(inp)
+            table_graph.add(block_ind, functools.partial(self.table_agent.predict, inp))
+        table_results = table_graph.run()
+
+        table_layout = []
+        for table_info in table_infos:
+            block_ind, texts, bboxes, table_bbox, table_cate = table_info
+            if not texts:
+                continue
+            table_result = table_results[block_ind]
             # print('---table--', ocr_result, table_bbox, table_result)
             h_bbox = get_hori_rect(table_bbox)
 
@@ -987,13 +977,15 @@ class PDFDocument(Document):
 
         return groups
 
-    def _allocate_continuous(self, groups, lang):
-        g_bound = []
-        groups = [g for g in groups if g]
-        for blocks in groups:
-            arr = [b.bbox for b in blocks]
-            bboxes = np.asarray(arr)
-            g_bound.append(np.asarray(merge_rects(bboxes)))
+    def _group_bound(self, blocks):
+        bboxes = np.asarray([b.bbox for b in blocks])
+        return np.asarray(merge_rects(bboxes))
+
+    @timed("table_merge")
+    def _allocate_continuous(self, groups, lang, g_bound=None):
+        if g_bound is None:
+            groups = [g for g in groups if g]
+            g_bound = [self._group_bound(blocks) for blocks in groups]
 
         LINE_FULL_THRESHOLD = 0.80
         START_THRESHOLD = 0.8
@@ -1196,27 +1188,51 @@ class PDFDocument(Document):
 
         return pages
 
-    def load(self) -> List[Page]:
-        """Load given path as pages."""
+    def _iter_page_blocks(self):
+        """Yield `(page index, blocks, lang)` in page order as soon as the pages are parsed."""
         blob = Blob.from_path(self.file)
         start = self.start
-        groups = []
-        page_inds = []
-        lang = None
 
-        def _task(textpage_info, bytes_img, img, is_scan, lang, rot_matirx, page_index: int):
+        def _task(textpage_info, page_image, is_scan, lang, rot_matirx, page_index: int):
+            with metric_labels(page=page_index + 1):
+                return _parse_page(textpage_info, page_image, is_scan, lang, page_index)
+
+        def _parse_page(textpage_info, page_image, is_scan, lang, page_index: int):
             if self.mode == "local":
                 # 本地模式，不支持ocr等精细化处理
                 return textpage_info, page_index
-            b64_data = base64.b64encode(bytes_img).decode()
-            layout_inp = {"b64_image": b64_data}
-            layout = self.layout_agent.predict(layout_inp)
-            logger.info(
-                "load_layout_result_begin is_scan={} support={}", is_scan, self.support_formula
-            )
-            blocks = self._allocate_semantic(
-                textpage_info, layout, b64_data, img, is_scan, lang, rot_matrix
-            )
+            b64_data = page_image.b64
+            img = page_image.image
+            # layout, texts and table detection only need the page image, call them
+            # at the same time, the semantic allocation waits for all of them
+            deps = ["layout", "texts"]
+            graph = TaskGraph()
+            graph.add("layout", lambda: self.layout_agent.predict({"b64_image": b64_data}))
+            graph.add("texts", lambda: self._extract_texts(textpage_info, b64_data, img, is_scan))
+            if self.enhance_table:
+                graph.add(
+                    "table_det", lambda: self.table_det_agent.predict({"b64_image": b64_data})
+                )
+                deps.append("table_det")
+
+            def _allocate(layout, texts_info, table_det_result=None):
+                logger.info(
+                    "load_layout_result_begin is_scan={} support={}", is_scan, self.support_formula
+                )
+                return self._allocate_semantic(
+                    textpage_info,
+                    layout,
+                    b64_data,
+                    img,
+                    is_scan,
+                    lang,
+                    rot_matrix,
+                    texts_info=texts_info,
+                    table_det_result=table_det_result,
+                )
+
+            graph.add("blocks", _allocate, deps)
+            blocks = graph.run()["blocks"]
             return blocks, page_index
 
         with blob.as_bytes_io() as file_path:
@@ -1230,47 +1246,48 @@ class PDFDocument(Document):
             if self.verbose:
                 print(f"{n} pages need be processed...")
 
-            bytes_imgs = []
-            page_imgs = []
-            for idx in range(start, start + n):
-                page = pdf_doc.get_page(idx)
-                pil_image = page.render(scale=self.scale).to_pil()
-                page_imgs.append(pil_image)
-                img_byte_arr = io.BytesIO()
-                pil_image.save(img_byte_arr, format="PNG")
-                bytes_img = img_byte_arr.getvalue()
-                bytes_imgs.append(bytes_img)
+            # pages are rendered lazily just ahead of the workers, at most `window`
+            # pages are in flight, the page image is released once its task is done
+            window = max(1, 2 * self.n_parallel)
+            parsed = {}
+            page_langs = {}
+            next_idx = start
+
+            def _collect(done_futures):
+                for future in done_futures:
+                    blocks, i = future.result()
+                    parsed[i] = blocks
+                    if blocks:
+                        logger.info("load_layout_result_end idx={} time={}", i, timer.get())
 
-            timer.toc()
-            logger.info("pdfium render image size={} time={}", len(page_imgs), timer.get())
+            def _pop_ready():
+                # 按页数顺序输出已完成的页
+                nonlocal next_idx
+                while next_idx in parsed:
+                    yield next_idx, parsed.pop(next_idx), page_langs.pop(next_idx)
+                    next_idx += 1
 
-            results = []
             with ThreadPoolExecutor(max_workers=self.n_parallel) as executor:
-                futures = []
+                pending = set()
                 for idx in range(start, start + n):
-                    # timer = Timer()
+                    if len(pending) >= window:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        _collect(done)
+                        yield from _pop_ready()
+
                     # Becareful: pymupdf doc load page in parallel will cause
                     # corrupted double-linked list, do not keep page object
                     textpage = fitz_doc.load_page(idx).get_textpage()
                     rot_matrix = None
-
-                    # page = pdf_doc.get_page(idx)
-                    # pil_image = page.render().to_pil()
-                    # img_byte_arr = io.BytesIO()
-                    # pil_image.save(img_byte_arr, format="PNG")
-                    # bytes_img = img_byte_arr.getvalue()
-                    # timer.toc()
-
-                    bytes_img = bytes_imgs[idx - start]
-                    img = page_imgs[idx - start]
-                    # print('pil image png convert', timer.get())
+                    with metric_labels(page=idx + 1):
+                        page_image = self._render_page(pdf_doc, idx)
 
                     # 判断此页是否需要进行ocr
                     type_texts = [page.get_text() for page in fitz_doc.pages(idx, idx + 1)]
                     type_texts = "".join(type_texts)
                     zh_n = len(re.findall(ZH_CHAR, type_texts))
                     total_n = len(type_texts)
-                    is_scan = total_n < 200 or self.scale!=1
+                    is_scan = total_n < 200 or self.scale != 1
                     if not is_scan:
                         lang = "zh" if zh_n > 200 or zh_n / total_n > 0.5 else "eng"
                     else:
@@ -1283,42 +1300,92 @@ class PDFDocument(Document):
                         textpage_info = self._extract_lines_v2(textpage)
                     else:
                         textpage_info = (None, None)
-                    # blocks = _task(textpage_info, bytes_img, img, is_scan, lang, rot_matrix)
-                    futures.append(
+
+                    page_langs[idx] = lang
+                    # keep the metric labels and the log context of the document
+                    ctx = contextvars.copy_context()
+                    pending.add(
                         executor.submit(
-                            _task, textpage_info, bytes_img, img, is_scan, lang, rot_matrix, idx
+                            ctx.run,
+                            _task,
+                            textpage_info,
+                            page_image,
+                            is_scan,
+                            lang,
+                            rot_matrix,
+                            idx,
                         )
                     )
-
-                # 重新按页数顺序排序下输出的结果
-                all_blocks = [[] for _ in range(len(futures))]
-                for future in as_completed(futures):
-                    blocks, i = future.result()
-                    if not blocks:
+                    del page_image
+
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    _collect(done)
+                    yield from _pop_ready()
+
+    def iter_pages(self, window_size: Optional[int] = None):
+        """Yield `(pages, next_start)` for every window of `window_size` pages.
+
+        The groups of the last page of a window are held back and joined with
+        the next window, so the paragraphs and tables continued over the window
+        boundary are merged the same way as loading the whole document. Pass
+        `next_start` as `start` to resume from the held back pages, it is None
+        for the last window. Without `window_size` all pages are yielded once.
+        """
+        groups = []
+        g_bound = []
+        page_inds = []
+        lang = None
+        n_pages = 0
+        for idx, blocks, lang in self._iter_page_blocks():
+            n_pages += 1
+            if blocks:
+                for tmp_block in blocks:
+                    tmp_block.pages = [idx + 1 for _ in tmp_block.rs]
+                    tmp_block.bbox_text = None
+                sub_groups = [blocks]
+                if self.with_columns:
+                    sub_groups = self._divide_blocks_into_groups(blocks)
+                for sub_group in sub_groups:
+                    if not sub_group:
                         continue
-                    logger.info("load_layout_result_end idx={} time={}", i, timer.get())
-                    all_blocks[i] = [i, blocks]
+                    groups.append(sub_group)
+                    # the bound is taken before the blocks are merged with the next page
+                    g_bound.append(self._group_bound(sub_group))
+                    page_inds.append(idx + 1)
 
-                # 重新排序下输出的结果
-                for one in all_blocks:
-                    if not one:
-                        continue
-                    idx = one[0]
-                    blocks = one[1]
-                    for tmp_block in blocks:
-                        tmp_block.pages = [idx + 1 for _ in tmp_block.rs]
-                        tmp_block.bbox_text = None
-                    if self.with_columns:
-                        sub_groups = self._divide_blocks_into_groups(blocks)
-                        groups.extend(sub_groups)
-                        for _ in sub_groups:
-                            page_inds.append(idx + 1)
-                    else:
-                        groups.append(blocks)
-                        page_inds.append(idx + 1)
+            if not window_size or n_pages % window_size:
+                continue
 
-        groups = self._allocate_continuous(groups, lang)
-        pages = self._save_to_pages(groups, page_inds, lang)
+            if not groups:
+                yield [], idx + 1
+                continue
+
+            # the sub groups of the last page are only joined with the previous group
+            # here, the pairs of the held back groups are joined once in the next window
+            carry = page_inds.index(page_inds[-1])
+            self._allocate_continuous(groups[: carry + 1], lang, g_bound[: carry + 1])
+            pages = self._save_to_pages(groups[:carry], page_inds[:carry], lang)
+            # the held back blocks may already carry the tail of the previous pages
+            next_start = min(p for g in groups[carry:] for b in g for p in b.pages) - 1
+            yield pages, next_start
+
+            keep = [i for i in range(carry, len(groups)) if groups[i]]
+            groups = [groups[i] for i in keep]
+            g_bound = [g_bound[i] for i in keep]
+            page_inds = [page_inds[i] for i in keep]
+
+        if groups:
+            groups = self._allocate_continuous(groups, lang, g_bound)
+            yield self._save_to_pages(groups, page_inds, lang), None
+        else:
+            yield [], None
+
+    def load(self) -> List[Page]:
+        """Load given path as pages."""
+        pages = []
+        for window_pages, _ in self.iter_pages():
+            pages.extend(window_pages)
         return pages
 
     @property
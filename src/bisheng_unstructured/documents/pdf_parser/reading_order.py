@@ -0,0 +1,52 @@
+"""Reading order strategies for the blocks of a page.
+
+A strategy takes the blocks of a page, each with a `bbox` of
+`[x0, y0, x1, y1]`, and returns them in reading order. The blocks are
+reordered in place of copying.
+"""
+from typing import Any, Callable, Dict, List
+
+
+def group_into_bands(blocks: List[Any], th: float = 10) -> List[List[Any]]:
+    """Group blocks into horizontal bands by the top edge
+
+    The blocks are sorted by top edge, a block whose top is within `th` of the
+    top of the first block of the current band joins the band.
+    """
+    res = sorted(blocks, key=lambda b: (b.bbox[1], b.bbox[0]))
+    bands = []
+    band_y = None
+    for b in res:
+        y = b.bbox[1]
+        if bands and y - band_y < th:
+            bands[-1].append(b)
+        else:
+            bands.append([b])
+            band_y = y
+    return bands
+
+
+def order_by_tbyx(blocks: List[Any], th: float = 10) -> List[Any]:
+    """Top to bottom by bands, then left to right inside each band"""
+    res = []
+    for band in group_into_bands(blocks, th):
+        band.sort(key=lambda b: b.bbox[0])
+        res.extend(band)
+    return res
+
+
+def order_by_block_no(blocks: List[Any], **kwargs) -> List[Any]:
+    """Keep the order produced by the text extraction, used for the column layout"""
+    return sorted(blocks, key=lambda b: b.ord_ind)
+
+
+READING_ORDER_STRATEGIES: Dict[str, Callable] = {
+    "tbyx": order_by_tbyx,
+    "block_no": order_by_block_no,
+}
+
+
+def get_reading_order(name: str) -> Callable:
+    if name not in READING_ORDER_STRATEGIES:
+        raise ValueError(f"reading order [{name}] not supported")
+    return READING_ORDER_STRATEGIES[name]
@@ -1,3 +1,4 @@
+import codecs
 from typing import IO, Optional, Tuple, Union
 
 import chardet
@@ -105,6 +106,90 @@ def detect_file_encoding(
     return formatted_encoding, file_text
 
 
+# the sample of a large file may not have the characters of the superset encodings
+SUPERSET_ENCODINGS = {"ascii": "utf-8", "gb2312": "gb18030", "gbk": "gb18030"}
+
+
+def detect_sample_encoding(sample: bytes) -> str:
+    """Detect the encoding from the first bytes of a file, to decode the file as a stream.
+
+    The encodings guessed from the sample are widened to their supersets, e.g. a
+    sample of plain ascii is decoded as utf-8.
+    """
+    result = chardet.detect(sample)
+    encoding = result["encoding"]
+    if encoding is None or result["confidence"] < ENCODE_REC_THRESHOLD:
+        for enc in COMMON_ENCODINGS:
+            try:
+                # the sample may end in the middle of a character
+                codecs.getincrementaldecoder(enc)().decode(sample, final=False)
+                encoding = enc
+                break
+            except (UnicodeDecodeError, UnicodeError):
+                continue
+        else:
+            raise UnicodeDecodeError(
+                "Unable to determine the encoding of the file or match it with any "
+                "of the specified encodings.",
+                sample,
+                0,
+                len(sample),
+                "Invalid encoding",
+            )
+
+    formatted_encoding = format_encoding_str(encoding)
+    return SUPERSET_ENCODINGS.get(formatted_encoding, formatted_encoding)
+
+
+def _decodes_stream(f: IO[bytes], encoding: str, chunk_size: int) -> bool:
+    decoder = codecs.getincrementaldecoder(encoding)()
+    f.seek(0)
+    try:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except (UnicodeDecodeError, UnicodeError):
+        return False
+    finally:
+        f.seek(0)
+    return True
+
+
+def detect_stream_encoding(f: IO[bytes], chunk_size: int = 1 << 20) -> str:
+    """Detect the encoding from the whole file, it's read in chunks to keep the memory low.
+
+    It's the fallback of `detect_sample_encoding` when the file fails to decode after
+    the sample. The common encodings are tried on the whole file if chardet is not sure.
+    """
+    detector = chardet.UniversalDetector()
+    f.seek(0)
+    for chunk in iter(lambda: f.read(chunk_size), b""):
+        detector.feed(chunk)
+        if detector.done:
+            break
+    detector.close()
+    f.seek(0)
+
+    encoding = detector.result["encoding"]
+    if encoding is None or detector.result["confidence"] < ENCODE_REC_THRESHOLD:
+        for enc in COMMON_ENCODINGS:
+            if _decodes_stream(f, enc, chunk_size):
+                encoding = enc
+                break
+        else:
+            raise UnicodeDecodeError(
+                "Unable to determine the encoding of the file or match it with any "
+                "of the specified encodings.",
+                b"",
+                0,
+                0,
+                "Invalid encoding",
+            )
+
+    formatted_encoding = format_encoding_str(encoding)
+    return SUPERSET_ENCODINGS.get(formatted_encoding, formatted_encoding)
+
+
 def read_txt_file(
     filename: str = "",
     file: Optional[Union[bytes, IO[bytes]]] = None,
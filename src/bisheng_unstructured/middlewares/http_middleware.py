@@ -6,6 +6,20 @@ from fastapi import Request
 from loguru import logger
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 
+from bisheng_unstructured.common.logger import trace_context
+from bisheng_unstructured.common.metrics import REGISTRY
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "bisheng_uns_request_seconds", "Time of the http requests", ["path", "status"]
+)
+REQUEST_INFLIGHT = REGISTRY.gauge("bisheng_uns_request_inflight", "Http requests being processed")
+
+
+def _route_path(request: Request) -> str:
+    # the path template of the route, the raw path has the ids in it
+    route = request.scope.get("route")
+    return getattr(route, "path", "unmatched")
+
 
 class CustomMiddleware(BaseHTTPMiddleware):
     """切面程序"""
@@ -14,9 +28,13 @@ class CustomMiddleware(BaseHTTPMiddleware):
         # You can modify the request before passing it to the next middleware or endpoint
         trace_id = str(uuid4().hex)
         start_time = time()
-        with logger.contextualize(trace_id=trace_id):
+        with trace_context(trace_id):
             logger.info(f"{request.url.path}")
-            response = await call_next(request)
+            with REQUEST_INFLIGHT.track_inprogress():
+                response = await call_next(request)
             process_time = round((time() - start_time) * 1000, 3)
             logger.info(f"{request.url.path} {response.status_code} timecost={process_time}")
+            REQUEST_SECONDS.observe(
+                time() - start_time, path=_route_path(request), status=response.status_code
+            )
             return response
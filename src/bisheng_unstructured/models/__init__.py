@@ -4,10 +4,11 @@ from bisheng_unstructured.models.idp.ocr_agent import OCRAgent
 from bisheng_unstructured.models.idp.table_agent import TableAgent, TableDetAgent
 from bisheng_unstructured.models.layout_agent import LayoutAgent as RTLayoutAgent
 from bisheng_unstructured.models.ocr_agent import OCRAgent as RTOCRAgent
+from bisheng_unstructured.models.registry import AgentRegistry
 from bisheng_unstructured.models.table_agent import TableAgent as RTTableAgent
 from bisheng_unstructured.models.table_agent import TableDetAgent as RTTableDetAgent
 
 __all__ = [
     "LayoutAgent", "OCRAgent", "TableAgent", "TableDetAgent", "FormulaAgent", "RTLayoutAgent",
-    "RTOCRAgent", "RTTableAgent", "RTTableDetAgent"
+    "RTOCRAgent", "RTTableAgent", "RTTableDetAgent", "AgentRegistry"
 ]
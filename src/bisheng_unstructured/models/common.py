@@ -53,13 +53,28 @@ def draw_polygon(image, bbox, text=None, color=(255, 0, 0), thickness=1, is_rect
     return image
 
 
-def save_pillow_to_base64(image):
+def save_pillow_to_bytes(image, image_format="png", image_quality=95):
     buffered = io.BytesIO()
-    image.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode()
+    if image_format.lower() in ("jpeg", "jpg"):
+        image.convert("RGB").save(buffered, format="JPEG", quality=image_quality)
+    else:
+        image.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def save_pillow_to_base64(image, image_format="png", image_quality=95):
+    img_str = base64.b64encode(save_pillow_to_bytes(image, image_format, image_quality)).decode()
     return img_str
 
 
+def get_image_params(kwargs):
+    # image encoding used to send pages and patches to the models
+    return {
+        "image_format": kwargs.get("image_format", "png"),
+        "image_quality": kwargs.get("image_quality", 95),
+    }
+
+
 def pil2opencv(image):
     return cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
 
@@ -1,29 +1,55 @@
 import base64
 import copy
 import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
 
 import cv2
 import numpy as np
 import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
 
 from bisheng_unstructured.common import Timer
+from bisheng_unstructured.common.geometry import contain_matrix
+from bisheng_unstructured.models.limiter import OVERLOAD_STATUS, endpoint_slot
 
 from .common import (
-    bbox_overlap,
     draw_polygon,
+    get_image_params,
     pil2opencv,
     save_pillow_to_base64,
     smart_join,
     split_line_bbox_by_overlap_bbox,
 )
 
+# seconds to wait before the batch request is tried again on an endpoint rejecting it
+BATCH_RETRY_INTERVAL = 300
+
+
+class _BatchNotSupported(Exception):
+    pass
+
 
 class FormulaAgent(object):
     def __init__(self, **kwargs):
         self.det_ep = kwargs.get("formula_det_model_ep")
         self.recog_ep = kwargs.get("formula_recog_model_ep")
-        self.client = requests.Session()
         self.timeout = kwargs.get("timeout", 60)
+        # crops of a page are recognized in batches of batch_size if it's over 1, it needs
+        # the endpoint to support batch, otherwise the crops are sent as concurrent requests,
+        # at most concurrency at once
+        self.batch_size = kwargs.get("formula_batch_size", 1)
+        self.concurrency = kwargs.get("formula_concurrency", 8)
+        self._batch_retry_at = 0.0
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="formula_recog"
+        )
+        self.client = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=self.concurrency)
+        self.client.mount("http://", adapter)
+        self.client.mount("https://", adapter)
 
         self.embed_sep = kwargs.get("embed_sep", (" $", "$ "))
         self.isolated_sep = kwargs.get("isolated_sep", ("$$\n", "\n$$"))
@@ -31,18 +57,61 @@ class FormulaAgent(object):
     def _get_ep_result(self, ep, inp):
         headers = {"Content-type": "application/json"}
         try:
-            r = self.client.post(url=ep, json=inp, timeout=self.timeout, headers=headers)
+            with endpoint_slot(ep) as slot:
+                r = self.client.post(url=ep, json=inp, timeout=self.timeout, headers=headers)
+                slot.failed = r.status_code in OVERLOAD_STATUS
             return r.json()
         except requests.exceptions.Timeout:
-            raise Exception(f"timeout in formula agent predict")
+            raise Exception("timeout in formula agent predict")
         except Exception as e:
             raise Exception(f"exception in formula agent predict: [{e}]")
 
-    def predict(self, inp, image, **kwargs):
-        enable_isolated_formula = kwargs.get("enable_isolated_formula", False)
-        det_out = self._get_ep_result(self.det_ep, inp)
-        formula_det_out = det_out.get("result", [])
-        mf_out = []
+    def _recog_batch(self, b64_images) -> List[str]:
+        headers = {"Content-type": "application/json"}
+        inp = {"b64_images": b64_images}
+        with endpoint_slot(self.recog_ep) as slot:
+            r = self.client.post(url=self.recog_ep, json=inp, timeout=self.timeout, headers=headers)
+            slot.failed = r.status_code in OVERLOAD_STATUS
+
+        result = None
+        if r.status_code not in {400, 404, 405, 422}:
+            r.raise_for_status()
+            result = r.json().get("result")
+        if not isinstance(result, list) or len(result) != len(b64_images):
+            raise _BatchNotSupported(f"batch recog not supported status={r.status_code}")
+        return result
+
+    def _recog_chunk(self, b64_images) -> List[str]:
+        if self.batch_size > 1 and time.time() >= self._batch_retry_at:
+            try:
+                return self._recog_batch(b64_images)
+            except _BatchNotSupported as e:
+                logger.warning(f"formula recog fallback to single requests, err=[{e}]")
+                self._batch_retry_at = time.time() + BATCH_RETRY_INTERVAL
+            except Exception as e:
+                logger.warning(f"formula batch recog failed, retry as single requests, err=[{e}]")
+
+        return list(self._executor.map(self._recog_one, b64_images))
+
+    def _recog_one(self, b64_image) -> str:
+        return self._get_ep_result(self.recog_ep, {"b64_image": b64_image})["result"]
+
+    def recog_patches(self, patches, **kwargs) -> List[str]:
+        """Recognize the formula patches of a page or of many pages at once."""
+        image_params = get_image_params(kwargs)
+        b64_images = [save_pillow_to_base64(patch, **image_params) for patch in patches]
+        if not b64_images:
+            return []
+
+        chunk_size = self.batch_size if self.batch_size > 1 else len(b64_images)
+        texts = []
+        for i in range(0, len(b64_images), chunk_size):
+            texts.extend(self._recog_chunk(b64_images[i : i + chunk_size]))
+        return texts
+
+    def _recog_det_out(self, formula_det_out, image, enable_isolated_formula, **kwargs):
+        det_out = []
+        patches = []
         for box_info in formula_det_out:
             box = box_info["box"]
             if enable_isolated_formula:
@@ -50,23 +119,27 @@ class FormulaAgent(object):
                     continue
 
             xmin, ymin, xmax, ymax = box[0], box[1], box[4], box[5]
-            # xmin, ymin, xmax, ymax = (
-            #     int(box[0][0]),
-            #     int(box[0][1]),
-            #     int(box[2][0]),
-            #     int(box[2][1]),
-            # )
-            crop_patch = image.crop((xmin, ymin, xmax, ymax))
-            patch_b64_image = save_pillow_to_base64(crop_patch)
-            inp = {"b64_image": patch_b64_image}
-            patch_out = self._get_ep_result(self.recog_ep, inp)["result"]
+            patches.append(image.crop((xmin, ymin, xmax, ymax)))
+            det_out.append(box_info)
+
+        texts = self.recog_patches(patches, **kwargs)
+        for box_info, patch_out in zip(det_out, texts):
             sep = self.embed_sep
             if box_info["type"] == "isolated":
                 sep = self.isolated_sep
+            yield box_info, sep[0] + patch_out + sep[1]
 
-            text = sep[0] + patch_out + sep[1]
-            mf_out.append({"type": box_info["type"], "text": text, "box": box})
-        print("mf_out", mf_out)
+    def predict(self, inp, image, **kwargs):
+        enable_isolated_formula = kwargs.get("enable_isolated_formula", False)
+        image_params = get_image_params(kwargs)
+        det_out = self._get_ep_result(self.det_ep, inp)
+        formula_det_out = det_out.get("result", [])
+        mf_out = []
+        recog_out = self._recog_det_out(
+            formula_det_out, image, enable_isolated_formula, **image_params
+        )
+        for box_info, text in recog_out:
+            mf_out.append({"type": box_info["type"], "text": text, "box": box_info["box"]})
         return mf_out
 
     def _visualize(self, img0, bboxes, mf_out):
@@ -91,29 +164,19 @@ class FormulaAgent(object):
         timer = Timer()
 
         enable_isolated_formula = kwargs.get("enable_isolated_formula", False)
+        image_params = get_image_params(kwargs)
         inp = {"b64_image": b64_image}
         det_out = self._get_ep_result(self.det_ep, inp)
         formula_det_out = det_out.get("result", [])
         mf_out = []
         timer.toc()
 
-        for box_info in formula_det_out:
+        recog_out = self._recog_det_out(
+            formula_det_out, image, enable_isolated_formula, **image_params
+        )
+        for box_info, text in recog_out:
             box = box_info["box"]
-            if enable_isolated_formula:
-                if box_info["type"] != "isolated":
-                    continue
-
-            xmin, ymin, xmax, ymax = box[0], box[1], box[4], box[5]
-            crop_patch = image.crop((xmin, ymin, xmax, ymax))
-            patch_b64_image = save_pillow_to_base64(crop_patch)
-            inp = {"b64_image": patch_b64_image}
-            patch_out = self._get_ep_result(self.recog_ep, inp)["result"]
-            sep = self.embed_sep
-            if box_info["type"] == "isolated":
-                sep = self.isolated_sep
-
-            text = sep[0] + patch_out + sep[1]
-            bb = [xmin, ymin, xmax, ymax]
+            bb = [box[0], box[1], box[4], box[5]]
             mf_out.append({"type": box_info["type"], "text": text, "box": bb})
 
         timer.toc()
@@ -126,13 +189,10 @@ class FormulaAgent(object):
         blocks, words_info = textpage_info
         mf_cnt = len(mf_out)
         texts_cnt = len(blocks)
-        overlap_matrix = np.zeros((mf_cnt, texts_cnt))
+        mf_bboxes = [e["box"] for e in mf_out]
+        block_bboxes = [b.bbox for b in blocks]
+        overlap_matrix = contain_matrix(mf_bboxes, block_bboxes)
         OVERLAP_THRESHOLD = 0.7
-        for i in range(mf_cnt):
-            for j in range(texts_cnt):
-                bbox0 = mf_out[i]["box"]
-                bbox1 = blocks[j].bbox
-                overlap_matrix[i, j] = bbox_overlap(bbox0, bbox1)
 
         isolated_ind = []
         mask_ind = []
@@ -146,19 +206,15 @@ class FormulaAgent(object):
                 replace_info.append((min_ind, mf_out[i]["text"]))
 
         # process for the embedding formula
-        overlap_matrix2 = np.zeros((texts_cnt, mf_cnt))
+        overlap_matrix2 = contain_matrix(block_bboxes, mf_bboxes)
         OVERLAP_THRESHOLD = 0.7
-        for i in range(texts_cnt):
-            if i in isolated_ind:
-                continue
-
-            for j in range(mf_cnt):
-                bbox0 = blocks[i].bbox
-                bbox1 = mf_out[j]["box"]
-                overlap_matrix2[i, j] = bbox_overlap(bbox0, bbox1)
+        isolated_ind = set(isolated_ind)
 
         # embedding formula will split the normal text line
         ocr_agent = kwargs.get("ocr_agent")
+        text_bboxes = []
+        text_index_map = []
+        split_line_texts = {}
         for i in range(texts_cnt):
             if i in isolated_ind:
                 continue
@@ -173,26 +229,24 @@ class FormulaAgent(object):
             line_bbox = blocks[i].bbox
             split_outs = split_line_bbox_by_overlap_bbox(line_bbox, mf_boxes)
 
-            text_bboxes = []
-            text_index_map = {}
             line_texts = [""] * len(split_outs)
-            text_ind = 0
             for k in range(len(split_outs)):
                 bbox, text_type, mf_ind = split_outs[k]
                 if text_type == "text":
                     text_bboxes.append(bbox)
-                    text_index_map[text_ind] = k
-                    text_ind += 1
+                    text_index_map.append((i, k))
                 else:
                     line_texts[k] = line_mf_out[mf_ind]["text"]
+            split_line_texts[i] = line_texts
 
-            # recog the patches
-            if len(text_bboxes) > 0:
-                patches = [image.crop(bb) for bb in text_bboxes]
-                texts = ocr_agent.predict_with_patches(patches)
-                for k, text in enumerate(texts):
-                    line_texts[text_index_map[k]] = text
+        # recog the text patches of all lines at once
+        if len(text_bboxes) > 0:
+            patches = [image.crop(bb) for bb in text_bboxes]
+            texts = ocr_agent.predict_with_patches(patches, **image_params)
+            for (i, k), text in zip(text_index_map, texts):
+                split_line_texts[i][k] = text
 
+        for i, line_texts in split_line_texts.items():
             line_texts = [t for t in line_texts if t != ""]
             line_full_text = smart_join(line_texts)
             blocks[i].block_text = line_full_text
@@ -201,6 +255,7 @@ class FormulaAgent(object):
             blocks[ind].block_text = text
             blocks[ind].layout_type = 1000
 
+        mask_ind = set(mask_ind)
         new_blocks = [blocks[i] for i in range(texts_cnt) if i not in mask_ind]
         new_words_info = [words_info[i] for i in range(texts_cnt) if i not in mask_ind]
 
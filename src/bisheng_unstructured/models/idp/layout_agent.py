@@ -1,7 +1,6 @@
 import json
 
-import numpy as np
-import tritonclient.http as httpclient
+from bisheng_unstructured.models.triton_client import get_micro_batcher, get_triton_client
 
 
 # Layout Agent Version 0.1, update at 2023.08.18
@@ -12,19 +11,24 @@ class LayoutAgent(object):
         self.model = ep_parts[-2]
         self.server_url = ep_parts[2]
         self.timeout = kwargs.get("timeout", 60)
+        self.client = get_triton_client(
+            self.server_url, concurrency=kwargs.get("concurrency", 10), timeout=self.timeout
+        )
+        # batch the concurrent pages into one request, the model must support batching
+        self.batcher = get_micro_batcher(
+            self.client,
+            self.model,
+            max_batch_size=kwargs.get("max_batch_size", 1),
+            max_wait_ms=kwargs.get("batch_wait_ms", 5),
+        )
         self.params = {
             "longer_edge_size": 0,
         }
 
     def predict(self, inp):
-        input0_data = np.asarray([json.dumps(inp)], dtype=np.object_)
-        inputs = [httpclient.InferInput("INPUT", [1], "BYTES")]
-        inputs[0].set_data_from_numpy(input0_data)
-        outputs = [httpclient.InferRequestedOutput("OUTPUT")]
-        client = httpclient.InferenceServerClient(url=self.server_url, verbose=False)
         try:
-            response = client.infer(self.model, inputs, request_id=str(1), outputs=outputs)
-            output_data = json.loads(response.as_numpy("OUTPUT")[0].decode("utf-8"))
+            output = self.batcher.infer(json.dumps(inp))
+            output_data = json.loads(output.decode("utf-8"))
         except Exception as e:
             raise Exception(f"exception in layout predict: [{e}]")
         return output_data
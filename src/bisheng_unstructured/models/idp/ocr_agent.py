@@ -4,6 +4,7 @@ import os
 import requests
 
 from bisheng_unstructured.models.common import load_json
+from bisheng_unstructured.models.limiter import OVERLOAD_STATUS, endpoint_slot
 
 DEFAULT_CONFIG = {
     "params": {
@@ -81,7 +82,9 @@ class OCRAgent(object):
             from loguru import logger
 
             logger.info(f"ocr predict request: {params}")
-            r = self.client.post(url=self.ep, json=req_data, timeout=self.timeout)
+            with endpoint_slot(self.ep) as slot:
+                r = self.client.post(url=self.ep, json=req_data, timeout=self.timeout)
+                slot.failed = r.status_code in OVERLOAD_STATUS
             return r.json()
             # return r.json()
         except requests.exceptions.Timeout:
@@ -91,7 +94,9 @@ class OCRAgent(object):
 
     def _get_ep_result(self, ep, inp):
         try:
-            r = self.client.post(url=ep, json=inp, timeout=self.timeout)
+            with endpoint_slot(ep) as slot:
+                r = self.client.post(url=ep, json=inp, timeout=self.timeout)
+                slot.failed = r.status_code in OVERLOAD_STATUS
             ret = convert_json(r.json())
             return ret
         except requests.exceptions.Timeout:
@@ -1,10 +1,10 @@
 import copy
 import json
 
-import numpy as np
-import tritonclient.http as httpclient
 from loguru import logger
 
+from bisheng_unstructured.models.triton_client import get_micro_batcher, get_triton_client
+
 
 # Table Agent Version 0.1, update at 2023.08.31
 class TableAgent(object):
@@ -18,6 +18,13 @@ class TableAgent(object):
         self.rowcol_model = ep_parts[-2]
 
         self.timeout = kwargs.get("timeout", 60)
+        concurrency = kwargs.get("concurrency", 10)
+        self.cell_client = get_triton_client(
+            self.cell_server_url, concurrency=concurrency, timeout=self.timeout
+        )
+        self.rowcol_client = get_triton_client(
+            self.rowcol_server_url, concurrency=concurrency, timeout=self.timeout
+        )
         self.params = {
             "sep_char": " ",
             "longer_edge_size": None,
@@ -27,15 +34,9 @@ class TableAgent(object):
     def predict(self, inp):
         scene = inp.pop("scene", "rowcol")
         if scene == "rowcol":
-            client, model = (
-                httpclient.InferenceServerClient(url=self.rowcol_server_url, verbose=False),
-                self.rowcol_model,
-            )
+            client, model = self.rowcol_client, self.rowcol_model
         else:
-            client, model = (
-                httpclient.InferenceServerClient(url=self.cell_server_url, verbose=False),
-                self.cell_model,
-            )
+            client, model = self.cell_client, self.cell_model
 
         payload = copy.deepcopy(self.params)
         payload.update(inp)
@@ -45,16 +46,10 @@ class TableAgent(object):
         # b64_image = base64.b64encode(open(image_file, 'rb').read()).decode('utf-8')
         # payload = {'b64_image': b64_image, 'table_bboxes': table_bbox, 'ocr_result': ocr_result}
 
-        input0_data = np.asarray([json.dumps(payload)], dtype=np.object_)
-        # print(input0_data)
-        inputs = [httpclient.InferInput("INPUT", [1], "BYTES")]
-        inputs[0].set_data_from_numpy(input0_data)
-        outputs = [httpclient.InferRequestedOutput("OUTPUT")]
         try:
             logger.info("table predict request, model: {}", model)
-            response = client.infer(model, inputs, request_id=str(1), outputs=outputs)
-            print("response", response)
-            output_data = json.loads(response.as_numpy("OUTPUT")[0].decode("utf-8"))
+            outputs = client.infer(model, [json.dumps(payload)])
+            output_data = json.loads(outputs[0].decode("utf-8"))
         except Exception as e:
             raise Exception(f"exception in table structure predict: [{e}]")
 
@@ -67,18 +62,22 @@ class TableDetAgent(object):
         self.server_url = ep_parts[2]
         self.model = ep_parts[-2]
         self.timeout = kwargs.get("timeout", 60)
+        self.client = get_triton_client(
+            self.server_url, concurrency=kwargs.get("concurrency", 10), timeout=self.timeout
+        )
+        # batch the concurrent pages into one request, the model must support batching
+        self.batcher = get_micro_batcher(
+            self.client,
+            self.model,
+            max_batch_size=kwargs.get("max_batch_size", 1),
+            max_wait_ms=kwargs.get("batch_wait_ms", 5),
+        )
 
     def predict(self, inp):
         # b64data = base64.b64encode(open(image_file, 'rb').read()).decode('utf-8')
-        input0_data = np.asarray([json.dumps(inp)], dtype=np.object_)
-
-        inputs = [httpclient.InferInput("INPUT", [1], "BYTES")]
-        inputs[0].set_data_from_numpy(input0_data)
-        outputs = [httpclient.InferRequestedOutput("OUTPUT")]
-        client = httpclient.InferenceServerClient(url=self.server_url, verbose=False)
         try:
-            response = client.infer(self.model, inputs, request_id=str(1), outputs=outputs)
-            output_data = json.loads(response.as_numpy("OUTPUT")[0].decode("utf-8"))
+            output = self.batcher.infer(json.dumps(inp))
+            output_data = json.loads(output.decode("utf-8"))
         except Exception as e:
             raise Exception(f"exception in table det predict: [{e}]")
 
@@ -0,0 +1,200 @@
+"""Process-wide concurrency limit of the model endpoints.
+
+Every endpoint gets one `AdaptiveLimiter` shared by all documents and
+requests of the process. The limit follows the AIMD rule: it grows by one
+call per round trip while the recent latency stays near the long-term one,
+and it is cut by half on errors or when the recent latency rises over the
+band of `latency_ratio`, so the model server is kept busy without being
+pushed into queueing collapse. Both latencies are moving averages, the
+variance of single calls does not move the limit. An optional
+`FileSemaphore` puts a hard cap on the calls of all workers of the host.
+"""
+import fcntl
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from loguru import logger
+
+from bisheng_unstructured.common.metrics import REGISTRY, model_timer
+from bisheng_unstructured.config.settings import settings
+
+# the status codes of an overloaded model server
+OVERLOAD_STATUS = {429, 502, 503, 504}
+
+
+class FileSemaphore(object):
+    """Counting semaphore shared by the processes of the host, a slot is a locked file."""
+
+    def __init__(self, path_prefix: str, size: int, poll_interval: float = 0.01):
+        os.makedirs(os.path.dirname(path_prefix), exist_ok=True)
+        self.paths = [f"{path_prefix}.{i}.lock" for i in range(size)]
+        self.poll_interval = poll_interval
+
+    def acquire(self) -> int:
+        while True:
+            for path in self.paths:
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except BlockingIOError:
+                    os.close(fd)
+            time.sleep(self.poll_interval)
+
+    def release(self, fd: int):
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
+class Slot(object):
+    """A granted call, mark it failed when the response tells the server is overloaded"""
+
+    def __init__(self):
+        self.failed = False
+
+
+class AdaptiveLimiter(object):
+    # the weights of a new latency in the recent and the long-term average
+    RECENT_ALPHA = 0.1
+    BASE_ALPHA = 0.01
+    # the averages are plain means of the first calls
+    WARMUP_CALLS = 20
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        latency_ratio: float = 2.0,
+        backoff: float = 0.5,
+        shared: Optional[FileSemaphore] = None,
+    ):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_ratio = latency_ratio
+        self.backoff = backoff
+        self.shared = shared
+
+        self.inflight = 0
+        self.n_calls = 0
+        self.latency = 0.0
+        self.base_latency = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        with self._cond:
+            while self.inflight >= int(self.limit):
+                self._cond.wait()
+            self.inflight += 1
+
+        fd = None
+        slot = Slot()
+        start = time.time()
+        try:
+            if self.shared is not None:
+                fd = self.shared.acquire()
+                start = time.time()
+            yield slot
+        except Exception:
+            slot.failed = True
+            raise
+        finally:
+            latency = time.time() - start
+            if fd is not None:
+                self.shared.release(fd)
+            with self._cond:
+                self.inflight -= 1
+                if slot.failed:
+                    self._decrease()
+                else:
+                    self._on_success(latency)
+                self._cond.notify_all()
+
+    def _on_success(self, latency: float):
+        self.n_calls += 1
+        warmup = 1.0 / self.n_calls if self.n_calls <= self.WARMUP_CALLS else 0.0
+        self.latency += max(self.RECENT_ALPHA, warmup) * (latency - self.latency)
+        # the long-term latency follows the model slowly, the inputs of the model change
+        self.base_latency += max(self.BASE_ALPHA, warmup) * (latency - self.base_latency)
+
+        if self.latency > self.latency_ratio * self.base_latency:
+            self._decrease()
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def _decrease(self):
+        # the calls started under the old limit come back later, cut once per round trip
+        now = time.time()
+        if now - self._last_decrease < self.latency:
+            return
+        self._last_decrease = now
+        old_limit = self.limit
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        logger.debug(f"limiter [{self.name}] decrease limit {old_limit:.1f} -> {self.limit:.1f}")
+
+
+_LIMITERS: Dict[str, AdaptiveLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def _new_limiter(name: str) -> AdaptiveLimiter:
+    conf = settings.limiter_conf
+    shared = None
+    if conf.shared_dir and conf.shared_limit > 0:
+        key = "".join(c if c.isalnum() else "_" for c in name)
+        shared = FileSemaphore(os.path.join(conf.shared_dir, key), conf.shared_limit)
+    return AdaptiveLimiter(
+        name,
+        initial_limit=conf.initial_limit,
+        min_limit=conf.min_limit,
+        max_limit=conf.max_limit,
+        latency_ratio=conf.latency_ratio,
+        shared=shared,
+    )
+
+
+def get_limiter(endpoint: str) -> AdaptiveLimiter:
+    """Get the process-wide limiter of the endpoint"""
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(endpoint)
+        if limiter is None:
+            limiter = _new_limiter(endpoint)
+            _LIMITERS[endpoint] = limiter
+    return limiter
+
+
+@contextmanager
+def endpoint_slot(endpoint: str):
+    """Wait for a free slot of the endpoint, do nothing if the limiter is disabled"""
+    if not settings.limiter_conf.enable:
+        with model_timer(endpoint):
+            yield Slot()
+        return
+
+    with get_limiter(endpoint).slot() as slot:
+        with model_timer(endpoint):
+            yield slot
+
+
+def _limiter_values(attr: str):
+    with _LIMITERS_LOCK:
+        limiters = list(_LIMITERS.values())
+    return {(limiter.name,): float(getattr(limiter, attr)) for limiter in limiters}
+
+
+REGISTRY.gauge(
+    "bisheng_uns_limiter_limit", "Current concurrency limit of the model endpoints", ["endpoint"]
+).set_function(lambda: _limiter_values("limit"))
+REGISTRY.gauge(
+    "bisheng_uns_limiter_inflight", "Calls holding a limiter slot of the endpoints", ["endpoint"]
+).set_function(lambda: _limiter_values("inflight"))
@@ -10,6 +10,7 @@ from bisheng_unstructured.models.common import (
     bbox_overlap,
     draw_polygon,
     get_hori_rect_v2,
+    get_image_params,
     is_valid_box,
     join_line_outs,
     list2box,
@@ -18,6 +19,7 @@ from bisheng_unstructured.models.common import (
     sort_boxes,
     split_line_image,
 )
+from bisheng_unstructured.models.limiter import OVERLOAD_STATUS, endpoint_slot
 
 DEFAULT_CONFIG = {
     "params": {
@@ -74,7 +76,9 @@ class OCRAgent(object):
         req_data = {"param": params, "data": [b64_image]}
 
         try:
-            r = self.client.post(url=self.ep, json=req_data, timeout=self.timeout)
+            with endpoint_slot(self.ep) as slot:
+                r = self.client.post(url=self.ep, json=req_data, timeout=self.timeout)
+                slot.failed = r.status_code in OVERLOAD_STATUS
             return r.json()
         except requests.exceptions.Timeout:
             raise Exception(f"timeout in ocr predict")
@@ -83,7 +87,9 @@ class OCRAgent(object):
 
     def _get_ep_result(self, ep, inp):
         try:
-            r = self.client.post(url=ep, json=inp, timeout=self.timeout)
+            with endpoint_slot(ep) as slot:
+                r = self.client.post(url=ep, json=inp, timeout=self.timeout)
+                slot.failed = r.status_code in OVERLOAD_STATUS
             return r.json()
         except requests.exceptions.Timeout:
             raise Exception(f"timeout in formula agent predict")
@@ -109,7 +115,8 @@ class OCRAgent(object):
         cv2.imwrite("/public/bisheng/latex_data/xx.png", cv_img)
 
     def predict_with_mask(self, img0, mf_out, scene="print", **kwargs):
-        img = np.array(img0.copy())
+        image_params = get_image_params(kwargs)
+        img = np.array(img0)
         for box_info in mf_out:
             if box_info["type"] in ("isolated", "embedding"):
                 box = np.asarray(box_info["box"]).reshape((4, 2))
@@ -122,7 +129,7 @@ class OCRAgent(object):
                 img[ymin:ymax, xmin:xmax, :] = 255
 
         masked_image = Image.fromarray(img)
-        b64_image = save_pillow_to_base64(masked_image)
+        b64_image = save_pillow_to_base64(masked_image, **image_params)
         # b64_image = save_pillow_to_base64(img0)
 
         params = copy.deepcopy(self.params)
@@ -161,7 +168,7 @@ class OCRAgent(object):
         # recog the patches
         recog_data = []
         for bbox in text_bboxes:
-            b64_data = save_pillow_to_base64(masked_image.crop(bbox["position"]))
+            b64_data = save_pillow_to_base64(masked_image.crop(bbox["position"]), **image_params)
             recog_data.append(b64_data)
 
         params = copy.deepcopy(self.params)
@@ -185,9 +192,10 @@ class OCRAgent(object):
         return texts, bboxes, words_info
 
     def predict_with_patches(self, pil_images, scene="print_recog", **kwargs):
+        image_params = get_image_params(kwargs)
         recog_data = []
         for pil_img in pil_images:
-            b64_data = save_pillow_to_base64(pil_img)
+            b64_data = save_pillow_to_base64(pil_img, **image_params)
             recog_data.append(b64_data)
 
         params = copy.deepcopy(self.params)
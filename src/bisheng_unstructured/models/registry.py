@@ -0,0 +1,38 @@
+from typing import Optional
+
+from bisheng_unstructured.config.settings import settings
+from bisheng_unstructured.models.formula_agent import FormulaAgent
+from bisheng_unstructured.models.idp.layout_agent import LayoutAgent
+from bisheng_unstructured.models.idp.ocr_agent import OCRAgent
+from bisheng_unstructured.models.idp.table_agent import TableAgent, TableDetAgent
+from bisheng_unstructured.models.layout_agent import LayoutAgent as RTLayoutAgent
+from bisheng_unstructured.models.ocr_agent import OCRAgent as RTOCRAgent
+from bisheng_unstructured.models.table_agent import TableAgent as RTTableAgent
+from bisheng_unstructured.models.table_agent import TableDetAgent as RTTableDetAgent
+
+
+class AgentRegistry(object):
+    """The model agents used by the pdf and image documents.
+
+    The agents are stateless between calls, build the registry once and
+    share it by all documents to reuse the agents and their http sessions.
+    """
+
+    def __init__(self, model_params: dict, rt_type: str = "sdk", concurrency: Optional[int] = None):
+        if concurrency is None:
+            # keep enough connections for the highest limit of the endpoint limiter
+            concurrency = settings.limiter_conf.max_limit
+        params = {"concurrency": concurrency, **model_params}
+        if rt_type in {"sdk", "idp", "ocr_sdk"}:
+            self.layout_agent = LayoutAgent(**params)
+            self.table_agent = TableAgent(**params)
+            self.ocr_agent = OCRAgent(**params)
+            self.table_det_agent = TableDetAgent(**params)
+        else:
+            self.layout_agent = RTLayoutAgent(**params)
+            self.table_agent = RTTableAgent(**params)
+            self.ocr_agent = RTOCRAgent(**params)
+            self.table_det_agent = RTTableDetAgent(**params)
+
+        self.formula_agent = FormulaAgent(**params)
+        self.rt_type = rt_type
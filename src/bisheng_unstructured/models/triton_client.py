@@ -0,0 +1,222 @@
+import json
+import struct
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from bisheng_unstructured.models.limiter import OVERLOAD_STATUS, endpoint_slot
+
+# tritonclient.http.InferenceServerClient is built on gevent and can not be
+# shared by threads, so the agents talk the triton http/rest protocol through
+# a requests session, which keeps a thread-safe keep-alive connection pool.
+
+
+def serialize_bytes_tensor(elems: List[bytes]) -> bytes:
+    # triton binary BYTES tensor: <4 bytes little endian length><bytes> per element
+    chunks = []
+    for e in elems:
+        if isinstance(e, str):
+            e = e.encode("utf-8")
+        chunks.append(struct.pack("<I", len(e)))
+        chunks.append(e)
+    return b"".join(chunks)
+
+
+def deserialize_bytes_tensor(buffer: bytes) -> List[bytes]:
+    elems = []
+    offset = 0
+    while offset < len(buffer):
+        (length,) = struct.unpack_from("<I", buffer, offset)
+        offset += 4
+        elems.append(buffer[offset : offset + length])
+        offset += length
+    return elems
+
+
+class TritonHttpClient(object):
+    """Thread-safe client of the triton http/rest inference protocol."""
+
+    def __init__(self, server_url: str, concurrency: int = 10, timeout: float = 60):
+        self.server_url = server_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, concurrency))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _url(self, model: str) -> str:
+        if "://" in self.server_url:
+            return f"{self.server_url}/v2/models/{model}/infer"
+        return f"http://{self.server_url}/v2/models/{model}/infer"
+
+    def infer(
+        self,
+        model: str,
+        elems: List[bytes],
+        input_name: str = "INPUT",
+        output_name: str = "OUTPUT",
+        timeout: float = None,
+    ) -> List[bytes]:
+        """Send BYTES tensor `elems` in one request and return the output elements"""
+        binary_data = serialize_bytes_tensor(elems)
+        header = {
+            "inputs": [
+                {
+                    "name": input_name,
+                    "shape": [len(elems)],
+                    "datatype": "BYTES",
+                    "parameters": {"binary_data_size": len(binary_data)},
+                }
+            ],
+            "outputs": [{"name": output_name, "parameters": {"binary_data": True}}],
+        }
+        header_data = json.dumps(header).encode("utf-8")
+        headers = {
+            "Content-Type": "application/octet-stream",
+            "Inference-Header-Content-Length": str(len(header_data)),
+        }
+
+        url = self._url(model)
+        with endpoint_slot(url) as slot:
+            r = self.session.post(
+                url,
+                data=header_data + binary_data,
+                headers=headers,
+                timeout=timeout or self.timeout,
+            )
+            slot.failed = r.status_code in OVERLOAD_STATUS
+        header_length = r.headers.get("Inference-Header-Content-Length")
+        content = r.content
+        if header_length is None:
+            result = json.loads(content)
+            binary_content = b""
+        else:
+            header_length = int(header_length)
+            result = json.loads(content[:header_length])
+            binary_content = content[header_length:]
+
+        if r.status_code != 200 or "error" in result:
+            raise Exception(f"triton infer failed status=[{r.status_code}] err=[{result}]")
+
+        offset = 0
+        for output in result["outputs"]:
+            size = output.get("parameters", {}).get("binary_data_size")
+            if output["name"] != output_name:
+                offset += size or 0
+                continue
+            if size is None:
+                return [e.encode("utf-8") for e in output["data"]]
+            return deserialize_bytes_tensor(binary_content[offset : offset + size])
+
+        raise Exception(f"triton infer failed, output [{output_name}] not found")
+
+
+_CLIENTS: Dict[Tuple, TritonHttpClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_triton_client(server_url: str, concurrency: int = 10, timeout: float = 60):
+    """Get the process-wide shared client for the server"""
+    key = (server_url, concurrency, timeout)
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = TritonHttpClient(server_url, concurrency=concurrency, timeout=timeout)
+            _CLIENTS[key] = client
+    return client
+
+
+class _BatchRequest(object):
+    def __init__(self, elem):
+        self.elem = elem
+        self.result = None
+        self.error = None
+        self.lead = False
+        self.event = threading.Event()
+
+
+class MicroBatcher(object):
+    """Send the concurrent single element requests of a model as one batch.
+
+    The first waiting caller leads the batch: it waits up to `max_wait_ms` for
+    other callers, sends at most `max_batch_size` elements in one request and
+    hands the outputs back. With `max_batch_size` of 1 requests go directly.
+    """
+
+    def __init__(self, client, model: str, max_batch_size: int = 8, max_wait_ms: float = 5):
+        self.client = client
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = []
+        self._cond = threading.Condition()
+
+    def infer(self, elem) -> bytes:
+        if self.max_batch_size <= 1:
+            return self.client.infer(self.model, [elem])[0]
+
+        req = _BatchRequest(elem)
+        with self._cond:
+            self._pending.append(req)
+            req.lead = len(self._pending) == 1
+            if len(self._pending) >= self.max_batch_size:
+                self._cond.notify_all()
+
+        while True:
+            if req.lead:
+                req.lead = False
+                self._lead()
+            req.event.wait()
+            if req.lead:
+                # woken up to lead the next batch
+                req.event.clear()
+                continue
+            break
+
+        if req.error is not None:
+            raise req.error
+        return req.result
+
+    def _lead(self):
+        deadline = time.time() + self.max_wait
+        with self._cond:
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[: self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size :]
+            if self._pending:
+                # the requests left over lead the next batch
+                self._pending[0].lead = True
+                self._pending[0].event.set()
+
+        try:
+            outputs = self.client.infer(self.model, [r.elem for r in batch])
+            if len(outputs) != len(batch):
+                raise Exception(f"batch infer got {len(outputs)} outputs for {len(batch)} inputs")
+            for r, output in zip(batch, outputs):
+                r.result = output
+        except Exception as e:
+            for r in batch:
+                r.error = e
+        for r in batch:
+            r.event.set()
+
+
+_BATCHERS: Dict[Tuple, MicroBatcher] = {}
+
+
+def get_micro_batcher(client, model: str, max_batch_size: int = 1, max_wait_ms: float = 5):
+    """Get the process-wide shared batcher of the model"""
+    key = (id(client), model, max_batch_size, max_wait_ms)
+    with _CLIENTS_LOCK:
+        batcher = _BATCHERS.get(key)
+        if batcher is None:
+            batcher = MicroBatcher(client, model, max_batch_size, max_wait_ms)
+            _BATCHERS[key] = batcher
+    return batcher
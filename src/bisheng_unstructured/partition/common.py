@@ -1,17 +1,29 @@
 from __future__ import annotations
 
 import os
-import subprocess
 from datetime import datetime
 from io import BufferedReader, BytesIO, TextIOWrapper
 from tempfile import SpooledTemporaryFile
-from typing import IO, TYPE_CHECKING, Any, BinaryIO, Dict, List, Optional, Tuple, Union
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import emoji
 from docx.table import _Cell, _Row
 from loguru import logger
 from tabulate import tabulate
 
+from bisheng_unstructured.common.office_pool import office_convert
 from bisheng_unstructured.documents.coordinates import CoordinateSystem
 from bisheng_unstructured.documents.elements import (
     TYPE_TO_TEXT_ELEMENT_MAP,
@@ -23,6 +35,7 @@ from bisheng_unstructured.documents.elements import (
     PageBreak,
     Text,
 )
+from bisheng_unstructured.documents.markdown import html_row, markdown_row
 from bisheng_unstructured.nlp.patterns import ENUMERATED_BULLETS_RE, UNICODE_BULLETS_RE
 from bisheng_unstructured.utils import dependency_exists
 
@@ -252,35 +265,13 @@ def convert_office_doc(
     # users who do not have LibreOffice installed
     # ref: https://stackoverflow.com/questions/38468442/
     #       multiple-doc-to-docx-file-conversion-using-python
-    command = [
-        "soffice",
-        "--headless",
-        "--convert-to",
-        target_format,
-        "--outdir",
-        output_directory,
-        input_filename,
-    ]
     try:
-        process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
-        output, error = process.communicate()
+        output_filename = office_convert(input_filename, output_directory, target_format)
+        logger.info(f"convert {input_filename} -> {output_filename}")
     except FileNotFoundError:
-        raise FileNotFoundError(
-            """soffice command was not found. Please install libreoffice
-on your system and try again.
-
-- Install instructions: https://www.libreoffice.org/get-help/install-howto/
-- Mac: https://formulae.brew.sh/cask/libreoffice
-- Debian: https://wiki.debian.org/LibreOffice""",
-        )
-
-    logger.info(output.decode().strip())
-    if error:
-        logger.error(error.decode().strip())
+        raise
+    except Exception as e:
+        logger.error(str(e))
 
 
 def exactly_one(**kwargs) -> None:
@@ -362,6 +353,63 @@ def convert_ms_office_table_to_text(table: "docxtable.Table", as_html: bool = Tr
     return table_text
 
 
+def iter_row_tables(
+    rows: Iterable[List[str]],
+    include_header: bool = True,
+    rows_per_table: Optional[int] = None,
+) -> Iterator[Tuple[str, str]]:
+    """Render the rows of cell texts into tables, yield the `(markdown, html)` of each table.
+
+    The rows are consumed one by one, a table is yielded every `rows_per_table`
+    rows, or once at the end if it is not set. The first row is the header of
+    every table when `include_header` is true. The rows of a table are padded
+    to the width of its longest row.
+    """
+    if rows_per_table is not None and rows_per_table <= 0:
+        raise ValueError(f"rows_per_table must be a positive integer, got {rows_per_table}")
+
+    rows = iter(rows)
+    header = next(rows, None) if include_header else None
+    if header is None and include_header:
+        return
+
+    def _render(md_lines, html_lines, widths):
+        # the rows are rendered as they come, the short ones are padded at the end
+        width = max(widths + [len(header)] if header is not None else widths)
+        for i, row_width in enumerate(widths):
+            if row_width == 0:
+                md_lines[i] = markdown_row([""] * width)
+                html_lines[i] = html_row([""] * width)
+            elif row_width < width:
+                md_lines[i] = md_lines[i] + "  |" * (width - row_width)
+                html_lines[i] = html_lines[i][:-5] + "<td></td>" * (width - row_width) + "</tr>"
+        # markdown always has a header line, it's the first row without the header
+        if header is not None:
+            head = header + [""] * (width - len(header))
+            md_lines = [markdown_row(head)] + md_lines
+            thead = "<thead>" + html_row(head, "th") + "</thead>"
+        else:
+            thead = ""
+        md_lines.insert(1, markdown_row(["---"] * width))
+        tbody = "<tbody>" + "".join(html_lines) + "</tbody>"
+        return "\n".join(md_lines), f'<table border="1">{thead}{tbody}</table>'
+
+    md_lines, html_lines, widths = [], [], []
+    n_tables = 0
+    for row in rows:
+        md_lines.append(markdown_row(row))
+        html_lines.append(html_row(row))
+        widths.append(len(row))
+        if rows_per_table is not None and len(widths) >= rows_per_table:
+            yield _render(md_lines, html_lines, widths)
+            n_tables += 1
+            md_lines, html_lines, widths = [], [], []
+
+    # a sheet with only the header is still a table
+    if widths or (header is not None and n_tables == 0):
+        yield _render(md_lines, html_lines, widths)
+
+
 def contains_emoji(s: str) -> bool:
     """
     Check if the input string contains any emoji characters.
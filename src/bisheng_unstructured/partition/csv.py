@@ -1,8 +1,9 @@
+import csv
+import io
 from tempfile import SpooledTemporaryFile
-from typing import IO, BinaryIO, List, Optional, Union, cast
+from typing import IO, BinaryIO, Iterator, List, Optional, Union, cast
 
-import pandas as pd
-from lxml.html.soupparser import fromstring as soupparser_fromstring
+from loguru import logger
 
 from bisheng_unstructured.documents.elements import (
     Element,
@@ -10,14 +11,95 @@ from bisheng_unstructured.documents.elements import (
     Table,
     process_metadata,
 )
+from bisheng_unstructured.file_utils.encoding import (
+    detect_sample_encoding,
+    detect_stream_encoding,
+    format_encoding_str,
+)
 from bisheng_unstructured.file_utils.filetype import FileType, add_metadata_with_filetype
 from bisheng_unstructured.partition.common import (
     exactly_one,
     get_last_modified_date,
     get_last_modified_date_from_file,
+    iter_row_tables,
     spooled_to_bytes_io_if_needed,
 )
 
+# the bytes read to detect the encoding, the rest of the file is decoded as it's read,
+# the encoding is detected from the whole file if the rest fails to decode
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+
+def iter_csv_rows(
+    f: IO[bytes], delimiter: str = ",", encoding: Optional[str] = None
+) -> Iterator[List[str]]:
+    """Yield the rows of the csv file as it's read, the blank lines are skipped"""
+    if encoding is None:
+        encoding = detect_sample_encoding(f.read(ENCODING_SAMPLE_SIZE))
+        f.seek(0)
+    else:
+        encoding = format_encoding_str(encoding)
+
+    text = io.TextIOWrapper(f, encoding=encoding, newline="")
+    try:
+        for row in csv.reader(text, delimiter=delimiter):
+            if row:
+                yield row
+    finally:
+        # keep the file of the caller open
+        text.detach()
+
+
+def csv_to_elements(
+    filename: Optional[str] = None,
+    file: Optional[Union[IO[bytes], SpooledTemporaryFile]] = None,
+    delimiter: str = ",",
+    encoding: Optional[str] = None,
+    include_header: bool = True,
+    rows_per_table: Optional[int] = None,
+    include_metadata: bool = True,
+    metadata_filename: Optional[str] = None,
+    metadata_last_modified: Optional[str] = None,
+) -> List[Element]:
+    """Stream the rows of the delimited file into Table elements"""
+    exactly_one(filename=filename, file=file)
+
+    def _to_elements(f, last_modification_date, encoding):
+        elements: List[Element] = []
+        rows = iter_csv_rows(f, delimiter, encoding)
+        for text, html_text in iter_row_tables(rows, include_header, rows_per_table):
+            if include_metadata:
+                metadata = ElementMetadata(
+                    text_as_html=html_text,
+                    filename=metadata_filename or filename,
+                    last_modified=metadata_last_modified or last_modification_date,
+                )
+            else:
+                metadata = ElementMetadata()
+
+            elements.append(Table(text=text, metadata=metadata))
+        return elements
+
+    def _partition(f, last_modification_date):
+        if encoding is not None:
+            return _to_elements(f, last_modification_date, encoding)
+        try:
+            return _to_elements(f, last_modification_date, None)
+        except UnicodeDecodeError as e:
+            logger.warning(f"csv fails to decode with the encoding of the sample, err=[{e}]")
+        return _to_elements(f, last_modification_date, detect_stream_encoding(f))
+
+    if filename:
+        with open(filename, "rb") as f:
+            return _partition(f, get_last_modified_date(filename))
+
+    f = spooled_to_bytes_io_if_needed(
+        cast(Union[BinaryIO, SpooledTemporaryFile], file),
+    )
+    if isinstance(f, bytes):
+        f = io.BytesIO(f)
+    return _partition(f, get_last_modified_date_from_file(file))
+
 
 @process_metadata()
 @add_metadata_with_filetype(FileType.CSV)
@@ -27,6 +109,9 @@ def partition_csv(
     metadata_filename: Optional[str] = None,
     metadata_last_modified: Optional[str] = None,
     include_metadata: bool = True,
+    encoding: Optional[str] = None,
+    include_header: bool = True,
+    rows_per_table: Optional[int] = None,
     **kwargs,
 ) -> List[Element]:
     """Partitions Microsoft Excel Documents in .csv format into its document elements.
@@ -43,30 +128,22 @@ def partition_csv(
         The last modified date for the document.
     include_metadata
         Determines whether or not metadata is included in the output.
+    encoding
+        The encoding of the file, it's detected from the beginning of the file if not set.
+    include_header
+        Determines whether or not the first row is the header of the tables.
+    rows_per_table
+        Split the file into tables of at most this many rows, each with the header.
+        The file is a single table if not set.
     """
-    exactly_one(filename=filename, file=file)
-
-    if filename:
-        table = pd.read_csv(filename)
-        last_modification_date = get_last_modified_date(filename)
-
-    elif file:
-        last_modification_date = get_last_modified_date_from_file(file)
-        f = spooled_to_bytes_io_if_needed(
-            cast(Union[BinaryIO, SpooledTemporaryFile], file),
-        )
-        table = pd.read_csv(f)
-
-    html_text = table.to_html(index=False, header=False, na_rep="")
-    text = soupparser_fromstring(html_text).text_content()
-
-    if include_metadata:
-        metadata = ElementMetadata(
-            text_as_html=html_text,
-            filename=metadata_filename or filename,
-            last_modified=metadata_last_modified or last_modification_date,
-        )
-    else:
-        metadata = ElementMetadata()
-
-    return [Table(text=text, metadata=metadata)]
+    return csv_to_elements(
+        filename=filename,
+        file=file,
+        delimiter=",",
+        encoding=encoding,
+        include_header=include_header,
+        rows_per_table=rows_per_table,
+        include_metadata=include_metadata,
+        metadata_filename=metadata_filename,
+        metadata_last_modified=metadata_last_modified,
+    )
@@ -5,9 +5,9 @@ from tempfile import SpooledTemporaryFile
 from typing import IO, BinaryIO, List, Optional, Tuple, Union, cast
 
 import docx
+from docx.enum.style import WD_STYLE_TYPE
 from docx.oxml.shared import qn
 from docx.table import Table as DocxTable
-from docx.table import _Cell, _Row
 from docx.text.paragraph import Paragraph
 from docx.text.run import Run
 from loguru import logger
@@ -115,6 +115,29 @@ def _get_paragraph_runs(paragraph):
 # Add the runs property to the Paragraph class
 Paragraph.runs = property(lambda self: _get_paragraph_runs(self))
 
+# NOTE - The body is walked on the lxml tree directly, python-docx proxies and
+# `element.xml` serialization are too slow for large documents
+_NSMAP = {"w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main"}
+_TAG_R = qn("w:r")
+_TAG_HYPERLINK = qn("w:hyperlink")
+_TAG_T = qn("w:t")
+_TAG_TAB = qn("w:tab")
+_TAG_BREAKS = (qn("w:br"), qn("w:cr"))
+_TAG_RPR = qn("w:rPr")
+_TAG_B = qn("w:b")
+_TAG_I = qn("w:i")
+_TAG_TR = qn("w:tr")
+_TAG_TC = qn("w:tc")
+_TAG_P = qn("w:p")
+_ATTR_VAL = qn("w:val")
+_HAS_NUMBERING = etree.XPath("boolean(.//w:numPr[*])", namespaces=_NSMAP)
+_HAS_PAGEBREAK = etree.XPath(
+    'boolean(descendant-or-self::w:br[@w:type="page"] '
+    "| descendant-or-self::w:lastRenderedPageBreak)",
+    namespaces=_NSMAP,
+)
+_PARAGRAPH_STYLE_ID = etree.XPath("string(w:pPr/w:pStyle/@w:val)", namespaces=_NSMAP)
+
 
 @process_metadata()
 @add_metadata_with_filetype(FileType.DOCX)
@@ -163,7 +186,7 @@ def partition_docx(
         )
 
     elements: List[Element] = []
-    table_index = 0
+    style_names = {}
 
     headers_and_footers = _get_headers_and_footers(document, metadata_filename)
     if len(headers_and_footers) > 0:
@@ -176,8 +199,8 @@ def partition_docx(
     for element_item in document.element.body:
         # print("---element_item---", element_item, element_item.tag, element_item.xml)
         if element_item.tag.endswith("tbl"):
-            table = document.tables[table_index]
-            emphasized_texts = _get_emphasized_texts_from_table(table)
+            table = DocxTable(element_item, document._body)
+            emphasized_texts = _get_emphasized_texts_from_table(element_item)
             emphasized_text_contents, emphasized_text_tags = _extract_contents_and_tags(
                 emphasized_texts,
             )
@@ -195,16 +218,17 @@ def partition_docx(
                     emphasized_text_tags=emphasized_text_tags,
                 )
                 elements.append(element)
-            table_index += 1
         elif element_item.tag.endswith("p"):
-            if "<w:numPr>" in element_item.xml:
+            if _HAS_NUMBERING(element_item):
                 is_list = True
-            paragraph = docx.text.paragraph.Paragraph(element_item, document)
-            emphasized_texts = _get_emphasized_texts_from_paragraph(paragraph)
+            text, emphasized_texts = _get_paragraph_contents(element_item)
             emphasized_text_contents, emphasized_text_tags = _extract_contents_and_tags(
                 emphasized_texts,
             )
-            para_element: Optional[Text] = _paragraph_to_element(paragraph, is_list, language)
+            style_name = _get_style_name(document, _paragraph_style_id(element_item), style_names)
+            para_element: Optional[Text] = _paragraph_to_element(
+                text, style_name, is_list, language
+            )
             if para_element is not None:
                 para_element.metadata = ElementMetadata(
                     filename=metadata_filename,
@@ -241,29 +265,40 @@ def partition_docx(
     return elements
 
 
+def _paragraph_style_id(p) -> Optional[str]:
+    return _PARAGRAPH_STYLE_ID(p) or None
+
+
+def _get_style_name(document, style_id: Optional[str], style_names: dict) -> Optional[str]:
+    """The UI name of the paragraph style, each style id is looked up in styles.xml once.
+    Unknown style ids fall back to the default paragraph style as in python-docx."""
+    if style_id not in style_names:
+        style = document.part.get_style(style_id, WD_STYLE_TYPE.PARAGRAPH)
+        style_names[style_id] = style.name if style is not None else None
+    return style_names[style_id]
+
+
 def _paragraph_to_element(
-    paragraph: docx.text.paragraph.Paragraph, is_list=False, language="eng"
+    text: str, style_name: Optional[str], is_list=False, language="eng"
 ) -> Optional[Text]:
-    """Converts a docx Paragraph object into the appropriate unstructured document element.
+    """Converts the text of a docx paragraph into the appropriate unstructured document element.
     If the paragraph style is "Normal" or unknown, we try to predict the element type from the
     raw text."""
-    text = paragraph.text
     # normailize the text
     text = text.strip("\n")
-    style_name = paragraph.style and paragraph.style.name  # .style can be None
 
     if len(text.strip()) == 0:
         return None
 
-    if paragraph.style and "Heading" in paragraph.style.name:
+    if style_name and "Heading" in style_name:
         element = Title(text)
         try:
-            element.metadata.extra_data = {"title_level": int(paragraph.style.name[-1])}
-            # logger.info(f"{paragraph.style.name}")
+            element.metadata.extra_data = {"title_level": int(style_name[-1])}
+            # logger.info(f"{style_name}")
         except Exception as e:
-            logger.warning(f"{paragraph.style.name}", e)
+            logger.warning(f"{style_name}", e)
             pattern = r"Heading (\d+)"
-            match = re.search(pattern, paragraph.style.name)
+            match = re.search(pattern, style_name)
             element.metadata.extra_data = {"title_level": int(match.group(1))}
 
         return element
@@ -285,15 +320,7 @@ def _element_contains_pagebreak(element) -> bool:
     (page breaks inserted by the user) and "soft" page breaks, which are sometimes
     inserted by the MS Word renderer. Note that soft page breaks aren't always present.
     Whether or not pages are tracked may depend on your Word renderer."""
-    page_break_indicators = [
-        ["w:br", 'type="page"'],  # "Hard" page break inserted by user
-        ["lastRenderedPageBreak"],  # "Soft" page break inserted by renderer
-    ]
-    if hasattr(element, "xml"):
-        for indicators in page_break_indicators:
-            if all(indicator in element.xml for indicator in indicators):
-                return True
-    return False
+    return bool(_HAS_PAGEBREAK(element))
 
 
 def _text_to_element(text: str, is_list=False, language="eng") -> Optional[Text]:
@@ -414,28 +441,62 @@ def convert_and_partition_docx(
     return elements
 
 
-def _get_emphasized_texts_from_paragraph(paragraph: Paragraph) -> List[dict]:
-    """Get emphasized texts with bold/italic formatting from a paragraph in MS Word"""
+def _iter_runs(node):
+    """Yields the `w:r` children of a paragraph, including the runs in hyperlinks."""
+    for child in node:
+        if child.tag == _TAG_R:
+            yield child
+        elif child.tag == _TAG_HYPERLINK:
+            yield from _iter_runs(child)
+
+
+def _get_run_text(r) -> str:
+    """Same as python-docx `Run.text`, tabs and line breaks are mapped to \\t and \\n."""
+    texts = []
+    for child in r:
+        if child.tag == _TAG_T:
+            texts.append(child.text or "")
+        elif child.tag == _TAG_TAB:
+            texts.append("\t")
+        elif child.tag in _TAG_BREAKS:
+            texts.append("\n")
+    return "".join(texts)
+
+
+def _is_run_formatted(r, tag: str) -> bool:
+    """Whether the on/off property of the run, e.g. `w:b`, is on. Styles are not resolved."""
+    r_pr = r.find(_TAG_RPR)
+    prop = r_pr.find(tag) if r_pr is not None else None
+    if prop is None:
+        return False
+    return prop.get(_ATTR_VAL, "true") in ("1", "true", "on")
+
+
+def _get_paragraph_contents(p) -> Tuple[str, List[dict]]:
+    """Get the text and the emphasized texts with bold/italic formatting from a `w:p`
+    element in a single pass over its runs."""
+    texts = []
     emphasized_texts = []
-    for run in paragraph.runs:
-        text = run.text.strip() if run.text else None
+    for r in _iter_runs(p):
+        run_text = _get_run_text(r)
+        texts.append(run_text)
+        text = run_text.strip()
         if not text:
             continue
-        if run.bold:
+        if _is_run_formatted(r, _TAG_B):
             emphasized_texts.append({"text": text, "tag": "b"})
-        if run.italic:
+        if _is_run_formatted(r, _TAG_I):
             emphasized_texts.append({"text": text, "tag": "i"})
-    return emphasized_texts
+    return "".join(texts), emphasized_texts
 
 
-def _get_emphasized_texts_from_table(table: DocxTable) -> List[dict]:
+def _get_emphasized_texts_from_table(tbl) -> List[dict]:
+    """Get emphasized texts from the paragraphs in the cells of a `w:tbl` element"""
     emphasized_texts = []
-    for row in table.rows:
-        row_cells = [_Cell(tc, table) for tc in row._tr.tc_lst]
-        for cell in row_cells:
-            for paragraph in cell.paragraphs:
-                _emphasized_texts = _get_emphasized_texts_from_paragraph(paragraph)
-                emphasized_texts += _emphasized_texts
+    for tr in tbl.iterchildren(_TAG_TR):
+        for tc in tr.iterchildren(_TAG_TC):
+            for p in tc.iterchildren(_TAG_P):
+                emphasized_texts += _get_paragraph_contents(p)[1]
     return emphasized_texts
 
 
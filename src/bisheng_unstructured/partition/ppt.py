@@ -72,6 +72,7 @@ def partition_ppt(
             filename=pptx_filename,
             metadata_filename=metadata_filename,
             metadata_last_modified=metadata_last_modified or last_modification_date,
+            native=kwargs.get("native", False),
         )
 
     # remove tmp.name from filename if parsing file
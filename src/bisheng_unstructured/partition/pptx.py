@@ -38,6 +38,8 @@ RE_MULTLINES = re.compile(pattern=r"\n+", flags=re.DOTALL)
 RE_SPACES = re.compile(pattern=r"[ \t\r\f\v]+", flags=re.DOTALL)
 RE_NORMAL_SPACES = re.compile(pattern=r"\s+", flags=re.DOTALL)
 
+EMU_PER_POINT = 12700
+
 
 @process_metadata()
 @add_metadata_with_filetype(FileType.PPTX)
@@ -49,6 +51,7 @@ def partition_pptx(
     include_metadata: bool = True,
     metadata_last_modified: Optional[str] = None,
     include_slide_notes: bool = False,
+    native: bool = False,
     **kwargs,
 ) -> List[Element]:
     """Partitions Microsoft PowerPoint Documents in .pptx format into its document elements.
@@ -71,6 +74,9 @@ def partition_pptx(
 
     include_slide_notes
         If True, includes the slide notes as element
+    native
+        If True, the bbox of the shape in points and the page number are added to the
+        `extra_data` of the elements for the native partition mode
     """
 
     # Verify that only one of the arguments was provided
@@ -124,6 +130,7 @@ def partition_pptx(
                         text_as_html=html_table,
                         page_number=metadata.page_number,
                         last_modified=metadata_last_modified or last_modification_date,
+                        extra_data=_shape_extra_data(shape, i) if native else None,
                     )
                     elements.append(Table(text=text_table, metadata=metadata))
                 continue
@@ -135,7 +142,10 @@ def partition_pptx(
             shape_infos.append({"runs": shape_info, "bbox": bbox})
             metadata = {"bbox": bbox, "page_bbox": page_bbox}
             metadata = ElementMetadata(
-                page_number=i, text_as_html=json.dumps(metadata), page_name="paragraph"
+                page_number=i,
+                text_as_html=json.dumps(metadata),
+                page_name="paragraph",
+                extra_data=_shape_extra_data(shape, i) if native else None,
             )
 
             TITLE_AREA_THRESHOLD = 0.2
@@ -176,6 +186,14 @@ def partition_pptx(
     return elements
 
 
+def _shape_extra_data(shape, slide_index: int) -> dict:
+    """The bbox of the shape in points and the page number, same as the slide in the pdf"""
+    left, top = shape.left or 0, shape.top or 0
+    width, height = shape.width or 0, shape.height or 0
+    bbox = [left, top, left + width, top + height]
+    return {"bboxes": [[round(v / EMU_PER_POINT, 2) for v in bbox]], "pages": [slide_index + 1]}
+
+
 def _order_shapes(shapes):
     """Orders the shapes from top to bottom and left to right."""
     return sorted(shapes, key=lambda x: (x.top or 0, x.left or 0))
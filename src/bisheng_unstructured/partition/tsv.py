@@ -1,22 +1,9 @@
 from tempfile import SpooledTemporaryFile
-from typing import IO, BinaryIO, List, Optional, Union, cast
+from typing import IO, List, Optional, Union
 
-import pandas as pd
-from lxml.html.soupparser import fromstring as soupparser_fromstring
-
-from bisheng_unstructured.documents.elements import (
-    Element,
-    ElementMetadata,
-    Table,
-    process_metadata,
-)
+from bisheng_unstructured.documents.elements import Element, process_metadata
 from bisheng_unstructured.file_utils.filetype import FileType, add_metadata_with_filetype
-from bisheng_unstructured.partition.common import (
-    exactly_one,
-    get_last_modified_date,
-    get_last_modified_date_from_file,
-    spooled_to_bytes_io_if_needed,
-)
+from bisheng_unstructured.partition.csv import csv_to_elements
 
 
 @process_metadata()
@@ -27,6 +14,9 @@ def partition_tsv(
     metadata_filename: Optional[str] = None,
     metadata_last_modified: Optional[str] = None,
     include_metadata: bool = True,
+    encoding: Optional[str] = None,
+    include_header: bool = True,
+    rows_per_table: Optional[int] = None,
     **kwargs,
 ) -> List[Element]:
     """Partitions TSV files into document elements.
@@ -41,29 +31,22 @@ def partition_tsv(
         Determines whether or not metadata is included in the output.
     metadata_last_modified
         The day of the last modification
+    encoding
+        The encoding of the file, it's detected from the beginning of the file if not set.
+    include_header
+        Determines whether or not the first row is the header of the tables.
+    rows_per_table
+        Split the file into tables of at most this many rows, each with the header.
+        The file is a single table if not set.
     """
-    exactly_one(filename=filename, file=file)
-    last_modification_date = None
-    if filename:
-        table = pd.read_csv(filename, sep="\t")
-        last_modification_date = get_last_modified_date(filename)
-    elif file:
-        f = spooled_to_bytes_io_if_needed(
-            cast(Union[BinaryIO, SpooledTemporaryFile], file),
-        )
-        table = pd.read_csv(f, sep="\t")
-        last_modification_date = get_last_modified_date_from_file(file)
-
-    html_text = table.to_html(index=False, header=False, na_rep="")
-    text = soupparser_fromstring(html_text).text_content()
-
-    if include_metadata:
-        metadata = ElementMetadata(
-            text_as_html=html_text,
-            filename=metadata_filename or filename,
-            last_modified=metadata_last_modified or last_modification_date,
-        )
-    else:
-        metadata = ElementMetadata()
-
-    return [Table(text=text, metadata=metadata)]
+    return csv_to_elements(
+        filename=filename,
+        file=file,
+        delimiter="\t",
+        encoding=encoding,
+        include_header=include_header,
+        rows_per_table=rows_per_table,
+        include_metadata=include_metadata,
+        metadata_filename=metadata_filename,
+        metadata_last_modified=metadata_last_modified,
+    )
@@ -3,16 +3,11 @@ import tempfile
 from tempfile import SpooledTemporaryFile
 from typing import IO, BinaryIO, List, Optional, Union, cast
 
-import pandas as pd
-from lxml.html.soupparser import fromstring as soupparser_fromstring
+import xlrd
+from loguru import logger
 
-from bisheng_unstructured.documents.elements import (
-    Element,
-    ElementMetadata,
-    Table,
-    process_metadata,
-)
-from bisheng_unstructured.documents.markdown import transform_html_table_to_md
+from bisheng_unstructured.common.office_pool import office_convert
+from bisheng_unstructured.documents.elements import Element, process_metadata
 from bisheng_unstructured.file_utils.filetype import FileType, add_metadata_with_filetype
 from bisheng_unstructured.partition.common import (
     exactly_one,
@@ -20,15 +15,52 @@ from bisheng_unstructured.partition.common import (
     get_last_modified_date_from_file,
     spooled_to_bytes_io_if_needed,
 )
+from bisheng_unstructured.partition.xlsx import sheets_to_elements, xlsx_to_elements
 
 
-def run_cmd(cmd):
-    try:
-        exit_code = os.system(cmd)
-        if exit_code != 0:
-            raise Exception("error in transforming xlx to xlsx")
-    except Exception as e:
-        raise e
+def _cell_values(types, values, datemode) -> list:
+    """Convert the cells of a xls row to the python values, as openpyxl reads them"""
+    row = []
+    for ctype, value in zip(types, values):
+        if ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+            value = None
+        elif ctype == xlrd.XL_CELL_DATE:
+            try:
+                date = xlrd.xldate.xldate_as_datetime(value, datemode)
+                value = date.time() if value < 1 else date
+            except xlrd.xldate.XLDateError:
+                pass
+        elif ctype == xlrd.XL_CELL_BOOLEAN:
+            value = bool(value)
+        elif ctype == xlrd.XL_CELL_ERROR:
+            value = xlrd.error_text_from_code.get(value)
+        row.append(value)
+    return row
+
+
+def xls_to_elements(file: Union[str, bytes], **kwargs) -> List[Element]:
+    """Read the sheets of the xls file or contents with xlrd into `sheets_to_elements`"""
+
+    def _iter_sheets():
+        for index in range(book.nsheets):
+            sheet = book.sheet_by_index(index)
+            rows = (
+                _cell_values(sheet.row_types(i), sheet.row_values(i), book.datemode)
+                for i in range(sheet.nrows)
+            )
+            yield sheet.name, rows
+            book.unload_sheet(index)
+
+    # xlrd prints the warnings of the malformed files to stdout by default
+    with open(os.devnull, "w") as devnull:
+        if isinstance(file, bytes):
+            book = xlrd.open_workbook(file_contents=file, on_demand=True, logfile=devnull)
+        else:
+            book = xlrd.open_workbook(file, on_demand=True, logfile=devnull)
+        try:
+            return sheets_to_elements(_iter_sheets(), **kwargs)
+        finally:
+            book.release_resources()
 
 
 @process_metadata()
@@ -40,9 +72,14 @@ def partition_xls(
     include_metadata: bool = True,
     metadata_last_modified: Optional[str] = None,
     include_header: bool = True,
+    rows_per_table: Optional[int] = None,
     **kwargs,
 ) -> List[Element]:
-    """Partitions Microsoft Excel Documents in .xlsx format into its document elements.
+    """Partitions Microsoft Excel Documents in .xls format into its document elements.
+
+    The file is read with xlrd, it's converted to .xlsx by LibreOffice only if xlrd
+    can't read it, e.g. a .xlsx or a .html file saved with the .xls extension or a
+    corrupt file.
 
     Parameters
     ----------
@@ -56,58 +93,37 @@ def partition_xls(
         The day of the last modification
     include_header
         Determines whether or not header info info is included in text and medatada.text_as_html
+    rows_per_table
+        Split the sheets into tables of at most this many rows, each with the header.
+        A sheet is a single table if not set.
     """
-    cmd_template = "soffice --headless --convert-to xlsx --outdir {1} {0}"
-    sheets = None
-
     exactly_one(filename=filename, file=file)
-    last_modification_date = None
     if filename:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            new_file = os.path.basename(filename).rsplit(".", 1)[0] + ".xlsx"
-            tmp_file = os.path.join(temp_dir, new_file)
-            run_cmd(cmd_template.format(filename, temp_dir))
-            sheets = pd.read_excel(tmp_file, sheet_name=None)
         last_modification_date = get_last_modified_date(filename)
     elif file:
         f = spooled_to_bytes_io_if_needed(
             cast(Union[BinaryIO, SpooledTemporaryFile], file),
         )
-        with tempfile.TemporaryDirectory() as temp_dir:
-            ori_src = os.path.join(temp_dir, "ori.xls")
-            ori_tgt = os.path.join(temp_dir, "ori.xlsx")
-            with open(ori_src, "wb") as fout:
-                if isinstance(f, bytes):
-                    fout.write(f)
-                else:
-                    fout.write(f.read())
-
-            run_cmd(cmd_template.format(ori_src, temp_dir))
-            sheets = pd.read_excel(ori_tgt, sheet_name=None)
-
+        contents = f if isinstance(f, bytes) else f.read()
         last_modification_date = get_last_modified_date_from_file(file)
 
-    elements: List[Element] = []
-    page_number = 0
-    for sheet_name, table in sheets.items():
-        page_number += 1
-        html_text = table.to_html(index=False, header=include_header, na_rep="")
-        text = transform_html_table_to_md(html_text)["text"]
-
-        # text = soupparser_fromstring(html_text).text_content()
-
-        if include_metadata:
-            metadata = ElementMetadata(
-                text_as_html=html_text,
-                page_name=sheet_name,
-                page_number=page_number,
-                filename=metadata_filename or filename,
-                last_modified=metadata_last_modified or last_modification_date,
-            )
-        else:
-            metadata = ElementMetadata()
-
-        table = Table(text=text, metadata=metadata)
-        elements.append(table)
+    options = dict(
+        include_header=include_header,
+        rows_per_table=rows_per_table,
+        include_metadata=include_metadata,
+        filename=metadata_filename or filename,
+        last_modified=metadata_last_modified or last_modification_date,
+    )
+    try:
+        return xls_to_elements(filename or contents, **options)
+    except Exception as e:
+        # besides XLRDError, a truncated or corrupt file fails with any error
+        logger.warning(f"xlrd failed to read the xls, convert it with soffice, err=[{e}]")
 
-    return elements
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if filename is None:
+            filename = os.path.join(temp_dir, "ori.xls")
+            with open(filename, "wb") as fout:
+                fout.write(contents)
+        tmp_file = office_convert(filename, temp_dir, "xlsx")
+        return xlsx_to_elements(tmp_file, **options)
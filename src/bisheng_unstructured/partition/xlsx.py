@@ -1,8 +1,9 @@
+import datetime
+from io import BytesIO
 from tempfile import SpooledTemporaryFile
-from typing import IO, BinaryIO, List, Optional, Union, cast
+from typing import IO, BinaryIO, Iterable, Iterator, List, Optional, Sequence, Tuple, Union, cast
 
-import pandas as pd
-from lxml.html.soupparser import fromstring as soupparser_fromstring
+import openpyxl
 
 from bisheng_unstructured.documents.elements import (
     Element,
@@ -10,16 +11,95 @@ from bisheng_unstructured.documents.elements import (
     Table,
     process_metadata,
 )
-from bisheng_unstructured.documents.markdown import transform_html_table_to_md
 from bisheng_unstructured.file_utils.filetype import FileType, add_metadata_with_filetype
 from bisheng_unstructured.partition.common import (
     exactly_one,
     get_last_modified_date,
     get_last_modified_date_from_file,
+    iter_row_tables,
     spooled_to_bytes_io_if_needed,
 )
 
 
+def _format_cell(value) -> str:
+    if value is None:
+        return ""
+    # integers are stored as floats in the excel files
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    # the dates are stored as datetimes, keep the time only if it's set
+    if isinstance(value, datetime.datetime) and value.time() == datetime.time():
+        return value.date().isoformat()
+    return str(value)
+
+
+def iter_sheet_rows(rows) -> Iterator[List[str]]:
+    """Yield the rows of cell values as texts.
+
+    The leading and trailing empty rows and the empty cells at the end of each
+    row are dropped, the empty rows in between are kept.
+    """
+    started = False
+    n_empty = 0
+    for values in rows:
+        row = [_format_cell(v) for v in values]
+        while row and row[-1] == "":
+            row.pop()
+        if not row:
+            n_empty += started
+            continue
+
+        started = True
+        for _ in range(n_empty):
+            yield []
+        n_empty = 0
+        yield row
+
+
+def sheets_to_elements(
+    sheets: Iterable[Tuple[str, Iterable[Sequence]]],
+    include_header: bool = True,
+    rows_per_table: Optional[int] = None,
+    include_metadata: bool = True,
+    filename: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> List[Element]:
+    """Partition the `(sheet name, rows of cell values)` of each sheet into Table elements"""
+    elements: List[Element] = []
+    for page_number, (sheet_name, values) in enumerate(sheets, 1):
+        rows = iter_sheet_rows(values)
+        for text, html_text in iter_row_tables(rows, include_header, rows_per_table):
+            if include_metadata:
+                metadata = ElementMetadata(
+                    text_as_html=html_text,
+                    page_name=sheet_name,
+                    page_number=page_number,
+                    filename=filename,
+                    last_modified=last_modified,
+                )
+            else:
+                metadata = ElementMetadata()
+
+            elements.append(Table(text=text, metadata=metadata))
+    return elements
+
+
+def xlsx_to_elements(file: Union[str, IO[bytes]], **kwargs) -> List[Element]:
+    """Stream the rows of the sheets from the read only workbook into `sheets_to_elements`"""
+
+    def _iter_sheets():
+        for sheet in workbook.worksheets:
+            # the dimension saved by some writers is wrong, read the rows as they are
+            sheet.reset_dimensions()
+            yield sheet.title, sheet.iter_rows(values_only=True)
+
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        return sheets_to_elements(_iter_sheets(), **kwargs)
+    finally:
+        workbook.close()
+
+
 @process_metadata()
 @add_metadata_with_filetype(FileType.XLSX)
 def partition_xlsx(
@@ -29,6 +109,7 @@ def partition_xlsx(
     include_metadata: bool = True,
     metadata_last_modified: Optional[str] = None,
     include_header: bool = True,
+    rows_per_table: Optional[int] = None,
     **kwargs,
 ) -> List[Element]:
     """Partitions Microsoft Excel Documents in .xlsx format into its document elements.
@@ -45,41 +126,29 @@ def partition_xlsx(
         The day of the last modification
     include_header
         Determines whether or not header info info is included in text and medatada.text_as_html
+    rows_per_table
+        Split the sheets into tables of at most this many rows, each with the header.
+        A sheet is a single table if not set.
     """
     exactly_one(filename=filename, file=file)
     last_modification_date = None
     if filename:
-        sheets = pd.read_excel(filename, sheet_name=None)
+        f = filename
         last_modification_date = get_last_modified_date(filename)
 
     elif file:
         f = spooled_to_bytes_io_if_needed(
             cast(Union[BinaryIO, SpooledTemporaryFile], file),
         )
-        sheets = pd.read_excel(f, sheet_name=None)
+        if isinstance(f, bytes):
+            f = BytesIO(f)
         last_modification_date = get_last_modified_date_from_file(file)
 
-    elements: List[Element] = []
-    page_number = 0
-    for sheet_name, table in sheets.items():
-        page_number += 1
-        html_text = table.to_html(index=False, header=include_header, na_rep="")
-        text = transform_html_table_to_md(html_text)["text"]
-
-        # text = soupparser_fromstring(html_text).text_content()
-
-        if include_metadata:
-            metadata = ElementMetadata(
-                text_as_html=html_text,
-                page_name=sheet_name,
-                page_number=page_number,
-                filename=metadata_filename or filename,
-                last_modified=metadata_last_modified or last_modification_date,
-            )
-        else:
-            metadata = ElementMetadata()
-
-        table = Table(text=text, metadata=metadata)
-        elements.append(table)
-
-    return elements
+    return xlsx_to_elements(
+        f,
+        include_header=include_header,
+        rows_per_table=rows_per_table,
+        include_metadata=include_metadata,
+        filename=metadata_filename or filename,
+        last_modified=metadata_last_modified or last_modification_date,
+    )
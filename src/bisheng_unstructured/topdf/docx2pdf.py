@@ -1,8 +1,7 @@
 import os
 import shutil
-import signal
-import subprocess
 
+from bisheng_unstructured.common.office_pool import office_convert
 from bisheng_unstructured.partition.common import convert_office_doc
 
 
@@ -55,36 +54,8 @@ class DocxToPDF(object):
 
 class DocxToPDFV1(object):
     def __init__(self, kwargs={}):
-        cmd_template = """
-            soffice --headless --norestore --invisible -env:SingleAppInstance=\"false\" -env:UserInstallation=\"file://{1}\" --convert-to pdf --outdir \"{1}\" \"{0}\"
-        """
-
-        def _norm_cmd(cmd):
-            return " ".join([p.strip() for p in cmd.strip().split()])
-
-        self.cmd_template = _norm_cmd(cmd_template)
-
-    @staticmethod
-    def run(cmd):
-        try:
-            p = subprocess.Popen(
-                cmd,
-                shell=True,
-                preexec_fn=os.setsid,
-                stderr=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-            )
-            exit_code = p.wait(timeout=30)
-            if exit_code != 0:
-                stdout, stderr = p.communicate()
-                raise Exception(
-                    f"err in doc2pdf: return code is {exit_code}, stderr: {stderr}, stdout: {stdout}"
-                )
-        except subprocess.TimeoutExpired:
-            os.killpg(os.getpgid(p.pid), signal.SIGTERM)
-            raise Exception(f"timeout in transforming doc to pdf, cnd: [{cmd}]")
-        except Exception as e:
-            raise Exception(f"err in doc2pdf: [{e}]")
+        # the soffice processes are run by the office pool, no params are needed
+        pass
 
     def render(self, input_file, output_file=None, to_bytes=False):
         type_ext = input_file.rsplit(".", 1)[-1]
@@ -95,8 +66,10 @@ class DocxToPDFV1(object):
 
         assert type_ext in ["docx", "doc"]
 
-        cmd = self.cmd_template.format(input_file, temp_dir)
-        DocxToPDFV1.run(cmd)
+        try:
+            office_convert(input_file, temp_dir, "pdf")
+        except Exception as e:
+            raise Exception(f"err in doc2pdf: [{e}]")
 
         if output_file is not None:
             shutil.move(temp_output_file, output_file)
@@ -6,16 +6,11 @@ import tempfile
 
 import openpyxl
 
+from bisheng_unstructured.common.office_pool import office_convert
+
 
 class ExcelToPDF(object):
     def __init__(self, kwargs={}):
-        cmd_template = """
-          soffice -env:SingleAppInstance=\"false\" -env:UserInstallation=\"file://{1}\" --convert-to html --outdir \"{1}\" \"{0}\"
-        """
-        cmd_template2 = """
-            soffice --headless -env:SingleAppInstance=\"false\" -env:UserInstallation=\"file://{1}\" --convert-to xlsx --outdir \"{1}\" \"{0}\"
-        """
-
         cmd_template3 = 'sed -e \'s/\t/,/g\' "{0}" > "{1}"'
 
         cmd_template4 = """
@@ -25,8 +20,6 @@ class ExcelToPDF(object):
         def _norm_cmd(cmd):
             return " ".join([p.strip() for p in cmd.strip().split()])
 
-        self.cmd_template = _norm_cmd(cmd_template)
-        self.cmd_template2 = _norm_cmd(cmd_template2)
         self.cmd_template3 = cmd_template3
         self.cmd_template4 = cmd_template4
 
@@ -52,6 +45,13 @@ class ExcelToPDF(object):
         except Exception as e:
             raise Exception(f"err in excel2pdf: [{e}]")
 
+    @staticmethod
+    def convert(input_file, output_dir, target_format):
+        try:
+            office_convert(input_file, output_dir, target_format)
+        except Exception as e:
+            raise Exception(f"err in excel2pdf: [{e}]")
+
     def render(self, input_file, output_file=None, to_bytes=False):
         type_ext = input_file.rsplit(".", 1)[-1]
         filename = os.path.basename(input_file)
@@ -68,8 +68,7 @@ class ExcelToPDF(object):
                 type_ext = "csv"
 
             if type_ext in ["xls", "csv"]:
-                cmd = self.cmd_template2.format(input_file, temp_dir)
-                ExcelToPDF.run(cmd)
+                ExcelToPDF.convert(input_file, temp_dir, "xlsx")
                 filename = filename.rsplit(".", 1)[0] + ".xlsx"
                 input_file = os.path.join(temp_dir, filename)
 
@@ -83,8 +82,7 @@ class ExcelToPDF(object):
             wb.save(input_file)
 
             # 先把excel转为html
-            cmd = self.cmd_template.format(input_file, temp_dir)
-            ExcelToPDF.run(cmd)
+            ExcelToPDF.convert(input_file, temp_dir, "html")
             html_file_path = os.path.join(temp_dir, filename.rsplit(".", 1)[0] + ".html")
             with open(html_file_path, "r+", encoding="utf-8") as f:
                 html_content = f.readlines()
@@ -1,16 +1,27 @@
+import html
 import os
+import re
 import shutil
 import signal
 import subprocess
 import tempfile
 from html import parser
-from typing import Tuple
+from typing import Optional
 
+import fitz
 import lxml.html
-import numpy as np
+import markdown
 from lxml import etree
 from lxml.html.clean import Cleaner
 
+from bisheng_unstructured.common.office_pool import office_convert
+from bisheng_unstructured.documents.markdown import find_outermost_tables
+from bisheng_unstructured.file_utils.encoding import (
+    SUPERSET_ENCODINGS,
+    detect_file_encoding,
+    format_encoding_str,
+)
+
 
 def clean_html(ori_file, new_file):
     cleaner = Cleaner(
@@ -46,7 +57,6 @@ def clean_html(ori_file, new_file):
     new_text = cleaner.clean_html(ori_text)
     new_text = parser.unescape(new_text)
     root = lxml.html.fromstring(new_text)
-    descendanttag_elems: Tuple[etree.Element, ...] = ()
 
     def _repr_elem(e):
         return etree.tostring(e, pretty_print=True, encoding="UTF-8").decode()
@@ -54,40 +64,131 @@ def clean_html(ori_file, new_file):
     # latex not supported table embedding in table, remove embedding tables
     for tag_elem in root.iter():
         if tag_elem.tag == "table":
-            elems = tag_elem.xpath(".//table")
-            filtered_elems = []
-            groups = [tuple(e.iterdescendants()) for e in elems]
-            n = len(groups)
-            inds = list(range(n))
-            inds = sorted(inds, key=lambda i: len(groups[i]))
-            overlap = np.zeros((n, n))
-            for i in range(n):
-                for j in range(i + 1, n):
-                    ind_j, ind_i = inds[j], inds[i]
-                    g_j, g_i = groups[ind_j], groups[ind_i]
-                    b = np.all([n in g_j for n in g_i])
-                    if b:
-                        overlap[i, j] = b
-                        break
-
-            for i in range(n):
-                if np.sum(overlap[i, :]) == 0:
-                    filtered_elems.append(elems[inds[i]])
+            filtered_elems = find_outermost_tables(tag_elem)
 
             # todo: improve it, not clean up fully
             for e in filtered_elems:
                 for emb_e in e.findall(".//table"):
                     emb_e.drop_tag()
 
-            descendanttag_elems = tuple(tag_elem.iterdescendants())
-
     new_text = _repr_elem(root)
     with open(new_file, "w") as fout:
         fout.write(new_text)
 
 
+MUPDF_CSS = """
+@page { margin: %(margin)spt; }
+body { margin: 0; font-family: %(font)ssans-serif; font-size: 11pt; line-height: 1.4; }
+pre { white-space: pre-wrap; font-family: %(font)ssans-serif; }
+table { border-collapse: collapse; }
+td, th { border: 1px solid #000000; padding: 3px; }
+"""
+
+
+HTML_CHARSET_PATTERN = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.I)
+
+
+def read_text_file(input_file: str, type_ext: str) -> str:
+    """Read the txt/md/html file, the bytes are never dropped.
+
+    The `<meta charset>` of the html is used first, then utf-8, then the
+    encoding detected from the whole file.
+    """
+    with open(input_file, "rb") as fin:
+        data = fin.read()
+
+    encodings = ["utf-8"]
+    if type_ext == "html":
+        match = HTML_CHARSET_PATTERN.search(data[:4096])
+        if match:
+            # e.g. the gbk characters in the html declared as gb2312
+            encoding = format_encoding_str(match.group(1).decode("ascii"))
+            encodings.insert(0, SUPERSET_ENCODINGS.get(encoding, encoding))
+
+    for encoding in encodings:
+        try:
+            return data.decode(encoding)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    _, text = detect_file_encoding(file=data)
+    return text
+
+
+def text_to_html(text: str) -> str:
+    return f"<html><body><pre>{html.escape(text)}</pre></body></html>"
+
+
+def markdown_to_html(text: str) -> str:
+    body = markdown.markdown(text, extensions=["tables", "fenced_code"])
+    return f"<html><body>{body}</body></html>"
+
+
+def sanitize_html(text: str) -> str:
+    if not text.strip():
+        return "<html><body></body></html>"
+
+    # scripts and external resources are never loaded by the layout, drop them early
+    cleaner = Cleaner(
+        scripts=True,
+        javascript=True,
+        comments=True,
+        style=False,
+        links=True,
+        embedded=True,
+        frames=True,
+        forms=False,
+        page_structure=False,
+    )
+    # parse from bytes, the str with an encoding declaration is refused by lxml
+    doc = lxml.html.document_fromstring(
+        text.encode("utf-8"), parser=lxml.html.HTMLParser(encoding="utf-8")
+    )
+    cleaner(doc)
+    return lxml.html.tostring(doc, encoding="unicode")
+
+
+def render_html_with_mupdf(
+    html_text: str,
+    output_file: str,
+    font_file: Optional[str] = None,
+    page_size: str = "a4",
+    margin: float = 36,
+):
+    """Layout the html into pages with the html engine of mupdf.
+
+    The glyphs missing in the base font, e.g. the CJK characters, are drawn
+    with the fallback fonts of mupdf, `font_file` replaces the base font.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        font = ""
+        font_face = ""
+        if font_file:
+            # the font is loaded relative to the html file
+            font_name = "textfont" + os.path.splitext(font_file)[1]
+            os.symlink(os.path.abspath(font_file), os.path.join(temp_dir, font_name))
+            font = "textfont, "
+            font_face = f"@font-face {{ font-family: textfont; src: url({font_name}); }}\n"
+
+        css = font_face + MUPDF_CSS % {"margin": margin, "font": font}
+        html_file = os.path.join(temp_dir, "index.html")
+        with open(html_file, "w", encoding="utf-8") as fout:
+            # the styles of the document come later and take precedence
+            fout.write(f"<style>{css}</style>")
+            fout.write(html_text)
+
+        doc = fitz.open(html_file)
+        doc.layout(rect=fitz.paper_rect(page_size))
+        with open(output_file, "wb") as fout:
+            fout.write(doc.convert_to_pdf())
+
+
 class Text2PDF(object):
     def __init__(self, kwargs={}):
+        # mupdf: render in process with pymupdf, pandoc: pandoc, soffice and wkhtmltopdf
+        self.engine = kwargs.get("text_engine", "mupdf")
+        self.font_file = kwargs.get("font_file")
+        self.page_size = kwargs.get("page_size", "a4")
+
         cmd_template = """
           pandoc -o {1} --pdf-engine=xelatex
               --lua-filter=/opt/pandoc/unnested-table.lua
@@ -101,10 +202,6 @@ class Text2PDF(object):
               -V CJKmonofont="Adobe Heiti Std"
         """
 
-        cmd_template2 = """
-            soffice --headless -env:SingleAppInstance=\"false\" -env:UserInstallation=\"file://{1}\" --convert-to pdf --outdir \"{1}\" \"{0}\"
-        """
-
         cmd_template3 = """
         wkhtmltopdf --disable-javascript --disable-local-file-access --disable-external-links --no-images "{0}" "{1}"
         """
@@ -115,7 +212,6 @@ class Text2PDF(object):
             return " ".join([p.strip() for p in cmd.strip().split()])
 
         self.cmd_template = _norm_cmd(cmd_template)
-        self.cmd_template2 = _norm_cmd(cmd_template2)
         self.cmd_template3 = _norm_cmd(cmd_template3)
 
     @staticmethod
@@ -151,9 +247,14 @@ class Text2PDF(object):
 
         assert type_ext in ["txt", "md", "html"]
 
-        if type_ext == "txt":
-            cmd = self.cmd_template2.format(input_file, temp_dir)
-            Text2PDF.run(cmd)
+        if self.engine == "mupdf":
+            self.render_with_mupdf(input_file, type_ext, output_file)
+
+        elif type_ext == "txt":
+            try:
+                office_convert(input_file, temp_dir, "pdf")
+            except Exception as e:
+                raise Exception(f"err in text2pdf: [{e}]")
             if output_file is not None:
                 tmp_file = os.path.join(temp_dir, output_filename)
                 shutil.move(tmp_file, output_file)
@@ -174,3 +275,20 @@ class Text2PDF(object):
 
         if to_bytes:
             return open(output_file, "rb").read()
+
+    def render_with_mupdf(self, input_file, type_ext, output_file):
+        text = read_text_file(input_file, type_ext)
+
+        if type_ext == "txt":
+            html_text = text_to_html(text)
+        elif type_ext == "md":
+            html_text = markdown_to_html(text)
+        else:
+            html_text = sanitize_html(text)
+
+        try:
+            render_html_with_mupdf(
+                html_text, output_file, font_file=self.font_file, page_size=self.page_size
+            )
+        except Exception as e:
+            raise Exception(f"err in text2pdf: [{e}]")
@@ -0,0 +1,54 @@
+import os
+import time
+
+from bisheng_unstructured.api.cache import DiskCacheBackend, ResultCache
+from bisheng_unstructured.api.types import UnstructuredInput, UnstructuredOutput
+
+
+def _input(file_path, mode="partition", **kwargs):
+    return UnstructuredInput(
+        filename="a.txt", file_path=str(file_path), file_type="txt", mode=mode, **kwargs
+    )
+
+
+def test_result_cache(tmp_path):
+    file_path = tmp_path / "a.txt"
+    file_path.write_text("hello")
+    cache = ResultCache(DiskCacheBackend(root=str(tmp_path / "cache")), {"layout_ep": "v1"})
+
+    key = cache.make_key(_input(file_path, parameters={"headers": {"a": "b"}}))
+    assert key == cache.make_key(_input(file_path, parameters={"no_cache": True}))
+    assert key != cache.make_key(_input(file_path, parameters={"start": 1}))
+    assert key != cache.make_key(_input(file_path, mode="text"))
+    other_versions = ResultCache(cache.backend, {"layout_ep": "v2"})
+    assert key != other_versions.make_key(_input(file_path))
+
+    assert cache.get(key) is None
+    outp = UnstructuredOutput(partitions=[{"text": "hello", "type": "Text"}], b64_pdf="cGRm")
+    cache.set(key, outp)
+    assert cache.get(key) == outp
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+    # the same content under another name hits
+    other_path = tmp_path / "b.txt"
+    other_path.write_text("hello")
+    assert cache.make_key(_input(other_path)) == cache.make_key(_input(file_path))
+
+
+def test_disk_backend_evict_lru(tmp_path):
+    backend = DiskCacheBackend(root=str(tmp_path), max_size_mb=1)
+    value = b"x" * 300 * 1024
+    for i in range(3):
+        backend.set(f"key{i}", value)
+        past = time.time() - 100 + i
+        os.utime(backend._path(f"key{i}"), (past, past))
+
+    # key0 is used recently, key1 is the least recently used one
+    assert backend.get("key0") == value
+    backend.set("key3", value)
+    assert backend.get("key1") is None
+    assert backend.get("key0") == value
+    assert backend.get("key3") == value
+
+    # the size is counted again by a new backend on the same directory
+    assert DiskCacheBackend(root=str(tmp_path), max_size_mb=1)._size == 3 * len(value)
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from bisheng_unstructured.api.executor import BoundedExecutor, ExecutorFullError
+
+
+def _sleep(event, t):
+    event.wait(t)
+    return t
+
+
+def test_bounded_executor_reject_when_full():
+    executor = BoundedExecutor(max_workers=1, max_queue_size=1)
+    event = threading.Event()
+
+    async def _run():
+        t1 = asyncio.ensure_future(executor.run(_sleep, event, 5))
+        t2 = asyncio.ensure_future(executor.run(_sleep, event, 5))
+        await asyncio.sleep(0.05)
+        assert executor.inflight == 2
+        with pytest.raises(ExecutorFullError):
+            await executor.run(_sleep, event, 5)
+
+        event.set()
+        return await asyncio.gather(t1, t2)
+
+    assert asyncio.run(_run()) == [5, 5]
+    assert executor.inflight == 0
+    executor.shutdown()
+
+
+def test_bounded_executor_not_block_loop():
+    executor = BoundedExecutor(max_workers=2, max_queue_size=0)
+
+    async def _run():
+        start = time.time()
+        job = asyncio.ensure_future(executor.run(time.sleep, 0.3))
+        await asyncio.sleep(0.01)
+        # the event loop is still responsive while the job is running
+        assert time.time() - start < 0.2
+        await job
+
+    asyncio.run(_run())
+    executor.shutdown()
+
+
+async def _wait_released(executor, timeout=2):
+    start = time.time()
+    while executor.inflight and time.time() - start < timeout:
+        await asyncio.sleep(0.01)
+    return executor.inflight
+
+
+def test_bounded_executor_cancel_keeps_slot():
+    executor = BoundedExecutor(max_workers=1, max_queue_size=0)
+    event = threading.Event()
+
+    async def _run():
+        job = asyncio.ensure_future(executor.run(_sleep, event, 5))
+        await asyncio.sleep(0.05)
+        job.cancel()
+        await asyncio.sleep(0.05)
+        # the job is still running in the worker, the slot is not freed
+        assert executor.inflight == 1
+        with pytest.raises(ExecutorFullError):
+            await executor.run(_sleep, event, 5)
+
+        event.set()
+        assert await _wait_released(executor) == 0
+
+    asyncio.run(_run())
+    executor.shutdown()
+
+
+def test_bounded_executor_process_not_supported():
+    with pytest.raises(ValueError):
+        BoundedExecutor(executor_type="process")
+
+
+def _produce(n, fail=False):
+    for i in range(n):
+        yield i
+    if fail:
+        raise ValueError("broken")
+
+
+def test_bounded_executor_stream():
+    executor = BoundedExecutor(max_workers=1, max_queue_size=0)
+
+    async def _run():
+        items = [i async for i in executor.stream(_produce, 100, max_buffer=4)]
+        assert items == list(range(100))
+
+        lines = executor.stream(_produce, 3, fail=True)
+        # the slot is taken before the first item
+        with pytest.raises(ExecutorFullError):
+            executor.stream(_produce, 3)
+        with pytest.raises(ValueError):
+            async for _ in lines:
+                pass
+        assert await _wait_released(executor) == 0
+
+        # stop the generator once the consumer is closed
+        lines = executor.stream(_produce, 10**9, max_buffer=2)
+        async for i in lines:
+            if i == 5:
+                break
+        await lines.aclose()
+        assert await _wait_released(executor) == 0
+
+    asyncio.run(_run())
+    executor.shutdown()
+
+
+def test_bounded_executor_stream_closed_before_start():
+    executor = BoundedExecutor(max_workers=1, max_queue_size=0)
+
+    async def _run():
+        lines = executor.stream(_produce, 3)
+        assert executor.inflight == 1
+        # the client is gone before the first chunk
+        await lines.aclose()
+        assert executor.inflight == 0
+
+        # a dropped stream frees its slot too
+        lines = executor.stream(_produce, 3)
+        del lines
+        assert executor.inflight == 0
+        assert [i async for i in executor.stream(_produce, 3)] == [0, 1, 2]
+        assert await _wait_released(executor) == 0
+
+    asyncio.run(_run())
+    executor.shutdown()
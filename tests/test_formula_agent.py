@@ -0,0 +1,94 @@
+import threading
+
+import requests
+from PIL import Image
+
+from bisheng_unstructured.models.formula_agent import FormulaAgent
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code >= 500:
+            raise requests.exceptions.HTTPError(f"status {self.status_code}")
+
+
+class FakeSession(object):
+    def __init__(self, support_batch, batch_status=200):
+        self.support_batch = support_batch
+        self.batch_status = batch_status
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def post(self, url, json, timeout, headers):
+        with self.lock:
+            self.calls.append(json)
+        if "b64_images" in json:
+            if not self.support_batch:
+                return FakeResponse(422, {"detail": "b64_image is required"})
+            if self.batch_status != 200:
+                return FakeResponse(self.batch_status)
+            return FakeResponse(200, {"result": [f"x_{i}" for i in range(len(json["b64_images"]))]})
+        return FakeResponse(200, {"result": "x"})
+
+
+def _det_out(n):
+    box = [0, 0, 10, 0, 10, 10, 0, 10]
+    return [{"box": box, "type": "embedding" if i % 2 else "isolated"} for i in range(n)]
+
+
+def _new_agent(support_batch, batch_size=4, batch_status=200):
+    agent = FormulaAgent(
+        formula_det_model_ep="http://det",
+        formula_recog_model_ep="http://recog",
+        formula_batch_size=batch_size,
+    )
+    agent.client = FakeSession(support_batch, batch_status)
+    return agent
+
+
+def test_recog_in_batches():
+    agent = _new_agent(True)
+    image = Image.new("RGB", (20, 20))
+    out = list(agent._recog_det_out(_det_out(10), image, False))
+    assert len(out) == 10 and len(agent.client.calls) == 3
+    assert out[0][1] == "$$\nx_0\n$$" and out[5][1] == " $x_1$ "
+
+
+def test_recog_fallback_to_single_requests():
+    agent = _new_agent(False)
+    image = Image.new("RGB", (20, 20))
+    texts = agent.recog_patches([image] * 10)
+    assert texts == ["x"] * 10
+    assert len(agent.client.calls) == 11
+    # the batch request is not tried again until the retry interval
+    agent.recog_patches([image] * 3)
+    assert len(agent.client.calls) == 14
+    agent._batch_retry_at = 0
+    agent.client.support_batch = True
+    assert agent.recog_patches([image] * 3) == ["x_0", "x_1", "x_2"]
+    assert len(agent.client.calls) == 15
+
+
+def test_recog_batch_error_fallback():
+    agent = _new_agent(True, batch_status=503)
+    image = Image.new("RGB", (20, 20))
+    assert agent.recog_patches([image] * 3) == ["x"] * 3
+    assert len(agent.client.calls) == 4
+    # a failed batch does not disable the batch requests
+    agent.recog_patches([image] * 3)
+    assert len(agent.client.calls) == 8
+
+
+def test_recog_batch_disabled_by_default():
+    agent = _new_agent(True)
+    agent.batch_size = FormulaAgent().batch_size
+    image = Image.new("RGB", (20, 20))
+    assert agent.recog_patches([image] * 3) == ["x"] * 3
+    assert all("b64_image" in call for call in agent.client.calls)
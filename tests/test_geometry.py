@@ -0,0 +1,88 @@
+import time
+
+import numpy as np
+from shapely import Polygon
+from shapely import box as Rect
+
+from bisheng_unstructured.common.geometry import (
+    contain_matrix,
+    intersection_matrix,
+    iou_matrix,
+    to_quads,
+)
+
+
+def _random_rects(n, seed=0, size=1000):
+    rng = np.random.RandomState(seed)
+    x0 = rng.uniform(0, size, n)
+    y0 = rng.uniform(0, size, n)
+    w = rng.uniform(5, 200, n)
+    h = rng.uniform(5, 60, n)
+    return np.stack([x0, y0, x0 + w, y0 + h], axis=1)
+
+
+def _rotated_quads(n, seed=1):
+    rng = np.random.RandomState(seed)
+    quads = []
+    for cx, cy in rng.uniform(100, 900, (n, 2)):
+        angle = rng.uniform(0.1, 0.5)
+        pts = np.asarray([[-80, -30], [80, -30], [80, 30], [-80, 30]], dtype=np.float64)
+        rot = np.asarray([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+        quads.append((pts @ rot.T + [cx, cy]).reshape(-1))
+    return np.asarray(quads)
+
+
+def _shapely_matrices(quads, rects):
+    polys = [Polygon(q.reshape((4, 2))) for q in to_quads(quads)]
+    rect_polys = [Rect(*r) for r in rects]
+    contain = np.zeros((len(polys), len(rect_polys)))
+    iou = np.zeros((len(polys), len(rect_polys)))
+    for i, p0 in enumerate(polys):
+        for j, p1 in enumerate(rect_polys):
+            inter = p0.intersection(p1).area
+            contain[i, j] = inter / p1.area
+            iou[i, j] = inter / p0.union(p1).area
+    return contain, iou
+
+
+def test_axis_aligned_same_as_shapely():
+    regions = _random_rects(30, seed=2, size=800)
+    lines = _random_rects(80, seed=3)
+    contain, iou = _shapely_matrices(regions, lines)
+    assert np.allclose(contain_matrix(regions, lines), contain)
+    assert np.allclose(iou_matrix(regions, lines), iou)
+
+
+def test_rotated_same_as_shapely():
+    regions = np.vstack([to_quads(_random_rects(10, seed=4)), _rotated_quads(10)])
+    lines = _random_rects(60, seed=5)
+    contain, iou = _shapely_matrices(regions, lines)
+    assert np.allclose(contain_matrix(regions, lines), contain)
+    assert np.allclose(iou_matrix(regions, lines), iou)
+
+
+def test_empty_and_degenerate():
+    assert contain_matrix([], [[0, 0, 1, 1]]).shape == (0, 1)
+    assert iou_matrix([[0, 0, 1, 1]], []).shape == (1, 0)
+    # zero area box gets zero ratio instead of a division error
+    assert contain_matrix([[0, 0, 10, 10]], [[1, 1, 1, 5]])[0, 0] == 0
+    assert intersection_matrix([[0, 0, 10, 10]], [[5, 5, 20, 20]])[0, 0] == 25
+
+
+def benchmark(n_regions=60, n_lines=800):
+    regions = _random_rects(n_regions, seed=6)
+    lines = _random_rects(n_lines, seed=7)
+
+    t0 = time.time()
+    _shapely_matrices(regions, lines)
+    t1 = time.time()
+    contain_matrix(regions, lines)
+    iou_matrix(regions, lines)
+    t2 = time.time()
+    print(f"regions={n_regions} lines={n_lines}")
+    print(f"shapely loops: {t1 - t0:.3f}s, numpy: {t2 - t1:.4f}s")
+    print(f"speedup: {(t1 - t0) / (t2 - t1):.0f}x")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,55 @@
+import time
+
+import lxml.html
+
+from bisheng_unstructured.documents.html import HTMLDocument
+from bisheng_unstructured.documents.markdown import find_outermost_tables
+
+
+def _nested_tables_html(n_tables):
+    rows = "".join(
+        f"<tr><td><table><tr><td>c{i}</td><td>d{i}</td></tr></table></td></tr>"
+        for i in range(n_tables)
+    )
+    return f"<html><body><table>{rows}</table></body></html>"
+
+
+def test_find_outermost_tables():
+    root = lxml.html.fromstring(
+        "<table><tr><td>"
+        "<table><tr><td>a</td><td>b</td></tr><tr><td>c</td><td>d</td></tr></table>"
+        "<table><tr><td><table><tr><td>x</td></tr></table></td></tr></table>"
+        "<table></table>"
+        "</td></tr></table>"
+    )
+    tables = find_outermost_tables(root)
+    # the table nested in the second table and the empty table are dropped,
+    # the smaller tables come first
+    assert [t.text_content() for t in tables] == ["x", "abcd"]
+
+
+def test_find_outermost_tables_empty():
+    root = lxml.html.fromstring("<table><tr><td><table></table><table></table></td></tr></table>")
+    tables = root.xpath(".//table")
+    assert find_outermost_tables(root) == [tables[-1]]
+
+    root = lxml.html.fromstring("<table><tr><td>a</td></tr></table>")
+    assert find_outermost_tables(root) == []
+
+
+def test_html_nested_tables():
+    doc = HTMLDocument.from_string(_nested_tables_html(20))
+    assert len(doc.elements) == 20
+    assert "c19" in doc.elements[-1].metadata.text_as_html
+
+
+def benchmark(n_tables=2000):
+    text = _nested_tables_html(n_tables)
+    t0 = time.time()
+    elements = HTMLDocument.from_string(text).elements
+    t1 = time.time()
+    print(f"tables={n_tables} elements={len(elements)} html read: {t1 - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,85 @@
+import multiprocessing
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bisheng_unstructured.models.limiter import AdaptiveLimiter, FileSemaphore
+
+
+def _call(limiter, stats, lock, t=0.01, fail=False):
+    with limiter.slot():
+        with lock:
+            stats["inflight"] += 1
+            stats["max"] = max(stats["max"], stats["inflight"])
+        time.sleep(t)
+        with lock:
+            stats["inflight"] -= 1
+        if fail:
+            raise RuntimeError("model error")
+
+
+def test_limiter_bounds_concurrency_and_grows():
+    # a large latency ratio keeps the scheduling noise of the test from cutting the limit
+    limiter = AdaptiveLimiter("ep", initial_limit=2, max_limit=4, latency_ratio=100)
+    stats = {"inflight": 0, "max": 0}
+    lock = threading.Lock()
+    with ThreadPoolExecutor(16) as executor:
+        list(executor.map(lambda _: _call(limiter, stats, lock), range(200)))
+    assert stats["max"] <= 4
+    assert limiter.limit == 4
+    assert limiter.inflight == 0
+
+
+def test_limiter_decreases_on_errors_and_latency():
+    limiter = AdaptiveLimiter("ep", initial_limit=16)
+    stats = {"inflight": 0, "max": 0}
+    lock = threading.Lock()
+    with pytest.raises(RuntimeError):
+        _call(limiter, stats, lock, fail=True)
+    assert limiter.limit == 8
+
+    # the slow calls after the fast ones tell the server is overloaded
+    limiter._last_decrease = 0
+    for _ in range(20):
+        limiter._on_success(0.01)
+    for _ in range(10):
+        limiter._on_success(0.1)
+    assert limiter.limit < 8
+
+
+def test_limiter_keeps_limit_on_latency_variance():
+    limiter = AdaptiveLimiter("ep", initial_limit=8, max_limit=32)
+    rand = random.Random(0)
+    for _ in range(600):
+        limiter._on_success(rand.uniform(0.005, 0.05))
+    assert limiter.limit == 32
+
+
+def _hold_slot(path_prefix, counter, lock, max_seen):
+    semaphore = FileSemaphore(path_prefix, 2)
+    for _ in range(5):
+        fd = semaphore.acquire()
+        with lock:
+            counter.value += 1
+            max_seen.value = max(max_seen.value, counter.value)
+        time.sleep(0.01)
+        with lock:
+            counter.value -= 1
+        semaphore.release(fd)
+
+
+def test_file_semaphore_shared_by_processes(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    counter, max_seen, lock = ctx.Value("i", 0), ctx.Value("i", 0), ctx.Lock()
+    procs = [
+        ctx.Process(target=_hold_slot, args=(str(tmp_path / "ep"), counter, lock, max_seen))
+        for _ in range(4)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert max_seen.value == 2
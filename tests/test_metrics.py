@@ -0,0 +1,135 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bisheng_unstructured.common.metrics import (
+    STAGE_SECONDS,
+    Registry,
+    collect_timings,
+    metric_labels,
+    model_timer,
+    stage_timer,
+    timed,
+)
+
+
+def test_counter_and_gauge():
+    registry = Registry()
+    counter = registry.counter("docs", "Parsed documents", ["file_type"])
+    counter.inc(file_type="pdf")
+    counter.inc(2, file_type="pdf")
+    counter.inc(file_type='a"b')
+    gauge = registry.gauge("inflight", "Running jobs")
+    with gauge.track_inprogress():
+        gauge.inc()
+    gauge.inc()
+
+    text = registry.expose()
+    assert "# HELP docs Parsed documents\n# TYPE docs counter\n" in text
+    assert 'docs_total{file_type="pdf"} 3.0\n' in text
+    assert 'docs_total{file_type="a\\"b"} 1.0\n' in text
+    assert "# TYPE inflight gauge\ninflight 2.0\n" in text
+
+    with pytest.raises(ValueError):
+        counter.inc(mode="partition")
+    with pytest.raises(ValueError):
+        registry.counter("docs", "Parsed documents")
+
+
+def test_histogram():
+    registry = Registry()
+    hist = registry.histogram("latency", "Latency", ["stage"], buckets=[0.1, 1])
+    for value in [0.05, 0.5, 0.7, 3]:
+        hist.observe(value, stage="render")
+
+    lines = registry.expose().splitlines()
+    assert lines[2:] == [
+        'latency_bucket{stage="render",le="0.1"} 1.0',
+        'latency_bucket{stage="render",le="1.0"} 3.0',
+        'latency_bucket{stage="render",le="+Inf"} 4.0',
+        'latency_count{stage="render"} 4.0',
+        'latency_sum{stage="render"} 4.25',
+    ]
+
+
+def test_set_function():
+    registry = Registry()
+    values = {("a",): 1}
+    registry.gauge("limit", "Limit", ["endpoint"]).set_function(lambda: values)
+    assert 'limit{endpoint="a"} 1.0' in registry.expose()
+    values[("b",)] = 2
+    assert 'limit{endpoint="b"} 2.0' in registry.expose()
+
+
+def _stage_count(stage, file_type, mode):
+    text = STAGE_SECONDS.expose()
+    prefix = f'bisheng_uns_stage_seconds_count{{stage="{stage}",file_type="{file_type}"'
+    for line in text.splitlines():
+        if line.startswith(f'{prefix},mode="{mode}"}}'):
+            return float(line.split()[-1])
+    return 0.0
+
+
+def test_stage_labels():
+    @timed("test_stage")
+    def _work():
+        return 1
+
+    before = _stage_count("test_stage", "docx", "topdf")
+    with metric_labels(file_type="docx", mode="topdf"):
+        assert _work() == 1
+        # the labels are carried to the threads with the context
+        with ThreadPoolExecutor(2) as executor:
+            ctx = contextvars.copy_context()
+            executor.submit(ctx.run, _work).result()
+    with stage_timer("test_stage"):
+        pass
+    assert _stage_count("test_stage", "docx", "topdf") == before + 2
+    assert _stage_count("test_stage", "", "") >= 1
+
+
+def test_collect_timings():
+    with stage_timer("render"):
+        pass
+
+    with collect_timings() as timings:
+        with metric_labels(page=1):
+            with stage_timer("render"):
+                pass
+            with collect_timings() as inner:
+                with model_timer("http://layout"):
+                    pass
+            with pytest.raises(ValueError):
+                with model_timer("http://ocr"):
+                    raise ValueError("bad")
+        with stage_timer("table_merge"):
+            pass
+
+    assert inner is timings
+    assert [(t["stage"], t["page"]) for t in timings] == [
+        ("render", 1),
+        ("model", 1),
+        ("model", 1),
+        ("table_merge", None),
+    ]
+    assert timings[1]["endpoint"] == "http://layout"
+    assert timings[2]["status"] == "error"
+    assert all(t["seconds"] >= 0 for t in timings)
+
+
+def test_concurrent_observe():
+    registry = Registry()
+    counter = registry.counter("hits", "Hits")
+
+    def _inc():
+        for _ in range(1000):
+            counter.inc()
+
+    threads = [threading.Thread(target=_inc) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert "hits_total 4000.0" in registry.expose()
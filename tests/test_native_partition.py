@@ -0,0 +1,66 @@
+import pptx
+from pptx.util import Pt
+
+from bisheng_unstructured.api.native import is_native_partition, native_elements
+from bisheng_unstructured.documents.elements import (
+    ElementMetadata,
+    NarrativeText,
+    PageBreak,
+    Table,
+    Title,
+)
+
+
+def test_is_native_partition():
+    assert is_native_partition("docx", {"native": True})
+    assert not is_native_partition("docx", {})
+    assert not is_native_partition("pdf", {"native": True})
+
+
+def test_native_elements():
+    elements = [
+        Title(text="标题", metadata=ElementMetadata(page_number=1)),
+        PageBreak(text=""),
+        NarrativeText(text="正文", metadata=ElementMetadata()),
+        Table(
+            text="| a | b |",
+            metadata=ElementMetadata(
+                page_number=2, extra_data={"bboxes": [[0, 0, 10, 10]], "pages": [2]}
+            ),
+        ),
+    ]
+    outputs = native_elements(elements)
+    assert len(outputs) == 3
+    assert outputs[0].metadata.extra_data == {
+        "pages": [1],
+        "indexes": [[0, 1]],
+        "types": ["title"],
+    }
+    assert outputs[1].metadata.extra_data == {"indexes": [[0, 1]], "types": ["paragraph"]}
+    assert outputs[2].metadata.extra_data == {
+        "bboxes": [[0, 0, 10, 10]],
+        "pages": [2],
+        "indexes": [[0, 8]],
+        "types": ["table"],
+    }
+
+
+def test_pptx_shape_bbox(tmp_path):
+    from bisheng_unstructured.partition.pptx import partition_pptx
+
+    prs = pptx.Presentation()
+    for i in range(2):
+        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        box = slide.shapes.add_textbox(Pt(72), Pt(100 + i), Pt(200), Pt(50))
+        box.text_frame.text = f"这是第{i}页的一段比较长的正文内容, 用来测试原生解析的坐标."
+    file_path = str(tmp_path / "a.pptx")
+    prs.save(file_path)
+
+    # the shapes have no extra_data out of the native partition mode
+    assert all(el.metadata.extra_data is None for el in partition_pptx(filename=file_path))
+
+    elements = native_elements(partition_pptx(filename=file_path, native=True))
+    assert len(elements) == 2
+    for i, element in enumerate(elements):
+        assert element.metadata.extra_data["pages"] == [i + 1]
+        assert element.metadata.extra_data["bboxes"] == [[72, 100 + i, 272, 150 + i]]
@@ -0,0 +1,125 @@
+import os
+import stat
+import threading
+import time
+
+import pytest
+
+from bisheng_unstructured.common import office_pool
+from bisheng_unstructured.common.office_pool import (
+    OfficePool,
+    convert_with_cli,
+    parse_target_format,
+)
+
+
+class FakeProcess(object):
+    def __init__(self):
+        self.busy = False
+        self.killed = threading.Event()
+
+
+class FakeWorker(object):
+    started = 0
+
+    def __init__(self, index, profile_root, start_timeout=30):
+        self.proc = None
+        self.jobs = 0
+
+    def start(self):
+        FakeWorker.started += 1
+        self.proc = FakeProcess()
+        self.jobs = 0
+
+    def alive(self):
+        return self.proc is not None
+
+    def stop(self):
+        if self.proc is not None:
+            self.proc.killed.set()
+        self.proc = None
+
+    def convert(self, input_file, output_dir, target_format="pdf"):
+        proc = self.proc
+        assert not proc.busy
+        proc.busy = True
+        try:
+            if "hang" in input_file and proc.killed.wait(5):
+                raise Exception("disposed")
+            if "bad" in input_file:
+                raise Exception("failed to load")
+            return office_pool.output_path(input_file, output_dir, target_format)
+        finally:
+            proc.busy = False
+
+
+@pytest.fixture
+def pool(tmp_path):
+    FakeWorker.started = 0
+    pool = OfficePool(
+        size=2, max_jobs=3, timeout=5, profile_root=str(tmp_path), worker_cls=FakeWorker
+    )
+    yield pool
+    pool.close()
+
+
+def test_parse_target_format():
+    assert parse_target_format("pdf") == ("pdf", None)
+    assert parse_target_format("docx:MS Word 2007 XML") == ("docx", "MS Word 2007 XML")
+
+
+def test_pool_reuse_and_recycle(pool):
+    for _ in range(6):
+        assert pool.convert("/in/a.docx", "/out") == "/out/a.pdf"
+    # each worker is started once and restarted after max_jobs
+    assert FakeWorker.started == 2
+
+
+def test_pool_concurrent(pool):
+    results = []
+
+    def _call(i):
+        results.append(pool.convert(f"/in/{i}.doc", "/out", "docx"))
+
+    threads = [threading.Thread(target=_call, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(results) == sorted(f"/out/{i}.docx" for i in range(8))
+
+
+def test_pool_timeout_and_error(pool):
+    with pytest.raises(Exception, match="timeout"):
+        pool.convert("/in/hang.docx", "/out", timeout=0.1)
+    with pytest.raises(Exception, match="failed to load"):
+        pool.convert("/in/bad.docx", "/out")
+    # the broken workers are replaced by new ones
+    assert pool.convert("/in/a.docx", "/out") == "/out/a.pdf"
+    assert FakeWorker.started == 3
+
+
+def _fake_soffice(tmp_path, body):
+    script = tmp_path / "soffice"
+    script.write_text("#!/bin/sh\n" + body)
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script)
+
+
+def test_convert_with_cli(tmp_path, monkeypatch):
+    # the last two args are --outdir {dir} {file}, write {dir}/{name}.pdf
+    body = 'eval dir=\\${$(($#-1))}; eval f=\\${$#}; n=$(basename "$f"); touch "$dir/${n%.*}.pdf"\n'
+    monkeypatch.setattr(office_pool, "SOFFICE_CMD", _fake_soffice(tmp_path, body))
+    input_file = tmp_path / "a b.docx"
+    input_file.write_text("x")
+    out_file = convert_with_cli(str(input_file), str(tmp_path), "pdf")
+    assert out_file == str(tmp_path / "a b.pdf")
+    assert os.path.exists(out_file)
+
+
+def test_convert_with_cli_timeout(tmp_path, monkeypatch):
+    monkeypatch.setattr(office_pool, "SOFFICE_CMD", _fake_soffice(tmp_path, "sleep 10\n"))
+    start = time.time()
+    with pytest.raises(Exception, match="timeout"):
+        convert_with_cli(str(tmp_path / "a.docx"), str(tmp_path), "pdf", timeout=0.5)
+    assert time.time() - start < 5
@@ -0,0 +1,79 @@
+import io
+import time
+
+from bisheng_unstructured.file_utils.encoding import detect_sample_encoding
+from bisheng_unstructured.partition.csv import ENCODING_SAMPLE_SIZE, partition_csv
+from bisheng_unstructured.partition.tsv import partition_tsv
+
+
+def _write_csv(file_path, n_rows, delimiter=","):
+    with open(file_path, "w", encoding="utf-8", newline="") as fout:
+        fout.write(delimiter.join(["编号", "名称", "备注"]) + "\n")
+        for i in range(n_rows):
+            fout.write(delimiter.join([str(i), f"名称{i}", f'"a{delimiter}b"']) + "\n")
+
+
+def test_csv(tmp_path):
+    file_path = str(tmp_path / "a.csv")
+    with open(file_path, "w", encoding="gbk", newline="") as fout:
+        fout.write('名称,数量\r\n"苹果, 红色",1\r\n\r\n"多行\n文本",<2>\r\n')
+    elements = partition_csv(filename=file_path)
+
+    assert len(elements) == 1
+    assert elements[0].text.split("\n") == [
+        "| 名称 | 数量 |",
+        "| --- | --- |",
+        "| 苹果, 红色 | 1 |",
+        "| 多行 文本 | <2> |",
+    ]
+    assert "<th>名称</th>" in elements[0].metadata.text_as_html
+    assert "<td>&lt;2&gt;</td>" in elements[0].metadata.text_as_html
+    assert elements[0].metadata.filetype == "text/csv"
+
+    with open(file_path, "rb") as f:
+        elements = partition_csv(file=f, include_header=False, encoding="gbk")
+        assert not f.closed
+    assert "<thead>" not in elements[0].metadata.text_as_html
+
+
+def test_tsv_rows_per_table(tmp_path):
+    file_path = str(tmp_path / "a.tsv")
+    _write_csv(file_path, 5, delimiter="\t")
+    elements = partition_tsv(filename=file_path, rows_per_table=2)
+
+    assert len(elements) == 3
+    for element in elements:
+        assert element.text.startswith("| 编号 | 名称 | 备注 |\n| --- | --- | --- |\n")
+    assert elements[-1].text.split("\n")[2:] == ["| 4 | 名称4 | a b |"]
+    assert elements[0].metadata.filetype == "text/tsv"
+
+
+def test_detect_sample_encoding():
+    # the sample is ascii, the characters after it are utf-8
+    data = b"a,b\n" * (ENCODING_SAMPLE_SIZE // 4) + "中文".encode("utf-8")
+    assert detect_sample_encoding(data[:ENCODING_SAMPLE_SIZE]) == "utf-8"
+    elements = partition_csv(file=io.BytesIO(data))
+    assert elements[0].text.endswith("| 中文 |  |")
+
+
+def test_csv_encoding_after_the_sample():
+    # the sample is ascii, the characters after it are gbk
+    data = b"a,b\n" * (ENCODING_SAMPLE_SIZE // 4) + "中文,数据\n".encode("gbk")
+    elements = partition_csv(file=io.BytesIO(data), include_header=False)
+    assert elements[0].text.endswith("| 中文 | 数据 |")
+
+
+def benchmark(n_rows=1000000, file_path="/tmp/bench_1m.csv"):
+    _write_csv(file_path, n_rows)
+    t0 = time.time()
+    elements = partition_csv(filename=file_path)
+    t1 = time.time()
+    print(f"rows={n_rows} elements={len(elements)} partition_csv: {t1 - t0:.2f}s")
+
+    elements = partition_csv(filename=file_path, rows_per_table=1000)
+    t2 = time.time()
+    print(f"rows={n_rows} elements={len(elements)} partition_csv chunked: {t2 - t1:.2f}s")
+
+
+if __name__ == "__main__":
+    benchmark()
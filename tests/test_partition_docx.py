@@ -0,0 +1,97 @@
+import time
+
+import docx
+from docx.oxml import OxmlElement
+from docx.oxml.shared import qn
+
+from bisheng_unstructured.documents.elements import ListItem, PageBreak, Table, Title
+from bisheng_unstructured.partition.docx import partition_docx
+
+
+def _add_numbering(paragraph):
+    num_pr = OxmlElement("w:numPr")
+    for tag, val in [("w:ilvl", "0"), ("w:numId", "1")]:
+        child = OxmlElement(tag)
+        child.set(qn("w:val"), val)
+        num_pr.append(child)
+    paragraph._p.get_or_add_pPr().append(num_pr)
+
+
+def _add_hyperlink(paragraph, text):
+    hyperlink = OxmlElement("w:hyperlink")
+    run = OxmlElement("w:r")
+    t = OxmlElement("w:t")
+    t.text = text
+    run.append(t)
+    hyperlink.append(run)
+    paragraph._p.append(hyperlink)
+
+
+def _make_docx(file_path, n_pages):
+    document = docx.Document()
+    for i in range(n_pages):
+        document.add_heading(f"第{i + 1}章 标题", level=1 + i % 3)
+        paragraph = document.add_paragraph("这是一段正文, ")
+        paragraph.add_run("加粗的文字").bold = True
+        paragraph.add_run("斜体的文字").italic = True
+        _add_hyperlink(paragraph, "链接的文字")
+        _add_numbering(document.add_paragraph("编号的列表项"))
+        table = document.add_table(rows=2, cols=2)
+        table.cell(0, 0).text = "表头1"
+        table.cell(0, 1).paragraphs[0].add_run("表头2").bold = True
+        table.cell(1, 0).text = f"{i}"
+        table.cell(1, 1).text = "单元格"
+        if i < n_pages - 1:
+            document.add_page_break()
+    document.save(file_path)
+
+
+def test_docx_walker(tmp_path):
+    file_path = str(tmp_path / "a.docx")
+    _make_docx(file_path, 2)
+    elements = partition_docx(filename=file_path)
+
+    titles = [el for el in elements if isinstance(el, Title)]
+    assert [el.text for el in titles] == ["第1章 标题", "第2章 标题"]
+    assert [el.metadata.page_number for el in titles] == [1, 2]
+
+    paragraph = elements[1]
+    assert paragraph.text == "这是一段正文, 加粗的文字斜体的文字链接的文字"
+    assert paragraph.metadata.emphasized_text_contents == ["加粗的文字", "斜体的文字"]
+    assert paragraph.metadata.emphasized_text_tags == ["b", "i"]
+
+    assert isinstance(elements[2], ListItem)
+    assert elements[2].text == "编号的列表项"
+
+    tables = [el for el in elements if isinstance(el, Table)]
+    assert len(tables) == 2
+    assert "单元格" in tables[1].metadata.text_as_html
+    assert tables[0].metadata.emphasized_text_contents == ["表头2"]
+
+    assert len([el for el in elements if isinstance(el, PageBreak)]) == 1
+
+
+def test_docx_unknown_style(tmp_path):
+    document = docx.Document()
+    paragraph = document.add_paragraph("一级标题", style="Heading 1")
+    paragraph._p.pPr.pStyle.set(qn("w:val"), "NoSuchStyle")
+    document.add_paragraph("标题", style="Title")
+    file_path = str(tmp_path / "a.docx")
+    document.save(file_path)
+
+    elements = partition_docx(filename=file_path)
+    # unknown style ids fall back to the default paragraph style
+    assert not isinstance(elements[0], Title)
+    assert isinstance(elements[1], Title)
+
+
+def benchmark(n_pages=1000, file_path="/tmp/bench_1000p.docx"):
+    _make_docx(file_path, n_pages)
+    t0 = time.time()
+    elements = partition_docx(filename=file_path)
+    t1 = time.time()
+    print(f"pages={n_pages} elements={len(elements)} partition_docx: {t1 - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,85 @@
+import os
+import shutil
+import time
+
+from bisheng_unstructured.partition import xls
+from bisheng_unstructured.partition.xls import partition_xls
+from bisheng_unstructured.partition.xlsx import partition_xlsx
+
+XLS_FILE = "./examples/docs/tests-example.xls"
+XLSX_FILE = "./examples/docs/tests-example.xlsx"
+
+
+def test_xls_read_by_xlrd(monkeypatch):
+    def _no_convert(*args, **kwargs):
+        raise AssertionError("soffice is not needed")
+
+    monkeypatch.setattr(xls, "office_convert", _no_convert)
+    elements = partition_xls(filename=XLS_FILE)
+    expected = partition_xlsx(filename=XLSX_FILE)
+
+    assert [el.metadata.page_name for el in elements] == ["Example Test", "Format Abbr.", "Readme"]
+    assert [el.text for el in elements] == [el.text for el in expected]
+    assert elements[0].metadata.filetype == "application/vnd.ms-excel"
+
+    with open(XLS_FILE, "rb") as f:
+        elements = partition_xls(file=f, rows_per_table=3)
+    assert elements[0].text.split("\n")[:3] == [
+        "| MC | What is 2+2? | 4 | correct | 3 | incorrect |  |  |  |",
+        "| --- | --- | --- | --- | --- | --- | --- | --- | --- |",
+        "| MA | What C datatypes are 8 bits? (assume i386) | int |  | float |  | double |  | char |",
+    ]
+    assert len(elements) > 3
+
+
+def test_xls_fallback(tmp_path, monkeypatch):
+    calls = []
+
+    def _convert(input_file, output_dir, target_format):
+        calls.append(target_format)
+        output_file = os.path.join(output_dir, "converted.xlsx")
+        shutil.copy(input_file, output_file)
+        return output_file
+
+    monkeypatch.setattr(xls, "office_convert", _convert)
+    # a xlsx file saved with the xls extension is not read by xlrd
+    file_path = str(tmp_path / "a.xls")
+    shutil.copy(XLSX_FILE, file_path)
+    elements = partition_xls(filename=file_path)
+
+    assert calls == ["xlsx"]
+    assert [el.text for el in elements] == [el.text for el in partition_xlsx(filename=XLSX_FILE)]
+
+
+def test_xls_truncated_fallback(tmp_path, monkeypatch, capsys):
+    calls = []
+
+    def _convert(input_file, output_dir, target_format):
+        calls.append(target_format)
+        output_file = os.path.join(output_dir, "converted.xlsx")
+        shutil.copy(XLSX_FILE, output_file)
+        return output_file
+
+    monkeypatch.setattr(xls, "office_convert", _convert)
+    with open(XLS_FILE, "rb") as f:
+        data = f.read()
+    file_path = str(tmp_path / "a.xls")
+    with open(file_path, "wb") as fout:
+        fout.write(data[: len(data) // 2])
+    elements = partition_xls(filename=file_path)
+
+    assert calls == ["xlsx"]
+    assert len(elements) == 3
+    assert "WARNING" not in capsys.readouterr().out
+
+
+def benchmark(n_times=100):
+    t0 = time.time()
+    for _ in range(n_times):
+        partition_xls(filename=XLS_FILE)
+    t1 = time.time()
+    print(f"files={n_times} partition_xls: {(t1 - t0) / n_times * 1000:.1f}ms per file")
+
+
+if __name__ == "__main__":
+    benchmark()
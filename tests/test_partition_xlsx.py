@@ -0,0 +1,117 @@
+import datetime
+import time
+
+import openpyxl
+import pytest
+
+from bisheng_unstructured.documents.elements import Table
+from bisheng_unstructured.partition.common import iter_row_tables
+from bisheng_unstructured.partition.xlsx import partition_xlsx
+
+
+def _make_xlsx(file_path, n_rows):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("数据")
+    sheet.append(["编号", "名称", "数量", None])
+    for i in range(n_rows):
+        sheet.append([i, f"名称<{i}>", i * 1.5, None])
+    sheet = workbook.create_sheet("空行")
+    sheet.append([])
+    sheet.append(["a", "b"])
+    sheet.append([])
+    sheet.append(["c", None, "d"])
+    sheet.append([None, None])
+    workbook.save(file_path)
+
+
+def test_xlsx_sheets(tmp_path):
+    file_path = str(tmp_path / "a.xlsx")
+    _make_xlsx(file_path, 3)
+    elements = partition_xlsx(filename=file_path)
+
+    assert all(isinstance(el, Table) for el in elements)
+    assert [el.metadata.page_name for el in elements] == ["数据", "空行"]
+    assert [el.metadata.page_number for el in elements] == [1, 2]
+    assert elements[0].text.split("\n") == [
+        "| 编号 | 名称 | 数量 |",
+        "| --- | --- | --- |",
+        "| 0 | 名称<0> | 0 |",
+        "| 1 | 名称<1> | 1.5 |",
+        "| 2 | 名称<2> | 3 |",
+    ]
+    assert "<th>编号</th>" in elements[0].metadata.text_as_html
+    assert "<td>名称&lt;0&gt;</td>" in elements[0].metadata.text_as_html
+    # the leading and trailing empty rows are dropped, the rows are padded
+    assert elements[1].text.split("\n") == [
+        "| a | b |  |",
+        "| --- | --- | --- |",
+        "|  |  |  |",
+        "| c |  | d |",
+    ]
+
+    with open(file_path, "rb") as f:
+        elements = partition_xlsx(file=f)
+    assert elements[0].text.startswith("| 编号 | 名称 | 数量 |")
+
+
+def test_xlsx_rows_per_table(tmp_path):
+    file_path = str(tmp_path / "a.xlsx")
+    _make_xlsx(file_path, 5)
+    elements = partition_xlsx(filename=file_path, rows_per_table=2)
+
+    tables = [el for el in elements if el.metadata.page_name == "数据"]
+    assert len(tables) == 3
+    for table in tables:
+        assert table.text.startswith("| 编号 | 名称 | 数量 |\n| --- | --- | --- |\n")
+        assert "<thead><tr><th>编号</th>" in table.metadata.text_as_html
+    assert tables[-1].text.split("\n")[2:] == ["| 4 | 名称<4> | 6 |"]
+
+    with pytest.raises(ValueError):
+        partition_xlsx(filename=file_path, rows_per_table=0)
+
+
+def test_xlsx_dates(tmp_path):
+    file_path = str(tmp_path / "a.xlsx")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["日期", "时间"])
+    sheet.append([datetime.datetime(2024, 1, 5), datetime.datetime(2024, 1, 5, 8, 30)])
+    workbook.save(file_path)
+
+    elements = partition_xlsx(filename=file_path)
+    assert elements[0].text.split("\n")[2] == "| 2024-01-05 | 2024-01-05 08:30:00 |"
+    assert "<td>2024-01-05</td>" in elements[0].metadata.text_as_html
+
+
+def test_iter_row_tables():
+    rows = [["a", "b"], ["1"], ["2", "3"]]
+    tables = list(iter_row_tables(rows, include_header=False, rows_per_table=2))
+    assert [text for text, _ in tables] == [
+        "| a | b |\n| --- | --- |\n| 1 |  |",
+        "| 2 | 3 |\n| --- | --- |",
+    ]
+    assert tables[1][1] == '<table border="1"><tbody><tr><td>2</td><td>3</td></tr></tbody></table>'
+
+    assert list(iter_row_tables([])) == []
+    # a table with only the header
+    text, html_text = next(iter_row_tables([["h"]]))
+    assert text == "| h |\n| --- |"
+    assert (
+        html_text == '<table border="1"><thead><tr><th>h</th></tr></thead><tbody></tbody></table>'
+    )
+
+
+def benchmark(n_rows=200000, file_path="/tmp/bench_200k.xlsx"):
+    _make_xlsx(file_path, n_rows)
+    t0 = time.time()
+    elements = partition_xlsx(filename=file_path)
+    t1 = time.time()
+    print(f"rows={n_rows} elements={len(elements)} partition_xlsx: {t1 - t0:.2f}s")
+
+    elements = partition_xlsx(filename=file_path, rows_per_table=1000)
+    t2 = time.time()
+    print(f"rows={n_rows} elements={len(elements)} partition_xlsx chunked: {t2 - t1:.2f}s")
+
+
+if __name__ == "__main__":
+    benchmark()
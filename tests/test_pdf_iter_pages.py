@@ -0,0 +1,133 @@
+import numpy as np
+
+from bisheng_unstructured.documents.pdf_parser.pdf import BlockInfo, PDFDocument
+
+TEST_FILE = "examples/docs/sw-flp-1965-v1.pdf"
+MODEL_PARAMS = {
+    k: "http://localhost:1/v2/models/m/infer"
+    for k in ["layout_ep", "cell_model_ep", "rowcol_model_ep", "table_model_ep", "ocr_model_ep"]
+}
+
+
+class FakeLayoutAgent(object):
+    def predict(self, inp):
+        return {}
+
+
+def _fake_allocate_semantic(self, textpage_info, layout, b64, img, is_scan, lang, rot, **kwargs):
+    # the last line of the page fills the width, so it is joined with the next page
+    # except for the pages where the last line is short
+    page_no = self.start + len(self._seen)
+    self._seen.append(page_no)
+    x1 = 100 if page_no % 3 else 40
+    title = BlockInfo(
+        [0, 0, 100, 10], "title", 0, 0, ts=["title"], rs=np.array([[0, 0, 100, 10]]), layout_type=3
+    )
+    head = BlockInfo(
+        [0, 20, 100, 30], "head", 1, 0, ts=["head"], rs=np.array([[0, 20, 100, 30]]), layout_type=4
+    )
+    tail = BlockInfo(
+        [0, 40, 100, 60],
+        f"tail{page_no}",
+        2,
+        0,
+        ts=["tail", f"{page_no}"],
+        rs=np.array([[0, 40, 100, 50], [0, 50, x1, 60]]),
+        layout_type=4,
+    )
+    blocks = [head, tail]
+    if page_no % 2:
+        # the page starts with a paragraph continued from the previous page
+        blocks = [head, title, tail]
+    return blocks
+
+
+def _block(x0, y0, text, index, full=True):
+    x1 = x0 + 100 if full else x0 + 40
+    rs = np.array([[x0, y0, x0 + 100, y0 + 10], [x0, y0 + 10, x1, y0 + 20]])
+    return BlockInfo(
+        [x0, y0, x0 + 100, y0 + 20], text, index, 0, ts=[text, "."], rs=rs, layout_type=4
+    )
+
+
+def _fake_two_columns(self, textpage_info, layout, b64, img, is_scan, lang, rot, **kwargs):
+    # two columns of paragraphs, the last paragraph of each column is continued
+    # in the next column, except on every third page
+    page_no = self.start + len(self._seen)
+    self._seen.append(page_no)
+    blocks = []
+    for col, x0 in enumerate([0, 200]):
+        full = bool(page_no % 3) or col == 0
+        blocks.append(_block(x0, 0, f"p{page_no}c{col}a", 2 * col))
+        blocks.append(_block(x0, 40, f"p{page_no}c{col}b", 2 * col + 1, full))
+    return blocks
+
+
+def _divide_by_x(self, blocks):
+    return [[b for b in blocks if b.bbox[0] < 150], [b for b in blocks if b.bbox[0] >= 150]]
+
+
+def _new_doc(start=0, n=8, with_columns=False):
+    doc = PDFDocument(
+        file=TEST_FILE,
+        model_params=MODEL_PARAMS,
+        mode="sdk",
+        n_parallel=1,
+        start=start,
+        n=n,
+        with_columns=with_columns,
+    )
+    doc.layout_agent = FakeLayoutAgent()
+    doc.table_det_agent = FakeLayoutAgent()
+    doc._extract_texts = lambda *args: ([], [])
+    doc._seen = []
+    return doc
+
+
+def _dump(pages):
+    return [
+        (p.number, el.text, el.metadata.extra_data["pages"]) for p in pages for el in p.elements
+    ]
+
+
+def test_windows_same_as_whole_document(monkeypatch):
+    monkeypatch.setattr(PDFDocument, "_allocate_semantic", _fake_allocate_semantic)
+    expected = _dump(_new_doc().load())
+    assert any(len(set(pages)) > 1 for _, _, pages in expected)
+
+    for window_size in [1, 2, 3, 8, 20]:
+        pages = []
+        chunks = list(_new_doc().iter_pages(window_size))
+        for window_pages, next_start in chunks:
+            pages.extend(window_pages)
+        assert _dump(pages) == expected
+        assert chunks[-1][1] is None
+        assert all(next_start is not None for _, next_start in chunks[:-1])
+
+
+def test_windows_with_columns(monkeypatch):
+    monkeypatch.setattr(PDFDocument, "_allocate_semantic", _fake_two_columns)
+    monkeypatch.setattr(PDFDocument, "_divide_blocks_into_groups", _divide_by_x)
+    expected = _dump(_new_doc(with_columns=True).load())
+    # the paragraphs are joined over the columns and over the pages
+    assert any(len(set(pages)) > 1 for _, _, pages in expected)
+    assert any("c0b" in text and "c1a" in text for _, text, _ in expected)
+
+    for window_size in [1, 2, 3, 5]:
+        pages = []
+        for window_pages, _ in _new_doc(with_columns=True).iter_pages(window_size):
+            pages.extend(window_pages)
+        # the held back columns are merged once, not again in the next window
+        assert _dump(pages) == expected
+
+
+def test_resume_from_next_start(monkeypatch):
+    monkeypatch.setattr(PDFDocument, "_allocate_semantic", _fake_allocate_semantic)
+    window_pages, next_start = next(_new_doc().iter_pages(3))
+    assert next_start is not None and next_start < 3
+
+    # the held back blocks are parsed again, so nothing is lost by resuming
+    resumed = _new_doc(start=next_start, n=8 - next_start).load()
+    assert min(p.number for p in resumed) == next_start + 1
+    texts = {t for _, t, _ in _dump(window_pages) + _dump(resumed)}
+    assert {t for _, t, _ in _dump(_new_doc().load())} <= texts
@@ -0,0 +1,23 @@
+import os
+import time
+
+from bisheng_unstructured.api.pdf_store import PdfStore
+
+
+def test_pdf_store(tmp_path):
+    src = tmp_path / "a.pdf"
+    src.write_bytes(b"%PDF-1.4")
+    store = PdfStore(root=str(tmp_path / "store"), ttl=60)
+
+    pdf_id = store.put(str(src))
+    with open(store.get(pdf_id), "rb") as fin:
+        assert fin.read() == b"%PDF-1.4"
+    assert store.get("../a") is None
+    assert store.get("0" * 32) is None
+
+    # expired files are not returned and removed by the next put
+    past = time.time() - 120
+    os.utime(store.get(pdf_id), (past, past))
+    assert store.get(pdf_id) is None
+    store.put(str(src))
+    assert len(os.listdir(store.root)) == 1
@@ -0,0 +1,38 @@
+from bisheng_unstructured.api.pipeline import Pipeline
+
+
+def test_sdk_mode_keeps_the_model_params(monkeypatch):
+    monkeypatch.setenv("server_address", "127.0.0.1:9001")
+    monkeypatch.setenv("server_type", "rt")
+    pdf_model_params = {
+        "layout_ep": "http://other:9001/v2.1/models/elem_layout_v1/infer",
+        "timeout": 30,
+        "max_batch_size": 8,
+        "batch_wait_ms": 16,
+    }
+    pipeline = Pipeline({"pdf_model_params": pdf_model_params})
+
+    # the endpoints come from the env, the other params from the settings
+    assert pipeline.pdf_model_params["layout_ep"].startswith("http://127.0.0.1:9001/")
+    layout_agent = pipeline.agents.layout_agent
+    assert layout_agent.batcher.max_batch_size == 8
+    assert layout_agent.batcher.max_wait == 0.016
+
+
+def test_sdk_mode_keeps_the_formula_params(monkeypatch):
+    monkeypatch.setenv("server_address", "127.0.0.1:9001")
+    pdf_model_params = {"formula_batch_size": 4, "formula_concurrency": 2}
+    formula_agent = Pipeline({"pdf_model_params": pdf_model_params}).agents.formula_agent
+    assert formula_agent.batch_size == 4
+    assert formula_agent.concurrency == 2
+
+
+def test_sdk_mode_keeps_the_timeout(monkeypatch):
+    monkeypatch.setenv("server_address", "127.0.0.1:9001")
+    for server_type in ["rt", "sdk"]:
+        monkeypatch.setenv("server_type", server_type)
+        agents = Pipeline({"pdf_model_params": {"timeout": 30}}).agents
+        for agent in [agents.layout_agent, agents.table_agent, agents.ocr_agent]:
+            assert agent.timeout == 30
+        # the shared keep-alive clients are built with the timeout
+        assert agents.layout_agent.client.timeout == 30
@@ -0,0 +1,56 @@
+import pstats
+import threading
+import time
+
+from bisheng_unstructured.common.profiler import StackSampler, profile_call, profile_enabled
+from bisheng_unstructured.config.settings import settings
+
+
+def _busy_worker(stopped):
+    while not stopped.is_set():
+        sum(range(1000))
+
+
+def test_stack_sampler(tmp_path):
+    stopped = threading.Event()
+    worker = threading.Thread(target=_busy_worker, args=(stopped,), name="busy")
+    worker.start()
+    sampler = StackSampler(interval=0.001)
+    sampler.start()
+    time.sleep(0.1)
+    sampler.stop()
+    stopped.set()
+    worker.join()
+
+    stacks = [s for s in sampler.counts if s.startswith("busy;")]
+    assert stacks
+    assert any("_busy_worker (test_profiler.py" in s for s in stacks)
+
+    file_path = str(tmp_path / "a.folded")
+    sampler.dump(file_path)
+    with open(file_path, encoding="utf-8") as fin:
+        stack, count = fin.readline().rsplit(" ", 1)
+    assert int(count) >= 1
+
+
+def test_profile_call(tmp_path):
+    result = profile_call("trace-1", sorted, [3, 1, 2], root=str(tmp_path))
+    assert result == [1, 2, 3]
+    stats = pstats.Stats(str(tmp_path / "trace-1.prof"))
+    assert stats.total_calls > 0
+    assert (tmp_path / "trace-1.folded").exists()
+
+
+def test_profile_enabled(monkeypatch):
+    conf = settings.profile_conf.copy()
+    monkeypatch.setattr(settings, "profile_conf", conf)
+
+    conf.enable = False
+    assert not profile_enabled({"profile": True})
+    conf.enable = True
+    assert profile_enabled({"profile": True})
+    assert not profile_enabled({})
+    conf.token = "secret"
+    assert not profile_enabled({"profile": True})
+    assert not profile_enabled({"profile": True, "profile_token": "wrong"})
+    assert profile_enabled({"profile": True, "profile_token": "secret"})
@@ -0,0 +1,30 @@
+from bisheng_unstructured.documents.pdf_parser.pdf import BlockInfo
+from bisheng_unstructured.documents.pdf_parser.reading_order import (
+    get_reading_order,
+    group_into_bands,
+    order_by_tbyx,
+)
+
+
+def _block(x0, y0, no=0):
+    return BlockInfo([x0, y0, x0 + 10, y0 + 5], f"{x0},{y0}", no, 0, ord_ind=no)
+
+
+def test_order_by_tbyx():
+    blocks = [_block(100, 22), _block(0, 20), _block(50, 25), _block(0, 0), _block(60, 3)]
+    res = order_by_tbyx(blocks)
+    assert [b.block_text for b in res] == ["0,0", "60,3", "0,20", "50,25", "100,22"]
+    # blocks are reordered, not copied
+    assert set(map(id, res)) == set(map(id, blocks))
+
+
+def test_group_into_bands():
+    blocks = [_block(0, y) for y in (0, 4, 9, 12, 30)]
+    bands = group_into_bands(blocks, th=10)
+    assert [[b.bbox[1] for b in band] for band in bands] == [[0, 4, 9], [12], [30]]
+
+
+def test_block_no_strategy():
+    blocks = [_block(0, 0, no=2), _block(0, 10, no=0), _block(0, 20, no=1)]
+    res = get_reading_order("block_no")(blocks)
+    assert [b.ord_ind for b in res] == [0, 1, 2]
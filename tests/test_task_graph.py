@@ -0,0 +1,60 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bisheng_unstructured.common.task_graph import TaskGraph
+
+
+def _sleep_return(value, t=0.2):
+    time.sleep(t)
+    return value
+
+
+def test_task_graph_runs_independent_tasks_at_once():
+    graph = TaskGraph()
+    graph.add("layout", lambda: _sleep_return("layout"))
+    graph.add("ocr", lambda: _sleep_return("ocr"))
+    graph.add("table_det", lambda: _sleep_return("table_det"))
+    graph.add("blocks", lambda *args: "+".join(args), ["layout", "ocr", "table_det"])
+    graph.add("table", lambda blocks: _sleep_return(blocks + "+table"), ["blocks"])
+
+    start = time.time()
+    results = graph.run()
+    assert results["table"] == "layout+ocr+table_det+table"
+    assert time.time() - start < 0.55
+
+
+def test_task_graph_errors():
+    with pytest.raises(ValueError):
+        TaskGraph().add("blocks", lambda x: x, ["layout"])
+
+    def _fail():
+        raise RuntimeError("model error")
+
+    graph = TaskGraph()
+    graph.add("layout", _fail)
+    graph.add("blocks", lambda x: x, ["layout"])
+    with pytest.raises(RuntimeError):
+        graph.run()
+
+
+def test_task_graph_nested_on_the_same_pool():
+    executor = ThreadPoolExecutor(max_workers=2)
+
+    def _tables(i):
+        graph = TaskGraph(executor)
+        graph.add("a", lambda: _sleep_return(i, 0.01))
+        graph.add("b", lambda a: a + 1, ["a"])
+        return graph.run()["b"]
+
+    graph = TaskGraph(executor)
+    for i in range(4):
+        graph.add(i, lambda i=i: _tables(i))
+
+    results = {}
+    thread = threading.Thread(target=lambda: results.update(graph.run()), daemon=True)
+    thread.start()
+    thread.join(5)
+    assert results == {0: 1, 1: 2, 2: 3, 3: 4}
@@ -0,0 +1,71 @@
+import os
+
+import fitz
+import pytest
+
+from bisheng_unstructured.topdf.text2pdf import Text2PDF
+
+FONT_FILE = "/usr/share/fonts/truetype/dejavu/DejaVuSerif.ttf"
+
+
+def _render(tmp_path, name, content, encoding="utf-8", **kwargs):
+    input_file = tmp_path / name
+    input_file.write_text(content, encoding=encoding)
+    output_file = str(tmp_path / "out.pdf")
+    Text2PDF({"text_engine": "mupdf", **kwargs}).render(str(input_file), output_file)
+    doc = fitz.open(output_file)
+    return doc, "".join(page.get_text() for page in doc)
+
+
+def test_txt(tmp_path):
+    lines = [f"第{i}行 line {i}" for i in range(200)]
+    doc, text = _render(tmp_path, "a.txt", "\n".join(lines))
+    assert len(doc) > 1
+    assert "第0行 line 0" in text
+    assert "第199行 line 199" in text
+
+
+def test_markdown(tmp_path):
+    content = "# 标题\n\n正文 text\n\n| a | b |\n|---|---|\n| 表格 | 2 |\n"
+    doc, text = _render(tmp_path, "a.md", content)
+    assert "标题" in text
+    assert "表格" in text
+    assert "|---|" not in text
+
+
+def test_html(tmp_path):
+    content = (
+        '<?xml version="1.0" encoding="utf-8"?><html><head><script>alert(1)</script></head>'
+        "<body><h1>标题</h1><p>段落</p><img src='http://localhost:1/a.png'></body></html>"
+    )
+    doc, text = _render(tmp_path, "a.html", content)
+    assert "标题" in text
+    assert "alert" not in text
+
+
+def test_not_utf8(tmp_path):
+    lines = [f"第{i}行 中文内容" for i in range(5)]
+    doc, text = _render(tmp_path, "a.txt", "\n".join(lines), encoding="gbk")
+    assert "第4行 中文内容" in text
+
+    content = (
+        '<html><head><meta charset="gb18030"></head>' "<body><h1>标题</h1><p>段落</p></body></html>"
+    )
+    doc, text = _render(tmp_path, "a.html", content, encoding="gb18030")
+    assert "标题" in text and "段落" in text
+
+
+def test_html_example(tmp_path):
+    output_file = str(tmp_path / "out.pdf")
+    Text2PDF({"text_engine": "mupdf"}).render("examples/docs/maoxuan_wikipedia.html", output_file)
+    doc = fitz.open(output_file)
+    assert len(doc) > 10
+    assert "开关有限宽度模式" in doc[-1].get_text()
+
+
+@pytest.mark.skipif(not os.path.exists(FONT_FILE), reason="font not found")
+def test_font_file(tmp_path):
+    doc, text = _render(tmp_path, "a.txt", "hello 中文", font_file=FONT_FILE)
+    fonts = [f[3] for f in doc.get_page_fonts(0)]
+    assert any("DejaVu" in f for f in fonts)
+    assert "hello 中文" in text
@@ -0,0 +1,148 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("transformers")
+
+from bisheng_unstructured.cleaners import translate  # noqa: E402
+from bisheng_unstructured.documents.elements import NarrativeText, PageBreak  # noqa: E402
+
+
+class FakeParam:
+    def __init__(self, n):
+        self.n = n
+
+    def numel(self):
+        return self.n
+
+    def element_size(self):
+        return 4
+
+
+class FakeModel:
+    loads = []
+
+    def __init__(self, name, size=1024 * 1024):
+        self.name = name
+        self.size = size
+        self.batches = []
+
+    @classmethod
+    def from_pretrained(cls, name):
+        if name.endswith("-xx"):
+            raise OSError(name)
+        cls.loads.append(name)
+        return cls(name)
+
+    def parameters(self):
+        return [FakeParam(self.size // 4)]
+
+    def eval(self):
+        return self
+
+
+class FakeTokenizer:
+    @classmethod
+    def from_pretrained(cls, name):
+        return cls()
+
+
+def test_model_cache_lru():
+    FakeModel.loads = []
+    cache = translate.MarianModelCache(
+        max_models=2, max_memory_mb=10, model_cls=FakeModel, tokenizer_cls=FakeTokenizer
+    )
+    cache.get("a")
+    cache.get("b")
+    cache.get("a")
+    cache.get("c")  # evicts b
+    cache.get("a")
+    cache.get("b")
+    assert FakeModel.loads == ["a", "b", "c", "b"]
+
+    with pytest.raises(ValueError):
+        cache.get("opus-mt-en-xx")
+
+
+def test_model_cache_memory_limit():
+    FakeModel.loads = []
+    cache = translate.MarianModelCache(
+        max_models=10, max_memory_mb=2, model_cls=FakeModel, tokenizer_cls=FakeTokenizer
+    )
+    for name in ["a", "b", "c", "a"]:
+        cache.get(name)
+    assert FakeModel.loads == ["a", "b", "c", "a"]
+
+
+def test_model_cache_loads_outside_the_lock():
+    class SlowModel(FakeModel):
+        loads = []
+
+        @classmethod
+        def from_pretrained(cls, name):
+            time.sleep(0.2 if name == "slow" else 0)
+            return super().from_pretrained(name)
+
+    cache = translate.MarianModelCache(model_cls=SlowModel, tokenizer_cls=FakeTokenizer)
+    cache.get("fast")
+    with ThreadPoolExecutor(4) as executor:
+        slow = [executor.submit(cache.get, "slow") for _ in range(3)]
+        time.sleep(0.05)
+        # the cached model is not blocked by the loading one
+        start = time.time()
+        cache.get("fast")
+        assert time.time() - start < 0.1
+        models = [f.result()[1] for f in slow]
+    assert SlowModel.loads == ["fast", "slow"]
+    assert all(model is models[0] for model in models)
+
+
+def test_translate_batches(monkeypatch):
+    calls = []
+
+    def fake_translate(texts, model, tokenizer):
+        calls.append(list(texts))
+        return [f"<{model}>{t}" for t in texts]
+
+    class Cache:
+        def get(self, model_name):
+            return "tokenizer", model_name.rsplit("-", 2)[1]
+
+    monkeypatch.setattr(translate, "_model_cache", Cache())
+    monkeypatch.setattr(translate, "_translate_text", fake_translate)
+    monkeypatch.setattr(
+        translate, "chunk_by_attention_window", lambda text, tok, **kwargs: text.split("|")
+    )
+
+    texts = ["a|bb", "  ", "ccc", "dddd|e"]
+    outputs = translate.translate_texts(texts, source_lang="de", batch_size=2)
+    assert outputs == ["<de>a <de>bb", "  ", "<de>ccc", "<de>dddd <de>e"]
+    # the chunks of all texts are batched together, shortest first
+    assert calls == [["a", "e"], ["bb", "ccc"], ["dddd"]]
+
+    assert translate.translate_texts(["hello"], source_lang="en") == ["hello"]
+
+    elements = [NarrativeText(text="x|y"), PageBreak(text="")]
+    translate.translate_elements(elements, source_lang="zh")
+    assert elements[0].text == "<zh>x <zh>y"
+
+
+def test_translate_undetectable_text(monkeypatch):
+    from langdetect.lang_detect_exception import LangDetectException
+
+    def fake_detect(text):
+        if not any(c.isalpha() for c in text):
+            raise LangDetectException(0, "No features in text.")
+        return "de"
+
+    class Cache:
+        def get(self, model_name):
+            return "tokenizer", "model"
+
+    monkeypatch.setattr(translate.langdetect, "detect", fake_detect)
+    monkeypatch.setattr(translate, "_model_cache", Cache())
+    monkeypatch.setattr(translate, "_translate_text", lambda texts, *args: [t + "!" for t in texts])
+    monkeypatch.setattr(translate, "chunk_by_attention_window", lambda text, tok, **kwargs: [text])
+
+    assert translate.translate_texts(["2023", "hallo"]) == ["2023", "hallo!"]
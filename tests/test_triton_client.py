@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from bisheng_unstructured.models.triton_client import (
+    MicroBatcher,
+    deserialize_bytes_tensor,
+    get_triton_client,
+    serialize_bytes_tensor,
+)
+
+
+def test_bytes_tensor_roundtrip():
+    elems = [b"", b"abc", "中文".encode("utf-8"), b"\x00" * 300]
+    buffer = serialize_bytes_tensor(elems)
+    assert len(buffer) == 4 * len(elems) + sum(len(e) for e in elems)
+    assert deserialize_bytes_tensor(buffer) == elems
+
+
+def test_shared_client():
+    c0 = get_triton_client("127.0.0.1:8000", concurrency=4, timeout=10)
+    c1 = get_triton_client("127.0.0.1:8000", concurrency=4, timeout=10)
+    c2 = get_triton_client("127.0.0.1:8001", concurrency=4, timeout=10)
+    assert c0 is c1
+    assert c0 is not c2
+
+
+class FakeClient(object):
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batch_sizes = []
+        self._lock = threading.Lock()
+
+    def infer(self, model, elems):
+        with self._lock:
+            self.batch_sizes.append(len(elems))
+        time.sleep(0.01)
+        if self.fail:
+            raise Exception("server error")
+        return [f"{model}:{e}".encode("utf-8") for e in elems]
+
+
+def _run_concurrent(batcher, n):
+    results = [None] * n
+    errors = [None] * n
+
+    def _call(i):
+        try:
+            results[i] = batcher.infer(str(i))
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=_call, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    return results, errors
+
+
+def test_micro_batcher_demux():
+    client = FakeClient()
+    batcher = MicroBatcher(client, "layout", max_batch_size=4, max_wait_ms=50)
+    results, errors = _run_concurrent(batcher, 10)
+    assert errors == [None] * 10
+    assert results == [f"layout:{i}".encode("utf-8") for i in range(10)]
+    assert sum(client.batch_sizes) == 10
+    assert max(client.batch_sizes) <= 4
+    assert len(client.batch_sizes) < 10
+
+
+def test_micro_batcher_error():
+    client = FakeClient(fail=True)
+    batcher = MicroBatcher(client, "layout", max_batch_size=4, max_wait_ms=50)
+    results, errors = _run_concurrent(batcher, 6)
+    assert results == [None] * 6
+    assert all(str(e) == "server error" for e in errors)
+
+
+def test_micro_batcher_disabled():
+    client = FakeClient()
+    batcher = MicroBatcher(client, "layout", max_batch_size=1)
+    results, errors = _run_concurrent(batcher, 5)
+    assert errors == [None] * 5
+    assert client.batch_sizes == [1] * 5
+    with pytest.raises(Exception):
+        MicroBatcher(FakeClient(fail=True), "layout", max_batch_size=1).infer("0")